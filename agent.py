@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from collections import deque
+
+from src.agent_protocol import encode_hello, encode_batch
+from src.sensors import init_gpu
+from src.sampler import sampler, SAMPLE_FIELDS
+
+# Сколько замеров держать в памяти, пока центральный бот недоступен
+MAX_PENDING = 3600
+
+
+async def connect(server: str):
+    if server.startswith("unix:"):
+        return await asyncio.open_unix_connection(server[5:])
+    host, _, port = server.rpartition(":")
+    return await asyncio.open_connection(host, int(port))
+
+
+async def push(server: str, name: str, token: str, batch: int, pending: deque, ready: asyncio.Event):
+    """Отправляет накопленные замеры пакетами, переподключаясь при обрывах"""
+    delay = 1.0
+    while True:
+        writer = None
+        try:
+            _, writer = await connect(server)
+            writer.write(encode_hello(name, token))
+            await writer.drain()
+            logging.info(f"Агент {name} подключён к {server}")
+            delay = 1.0
+            while True:
+                await ready.wait()
+                ready.clear()
+                while len(pending) >= batch:
+                    rows = [pending[i] for i in range(batch)]
+                    writer.write(encode_batch(name, len(SAMPLE_FIELDS), sampler.cpu_count_logical, rows))
+                    await writer.drain()
+                    # Удаляем только после успешной отправки
+                    for _ in rows:
+                        pending.popleft()
+        except (OSError, ConnectionError) as e:
+            logging.warning(f"Нет связи с {server}: {str(e)}, повтор через {delay:.0f} с")
+        finally:
+            if writer is not None:
+                writer.close()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60.0)
+
+
+async def main(args):
+    pending = deque(maxlen=MAX_PENDING)
+    ready = asyncio.Event()
+
+    def on_snapshot(snapshot):
+        pending.append((sampler.samples.latest(), snapshot.per_core))
+        if len(pending) >= args.batch:
+            ready.set()
+
+    sampler.add_listener(on_snapshot)
+    # Запросов пользователей у агента нет: частоту, нужную панелям бота, задаёт --interval
+    sampler.cadence.require("центральный бот", args.interval)
+    asyncio.create_task(init_gpu())
+    asyncio.create_task(sampler.run())
+    await push(args.server, args.name, args.token, args.batch, pending, ready)
+
+
+if __name__ == '__main__':
+    # Агент не пишет журналы бота: сообщения идут в stderr (для systemd - в journald)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Агент EOTS: отправляет метрики хоста центральному боту")
+    parser.add_argument("--server", default=os.getenv("AGENT_SERVER", "127.0.0.1:9876"),
+                        help="адрес бота: 'адрес:порт' или 'unix:/путь/к/сокету'")
+    parser.add_argument("--name", default=os.getenv("AGENT_NAME", socket.gethostname()),
+                        help="имя хоста в боте")
+    parser.add_argument("--token", default=os.getenv("AGENT_TOKEN", ""),
+                        help="общий токен агентов (AGENT_TOKEN бота)")
+    parser.add_argument("--batch", type=int, default=int(os.getenv("AGENT_BATCH", "5")),
+                        help="замеров в одном пакете")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("AGENT_INTERVAL", "1")),
+                        help="опрашивать не реже раза в столько секунд и в простое")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except (KeyboardInterrupt, SystemExit):
+        logging.info("Агент остановлен")
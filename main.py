@@ -1,30 +1,95 @@
+from src import startup
+
+# Импорт зависимостей и модулей бота с замером времени для отчёта о запуске
+startup.preload(
+    "aiogram", "psutil", "dotenv",
+    "src.base_config", "src.config", "src.utils", "src.gpu", "src.sensors",
+    "src.hardware_monitor", "src.sampler",
+    "src.process_scanner", "src.history", "src.alerts", "src.notifier",
+    "src.agent_protocol", "src.aggregator", "src.dashboard",
+    "src.report_cache", "src.perf", "src.exporter",
+    "src.disks", "src.connections", "src.hwmon", "src.webhook",
+    "src.watchlist", "src.audit_search", "src.jobs",
+    "src.middlewares", "src.bot_handlers",
+)
+
 import asyncio
 import logging
+import time
 from aiogram import Bot, Dispatcher, Router
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from src.config import API_TOKEN
+from src.config import (API_TOKEN, AGENT_LISTEN, METRICS_LISTEN, WEBHOOK_URL, WEBHOOK_LISTEN,
+                        WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_CONCURRENCY, WEBHOOK_DRAIN_TIMEOUT)
 from src.utils import logger
 from src.bot_handlers import register_handlers
 from src.hardware_monitor import check_thresholds
+from src.sensors import init_gpu
+from src.sampler import sampler
+from src.history import history
+from src.watchlist import watchlist
+from src.jobs import scheduler
+from src.aggregator import agent_server
+from src.report_cache import report_cache
+from src.perf import perf
+from src.exporter import exporter
+from src.middlewares import UpdateLatencyMiddleware
+from src.webhook import WebhookServer, run_webhook
 
 # Инициализация бота и диспетчера
+_setup_start = time.perf_counter()
 bot = Bot(token=API_TOKEN)
 dp = Dispatcher(storage=MemoryStorage())
 router = Router()
 dp.include_router(router)
+dp.update.outer_middleware(UpdateLatencyMiddleware())
 
 # Регистрация обработчиков
 register_handlers(router)
+startup.mark("создание бота и регистрация обработчиков", time.perf_counter() - _setup_start)
 
 # Запуск бота
 async def main():
-    # Запуск мониторинга
+    # Сторожевой поток: зависания event loop попадают в лог со стеком
+    perf.watchdog.start()
+    
+    # NVML инициализируется в фоне, до этого сборщик не видит GPU
+    asyncio.create_task(init_gpu())
+
+    # Запуск сборщика метрик и мониторинга
+    sampler.add_listener(history.record)
+    asyncio.create_task(sampler.run())
+    asyncio.create_task(history.run())
+    asyncio.create_task(watchlist.run())
     asyncio.create_task(check_thresholds(bot))
     
+    # Приём метрик от агентов других хостов
+    if AGENT_LISTEN:
+        await agent_server.start(AGENT_LISTEN)
+    
+    # Эндпоинт /metrics для Prometheus
+    if METRICS_LISTEN:
+        await exporter.start(METRICS_LISTEN)
+    
     # Запуск бота
     logging.info("Запуск бота...")
-    await dp.start_polling(bot)
+    startup.log_report()
+    try:
+        if WEBHOOK_URL:
+            server = WebhookServer(dp, bot, WEBHOOK_SECRET, WEBHOOK_CONCURRENCY, WEBHOOK_DRAIN_TIMEOUT)
+            await run_webhook(dp, bot, server, WEBHOOK_LISTEN, WEBHOOK_PATH, WEBHOOK_URL)
+        else:
+            # Webhook, оставшийся от прошлого запуска, мешает getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        # Команды консоли не должны пережить бота
+        await scheduler.shutdown()
+        # Иначе пропали бы точки текущей минуты и часа
+        await history.close()
+        # Статистика кэша отчётов для подбора REPORT_CACHE_TTLS
+        if report_cache.stats():
+            logging.info("Кэш отчётов:\n" + report_cache.stats())
 
 if __name__ == '__main__':
     try:
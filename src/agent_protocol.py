@@ -0,0 +1,99 @@
+import struct
+import sys
+from array import array
+
+# Кадр: длина полезной нагрузки (uint32) + нагрузка.
+# Нагрузка: версия, тип кадра, длина имени хоста, имя хоста (utf-8), тело.
+FRAME_HEADER = struct.Struct('<I')
+PAYLOAD_HEADER = struct.Struct('<BBH')
+# Тело пакета замеров: число замеров, число полей, число ядер;
+# затем для каждого замера поля и загрузка ядер как little-endian double
+BATCH_HEADER = struct.Struct('<HHH')
+
+PROTOCOL_VERSION = 1
+KIND_HELLO = 1   # тело: токен доступа (utf-8, сравнивается как байты)
+KIND_BATCH = 2
+
+# Ограничение размера кадра, чтобы агент не мог занять всю память
+MAX_FRAME = 4 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _to_wire(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array('d', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_wire(data) -> array:
+    values = array('d')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _frame(kind: int, host: str, body: bytes) -> bytes:
+    host_bytes = host.encode('utf-8')
+    payload = PAYLOAD_HEADER.pack(PROTOCOL_VERSION, kind, len(host_bytes)) + host_bytes + body
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def encode_hello(host: str, token: str = "") -> bytes:
+    return _frame(KIND_HELLO, host, token.encode('utf-8'))
+
+
+def encode_batch(host: str, field_count: int, core_count: int, rows) -> bytes:
+    """Кадр с пакетом замеров; rows - пары (поля, загрузка ядер)"""
+    values = array('d')
+    count = 0
+    for row, per_core in rows:
+        values.extend(row)
+        values.extend(per_core)
+        count += 1
+    body = BATCH_HEADER.pack(count, field_count, core_count) + _to_wire(values)
+    return _frame(KIND_BATCH, host, body)
+
+
+def decode_payload(payload: bytes):
+    """Разбирает нагрузку кадра: (тип, хост, тело)
+
+    Тело для KIND_HELLO - токен (bytes), для KIND_BATCH - (число полей, число ядер,
+    список пар (поля, загрузка ядер)).
+    """
+    if len(payload) < PAYLOAD_HEADER.size:
+        raise ProtocolError("Слишком короткий кадр")
+    version, kind, host_length = PAYLOAD_HEADER.unpack_from(payload)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Неподдерживаемая версия протокола {version}")
+    offset = PAYLOAD_HEADER.size
+    if offset + host_length > len(payload):
+        raise ProtocolError("Кадр обрезан в имени хоста")
+    try:
+        host = bytes(payload[offset:offset + host_length]).decode('utf-8')
+    except UnicodeDecodeError:
+        raise ProtocolError("Имя хоста не в utf-8")
+    offset += host_length
+    if kind == KIND_HELLO:
+        return kind, host, bytes(payload[offset:])
+    if kind != KIND_BATCH:
+        raise ProtocolError(f"Неизвестный тип кадра {kind}")
+
+    if offset + BATCH_HEADER.size > len(payload):
+        raise ProtocolError("Кадр обрезан в заголовке пакета")
+    count, field_count, core_count = BATCH_HEADER.unpack_from(payload, offset)
+    offset += BATCH_HEADER.size
+    width = field_count + core_count
+    if len(payload) - offset != count * width * 8:
+        raise ProtocolError("Размер пакета не совпадает с заголовком")
+    values = _from_wire(payload[offset:])
+    rows = []
+    for i in range(count):
+        start = i * width
+        rows.append((values[start:start + field_count],
+                     values[start + field_count:start + width]))
+    return kind, host, (field_count, core_count, rows)
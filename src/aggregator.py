@@ -0,0 +1,124 @@
+import asyncio
+import hmac
+import math
+import re
+import time
+
+from .agent_protocol import (FRAME_HEADER, MAX_FRAME, KIND_HELLO, ProtocolError,
+                             decode_payload)
+from .config import SAMPLE_INTERVAL, AGENT_TOKEN, AGENT_HISTORY, AGENT_HOST_TTL
+from .sampler import MetricsStore, SAMPLE_FIELDS, sampler
+from .utils import logger
+
+# Имя хоста попадает в callback_data кнопок (до 64 байт) и в Markdown-разметку отчётов
+HOST_NAME_PATTERN = re.compile(r"[A-Za-z0-9.-]{1,48}")
+
+
+class AgentServer:
+    """Приём замеров от агентов: одно соединение - одна сопрограмма чтения
+
+    Агенты сами присылают пакеты замеров, поэтому сервер не опрашивает
+    хосты, а только разбирает входящие кадры и пишет их в хранилище хоста.
+    Хранилище агента короче локального (history), а хост, не присылавший
+    замеров дольше ttl, удаляется вместе с историей: число хостов
+    и занятая ими память не растут от переименованных или выведенных машин.
+    """
+
+    def __init__(self, interval: float, history: int, token: str = "", ttl: float = 3600):
+        self.interval = interval
+        self.history = history
+        self.token = token.encode('utf-8')
+        self.ttl = ttl
+        self.hosts = {}       # имя хоста -> MetricsStore
+        self.last_seen = {}   # имя хоста -> время последнего пакета
+        self._server = None
+        self._task = None
+
+    async def start(self, listen: str):
+        """Запускает приём: 'unix:/путь/к/сокету' или 'адрес:порт'"""
+        if listen.startswith("unix:"):
+            self._server = await asyncio.start_unix_server(self._handle, path=listen[5:])
+        else:
+            if not self.token:
+                # Без токена любой, кто достучится до порта, подменит метрики хостов
+                logger.error(f"Приём данных от агентов на {listen} не запущен: не задан AGENT_TOKEN")
+                return
+            host, _, port = listen.rpartition(":")
+            self._server = await asyncio.start_server(self._handle, host or None, int(port))
+        self._task = asyncio.create_task(self._evict_loop())
+        logger.info(f"Приём данных от агентов на {listen}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername") or "unix"
+        host = None
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                if length > MAX_FRAME:
+                    raise ProtocolError(f"Кадр слишком большой: {length} байт")
+                kind, name, body = decode_payload(await reader.readexactly(length))
+                if kind == KIND_HELLO:
+                    # Сравнение байтов: compare_digest не принимает строки с не-ASCII символами
+                    if self.token and not hmac.compare_digest(body, self.token):
+                        raise ProtocolError("Неверный токен агента")
+                    if not HOST_NAME_PATTERN.fullmatch(name) or name == sampler.name:
+                        raise ProtocolError(f"Недопустимое имя хоста: {name!r}")
+                    host = name
+                    logger.info(f"Агент {host} подключился ({peer})")
+                    continue
+                if host is None or name != host:
+                    raise ProtocolError("Пакет замеров до приветствия")
+                self._ingest(host, body)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ProtocolError, ValueError) as e:
+            logger.warning(f"Отключение агента {host or peer}: {str(e)}")
+        finally:
+            if host:
+                logger.info(f"Агент {host} отключился")
+            writer.close()
+
+    def evict(self, now: float = None):
+        """Удаляет хосты, молчащие дольше ttl"""
+        now = time.time() if now is None else now
+        for host in [host for host, seen in self.last_seen.items() if now - seen > self.ttl]:
+            del self.last_seen[host]
+            self.hosts.pop(host, None)
+            logger.info(f"Агент {host} молчит дольше {self.ttl:.0f} с, история удалена")
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(min(self.ttl, 60))
+            self.evict()
+
+    def _ingest(self, host: str, body):
+        field_count, core_count, rows = body
+        store = self.hosts.get(host)
+        if store is None or store.cpu_count_logical != core_count:
+            store = self.hosts[host] = MetricsStore(host, self.interval, self.history,
+                                                    max(core_count, 1))
+        # Агент другой версии может прислать больше или меньше полей
+        known = min(field_count, len(SAMPLE_FIELDS))
+        padding = (math.nan,) * (len(SAMPLE_FIELDS) - known)
+        for row, per_core in rows:
+            store.store(tuple(row[:known]) + padding, per_core)
+        self.last_seen[host] = time.time()
+
+
+agent_server = AgentServer(SAMPLE_INTERVAL, AGENT_HISTORY, AGENT_TOKEN, AGENT_HOST_TTL)
+
+# Выбранный пользователем хост: user_id -> имя хоста
+selected_hosts = {}
+
+
+def get_source(user_id: int) -> MetricsStore:
+    """Хранилище метрик хоста, выбранного пользователем (по умолчанию локального)"""
+    return agent_server.hosts.get(selected_hosts.get(user_id), sampler)
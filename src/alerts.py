@@ -0,0 +1,204 @@
+import json
+import math
+import operator
+import os
+from collections import deque
+
+from .config import (ALERT_RULES_FILE, CPU_LOAD_THRESHOLD, CPU_TEMP_THRESHOLD,
+                     GPU_LOAD_THRESHOLD, GPU_TEMP_THRESHOLD, ALERT_SUSTAIN)
+from .sampler import SAMPLE_FIELDS
+from .utils import logger
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+# Агрегаты по окну: all - условие выполняется на всех точках окна подряд,
+# avg/max/min - условие проверяется для среднего/максимума/минимума окна
+AGGREGATES = ('all', 'avg', 'max', 'min')
+
+# Подписи метрик для текста уведомлений: поле снимка -> (значок, подпись, единица)
+METRIC_LABELS = {
+    'cpu': ("⚠️", "Загрузка CPU", '%'),
+    'cpu_temp': ("🌡️", "Температура CPU", '°C'),
+    'gpu_util': ("⚠️", "Загрузка GPU", '%'),
+    'gpu_temp': ("🌡️", "Температура GPU", '°C'),
+    'mem_percent': ("⚠️", "Использование RAM", '%'),
+    'swap_percent': ("⚠️", "Использование SWAP", '%'),
+}
+
+
+class Rule:
+    """Правило оповещения"""
+    __slots__ = ('name', 'metric', 'op', 'threshold', 'duration', 'clear',
+                 'agg', 'users', 'message', 'notify_clear', '_compare', '_clear_compare')
+
+    def __init__(self, name, metric, op, threshold, duration=0, clear=None,
+                 agg='all', users=None, message=None, notify_clear=False):
+        if metric not in SAMPLE_FIELDS or metric == 'time':
+            raise ValueError(f"Правило {name}: неизвестная метрика {metric}")
+        if op not in OPERATORS:
+            raise ValueError(f"Правило {name}: неизвестный оператор {op}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"Правило {name}: неизвестный агрегат {agg}")
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = float(threshold)
+        self.duration = float(duration)
+        # Уровень сброса (гистерезис): по умолчанию равен порогу
+        self.clear = self.threshold if clear is None else float(clear)
+        self.agg = agg
+        self.users = set(users) if users else None  # None - все ALLOWED_USERS
+        self.message = message
+        self.notify_clear = notify_clear
+        self._compare = OPERATORS[op]
+        # Тревога снимается, когда значение пересекает уровень сброса в обратную сторону
+        self._clear_compare = operator.lt if op in ('>', '>=') else operator.gt
+
+    def format(self, value: float, cleared: bool = False) -> str:
+        icon, label, unit = METRIC_LABELS.get(self.metric, ("⚠️", self.metric, ''))
+        if self.message:
+            text = self.message.format(value=value, threshold=self.threshold, name=self.name)
+        elif cleared:
+            text = f"{label} в норме: {value:.1f}{unit}"
+        else:
+            text = f"{label}: {value:.1f}{unit} ({self.op} {self.threshold:g}{unit}"
+            if self.duration:
+                text += f" в течение {self.duration:g} сек"
+            text += ")"
+        return f"{'✅' if cleared else icon} {text}"
+
+
+class _RuleState:
+    """Состояние правила: скользящее окно и текущий статус"""
+    __slots__ = ('active', 'since', 'started', 'window', 'total')
+
+    def __init__(self):
+        self.active = False
+        self.since = None    # начало непрерывного выполнения условия (для all)
+        self.started = None  # время первой точки (покрытие окна)
+        self.window = deque()
+        self.total = 0.0     # сумма значений окна (для avg)
+
+
+class AlertEvent:
+    """Срабатывание или снятие тревоги"""
+    __slots__ = ('rule', 'value', 'cleared')
+
+    def __init__(self, rule, value, cleared):
+        self.rule = rule
+        self.value = value
+        self.cleared = cleared
+
+    @property
+    def text(self) -> str:
+        return self.rule.format(self.value, self.cleared)
+
+
+class AlertEngine:
+    """Инкрементальная проверка правил по потоку снимков
+
+    Для каждого правила хранится скользящее окно с накопленными агрегатами:
+    сумма для среднего и монотонная очередь для максимума/минимума, поэтому
+    каждая точка обрабатывается за амортизированное O(1).
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._states = [_RuleState() for _ in self.rules]
+
+    def _aggregate(self, rule, state, now, value):
+        """Значение агрегата окна после добавления точки"""
+        window = state.window
+        horizon = now - rule.duration
+        if rule.agg == 'avg':
+            window.append((now, value))
+            state.total += value
+            while window[0][0] < horizon:
+                state.total -= window.popleft()[1]
+            return state.total / len(window)
+        # Монотонная очередь: в голове всегда максимум (или минимум) окна
+        worse = operator.le if rule.agg == 'max' else operator.ge
+        while window and worse(window[-1][1], value):
+            window.pop()
+        window.append((now, value))
+        while window[0][0] < horizon:
+            window.popleft()
+        return window[0][1]
+
+    def near_threshold(self, snapshot, margin: float):
+        """Имя правила, чья метрика у порога, за ним или ждёт окна; иначе None"""
+        for rule, state in zip(self.rules, self._states):
+            if state.active or state.since is not None:
+                return rule.name
+            value = getattr(snapshot, rule.metric)
+            if math.isnan(value):
+                continue
+            # Сдвигаем значение к порогу на margin: если так условие выполняется, мы рядом
+            distance = margin * max(abs(rule.threshold), 1.0)
+            shifted = value + distance if rule.op in ('>', '>=') else value - distance
+            if rule._compare(shifted, rule.threshold):
+                return rule.name
+        return None
+
+    def evaluate(self, snapshot):
+        """Обрабатывает снимок и возвращает список AlertEvent"""
+        events = []
+        now = snapshot.time
+        for rule, state in zip(self.rules, self._states):
+            value = getattr(snapshot, rule.metric)
+            if math.isnan(value):
+                continue
+            if state.started is None:
+                state.started = now
+
+            if rule.agg == 'all':
+                holds = rule._compare(value, rule.threshold)
+                if not holds:
+                    state.since = None
+                elif state.since is None:
+                    state.since = now
+                triggered = holds and now - state.since >= rule.duration
+                current = value
+            else:
+                current = self._aggregate(rule, state, now, value)
+                covered = now - state.started >= rule.duration
+                triggered = covered and rule._compare(current, rule.threshold)
+
+            if not state.active and triggered:
+                state.active = True
+                events.append(AlertEvent(rule, current, False))
+            elif state.active and rule._clear_compare(current, rule.clear):
+                state.active = False
+                if rule.notify_clear:
+                    events.append(AlertEvent(rule, current, True))
+        return events
+
+
+def default_rules():
+    """Правила из пороговых значений .env: превышение держится ALERT_SUSTAIN секунд"""
+    if os.getenv("CHECK_INTERVAL"):
+        # Периода проверки больше нет: правила проверяются на каждом замере сборщика
+        logger.warning("CHECK_INTERVAL больше не используется: длительность превышения задаёт ALERT_SUSTAIN")
+    return [
+        Rule('cpu_load', 'cpu', '>', CPU_LOAD_THRESHOLD, ALERT_SUSTAIN),
+        Rule('cpu_temp', 'cpu_temp', '>', CPU_TEMP_THRESHOLD, ALERT_SUSTAIN),
+        Rule('gpu_load', 'gpu_util', '>', GPU_LOAD_THRESHOLD, ALERT_SUSTAIN),
+        Rule('gpu_temp', 'gpu_temp', '>', GPU_TEMP_THRESHOLD, ALERT_SUSTAIN),
+    ]
+
+
+def load_rules(path: str):
+    """Загружает правила из JSON-файла; без файла - правила по умолчанию"""
+    if not path or not os.path.exists(path):
+        return default_rules()
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [Rule(**item) for item in data]
+
+
+alert_engine = AlertEngine(load_rules(ALERT_RULES_FILE))
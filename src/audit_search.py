@@ -0,0 +1,228 @@
+import json
+import mmap
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from .config import AUDIT_INDEX_DIR
+from .utils import handler, logger
+
+# Начало записи журнала: "2026-10-17 13:45:01,123 - INFO - ..."
+_HOUR_LINE = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d):\d\d:\d\d", re.M)
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_HOUR_FORMAT = "%Y-%m-%d %H"
+
+
+class FileIndex:
+    """Смещения начала каждого часа в одном файле журнала"""
+    __slots__ = ('path', 'inode', 'size', 'hours', 'offsets')
+
+    def __init__(self, path, inode, size=0, hours=None, offsets=None):
+        self.path = path               # имя файла, под которым сохранён индекс
+        self.inode = inode
+        self.size = size               # проиндексировано байт (до конца последней строки)
+        self.hours = hours or []       # "ГГГГ-ММ-ДД ЧЧ" по порядку
+        self.offsets = offsets or []   # смещение первой записи часа
+
+    def range(self, start: str, end: str):
+        """Границы байтов, где могут лежать записи часов start..end включительно"""
+        first = bisect_left(self.hours, start)
+        last = bisect_right(self.hours, end)
+        if first >= len(self.hours) or last == 0:
+            return None
+        low = self.offsets[first]
+        high = self.offsets[last] if last < len(self.offsets) else self.size
+        return low, high
+
+
+class AuditQuery:
+    """Фильтр записей: пользователь, интервал времени и подстрока"""
+    __slots__ = ('user_id', 'start', 'end', 'text')
+
+    def __init__(self, user_id=None, start=None, end=None, text=""):
+        self.user_id = user_id
+        self.start = start or datetime.min
+        self.end = end or datetime.max
+        self.text = text
+
+    @property
+    def needle(self) -> bytes:
+        """Самая избирательная часть фильтра для поиска в mmap без разбора строк"""
+        if self.text:
+            return self.text.encode('utf-8')
+        if self.user_id is not None:
+            return f"Пользователь: {self.user_id},".encode('utf-8')
+        return b""
+
+    def matches(self, line: bytes) -> bool:
+        try:
+            moment = datetime.strptime(line[:19].decode('ascii'), _TIME_FORMAT)
+        except ValueError:
+            return False   # продолжение многострочной записи
+        if not self.start <= moment <= self.end:
+            return False
+        if self.user_id is not None and f"Пользователь: {self.user_id},".encode('utf-8') not in line:
+            return False
+        return not self.text or self.text.encode('utf-8') in line
+
+
+class AuditLog:
+    """Поиск по журналу bot_usage.log и его ротациям
+
+    Для каждого файла хранится индекс - смещение первой записи каждого часа.
+    Он строится один раз проходом регулярного выражения по mmap и
+    дописывается по мере роста текущего файла; ротированные файлы не
+    меняются, поэтому их индекс лежит рядом, в index_dir. Индекс привязан к
+    inode, и после ротации индекс текущего файла достаётся переименованному.
+    Запрос открывает только файлы, пересекающиеся с интервалом, и читает
+    лишь байты нужных часов, перескакивая к совпадениям через mmap.find.
+    """
+
+    def __init__(self, path: str, index_dir: str):
+        self.path = path
+        self.index_dir = index_dir
+        self._indexes = {}   # (устройство, inode) -> FileIndex
+        # Поиск идёт в потоках: одновременные запросы иначе дописывали бы один
+        # индекс дважды и писали бы один и тот же .idx.tmp
+        self._lock = threading.Lock()
+
+    def files(self):
+        """Файлы журнала от старых к новым"""
+        directory, base = os.path.split(self.path)
+        rotated = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory or ".")
+            if name.startswith(base + ".")
+        )
+        return rotated + [self.path] if os.path.exists(self.path) else rotated
+
+    def _sidecar(self, path: str) -> str:
+        return os.path.join(self.index_dir, os.path.basename(path) + ".idx")
+
+    def _load(self, path: str, stat):
+        # После перезапуска бота ротированный файл может ещё описываться индексом текущего
+        for source in (path, self.path):
+            try:
+                sidecar = self._sidecar(source)
+                with open(sidecar, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('inode') == stat.st_ino and data.get('size', 0) <= stat.st_size:
+                return FileIndex(source, stat.st_ino, data['size'], data['hours'], data['offsets'])
+        return None
+
+    def _save(self, path: str, index: FileIndex):
+        os.makedirs(self.index_dir, exist_ok=True)
+        sidecar = self._sidecar(path)
+        with open(sidecar + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'inode': index.inode, 'size': index.size,
+                       'hours': index.hours, 'offsets': index.offsets}, f)
+        os.replace(sidecar + ".tmp", sidecar)
+        index.path = path
+
+    def _extend(self, path: str, index: FileIndex, size: int):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            # Последняя строка может быть дописана не до конца
+            end = mm.rfind(b"\n", index.size, size) + 1
+            if end <= index.size:
+                return False
+            last = index.hours[-1] if index.hours else None
+            for match in _HOUR_LINE.finditer(mm, index.size, end):
+                hour = match.group(1).decode('ascii')
+                if hour != last:
+                    index.hours.append(hour)
+                    index.offsets.append(match.start())
+                    last = hour
+            index.size = end
+        return True
+
+    def index(self, path: str) -> FileIndex:
+        stat = os.stat(path)
+        key = (stat.st_dev, stat.st_ino)
+        index = self._indexes.get(key) or self._load(path, stat)
+        if index is None or index.size > stat.st_size:
+            index = FileIndex(None, stat.st_ino)
+        self._indexes[key] = index
+        extended = index.size < stat.st_size and self._extend(path, index, stat.st_size)
+        # Файл переименован ротацией - индекс переезжает под новое имя
+        if extended or index.path != path:
+            self._save(path, index)
+        return index
+
+    def _cleanup(self, paths):
+        """Удаляет индексы файлов, удалённых ротацией, и забытые inode"""
+        names = {os.path.basename(path) + ".idx" for path in paths}
+        try:
+            for name in os.listdir(self.index_dir):
+                if name not in names:
+                    os.unlink(os.path.join(self.index_dir, name))
+        except OSError:
+            pass
+
+    def search(self, query: AuditQuery, cursor=None, limit: int = 20):
+        """Записи по запросу в хронологическом порядке, не больше limit
+
+        cursor - (inode, смещение), с которого продолжать; возвращается
+        курсор следующей страницы или None, если записей больше нет.
+        """
+        with self._lock:
+            return self._search(query, cursor, limit)
+
+    def _search(self, query: AuditQuery, cursor, limit: int):
+        handler.flush_batch()
+        paths = self.files()
+        start_hour = query.start.strftime(_HOUR_FORMAT) if query.start != datetime.min else ""
+        end_hour = query.end.strftime(_HOUR_FORMAT) if query.end != datetime.max else "9999"
+        needle = query.needle
+        entries = []
+        live = set()
+        skipping = cursor is not None
+
+        for path in paths:
+            try:
+                index = self.index(path)
+            except OSError as e:
+                logger.warning(f"Журнал {path} недоступен: {str(e)}")
+                continue
+            live.add(index.inode)
+            if skipping:
+                if index.inode != cursor[0]:
+                    continue
+                skipping = False
+            bounds = index.range(start_hour, end_hour)
+            if bounds is None:
+                continue
+            low, high = bounds
+            if cursor is not None and index.inode == cursor[0]:
+                low = max(low, cursor[1])
+            if low >= high:
+                continue
+
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), high, access=mmap.ACCESS_READ) as mm:
+                position = low
+                while position < high:
+                    if needle:
+                        found = mm.find(needle, position, high)
+                        if found < 0:
+                            break
+                        line_start = mm.rfind(b"\n", position, found) + 1 or position
+                    else:
+                        line_start = position
+                    line_end = mm.find(b"\n", line_start, high)
+                    if line_end < 0:
+                        line_end = high
+                    line = mm[line_start:line_end]
+                    position = line_end + 1
+                    if query.matches(line):
+                        entries.append(line.decode('utf-8', errors='replace'))
+                        if len(entries) >= limit:
+                            return entries, (index.inode, position)
+
+        self._indexes = {key: index for key, index in self._indexes.items() if index.inode in live}
+        self._cleanup(paths)
+        return entries, None
+
+
+audit_log = AuditLog(handler.baseFilename, AUDIT_INDEX_DIR)
@@ -0,0 +1,30 @@
+import os
+
+# Настройки, общие для бота и агента. Агент импортирует только этот модуль,
+# поэтому он не зависит от aiogram, а python-dotenv здесь необязателен
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    pass
+else:
+    # Загрузка данных из .env
+    load_dotenv()
+
+# Источник показаний GPU: nvml или none
+GPU_BACKEND = os.getenv("GPU_BACKEND", "nvml")
+# Каталог датчиков hwmon в sysfs (для проверки можно указать поддельное дерево)
+HWMON_ROOT = os.getenv("HWMON_ROOT", "/sys/class/hwmon")
+# Фоновый сборщик метрик: самый частый период опроса (сек) и глубина истории (сек)
+SAMPLE_INTERVAL = float(os.getenv("SAMPLE_INTERVAL", "1"))
+SAMPLE_HISTORY = int(os.getenv("SAMPLE_HISTORY", "3600"))
+# Адаптивный период: самый редкий опрос в простое (сек), близость к порогу правила
+# (доля порога), резкое изменение метрики между замерами (% или °C) и бюджет
+# собственной нагрузки сборщика (доля одного ядра)
+SAMPLE_INTERVAL_MAX = float(os.getenv("SAMPLE_INTERVAL_MAX", "10"))
+SAMPLE_NEAR_MARGIN = float(os.getenv("SAMPLE_NEAR_MARGIN", "0.1"))
+SAMPLE_FAST_CHANGE = float(os.getenv("SAMPLE_FAST_CHANGE", "10"))
+MONITOR_CPU_BUDGET = float(os.getenv("MONITOR_CPU_BUDGET", "0.005"))
+# Сторожевой поток event loop: период пульса и порог зависания (сек)
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "0.05"))
+STALL_THRESHOLD = float(os.getenv("STALL_THRESHOLD", "0.25"))
@@ -0,0 +1,331 @@
+# Офлайн-замер производительности: обработчики бота, сборщик метрик и цикл оповещений
+#
+#   python -m src.bench.benchmark --processes 2000 --partitions 30 --gpus 4 --output run.json
+#   python -m src.bench.benchmark --compare run.json
+#
+# psutil и pynvml подменяются имитациями из src/bench/fakes.py, Telegram - StubBot,
+# поэтому прогон не зависит от железа и сети. Модули бота импортируются только
+# после подмены, а рабочий каталог переносится во временный, чтобы логи и
+# история прогона не смешивались с настоящими.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .fakes import FakeHwmon, FakeNvml, FakePsutil
+from .stub_bot import StubBot
+
+# Сценарии: имя -> (тип события, текст сообщения или данные кнопки)
+SCENARIOS = {
+    'status': ('message', "📊 Общая информация"),
+    'cpu': ('message', "🖥️ CPU"),
+    'cpu_graph': ('callback', "cpu_graph:600"),
+    'ram': ('message', "🧠 RAM"),
+    'gpu': ('message', "🎮 GPU"),
+    'temp': ('message', "🔥 Температура"),
+    'disk': ('message', "💾 Диск"),
+    'network': ('message', "🌐 Сеть"),
+    'processes': ('message', "📋 Процессы"),
+    'proc_sort': ('callback', "proc_sort:ram"),
+    'uptime': ('message', "⏱️ Аптайм"),
+}
+
+# Метрики, по которым сравниваются прогоны: путь в результате -> больше значит хуже
+COMPARED = {
+    'loop.max_stall_ms': True,
+    'handlers_total.messages_per_second': False,
+    'sampler.p95_ms': True,
+    'alerts.seconds': True,
+}
+
+
+def percentile(values, q: float) -> float:
+    """Перцентиль по ближайшему рангу (values не пустой)"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies) -> dict:
+    """Перцентили задержек в миллисекундах"""
+    ms = [value * 1000 for value in latencies]
+    return {
+        'count': len(ms),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3),
+    }
+
+
+class LoopMonitor:
+    """Замер задержек event loop: насколько позже срока просыпается короткий sleep"""
+
+    def __init__(self, tick: float = 0.005):
+        self.tick = tick
+        self.stalls = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.tick
+            await asyncio.sleep(self.tick)
+            self.stalls.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> dict:
+        self._task.cancel()
+        return {
+            'max_stall_ms': round(max(self.stalls, default=0.0) * 1000, 3),
+            'p99_stall_ms': round(percentile(self.stalls, 99) * 1000, 3) if self.stalls else 0.0,
+        }
+
+
+def install_fakes(args):
+    """Подменяет psutil и настройки до импорта модулей бота"""
+    sys.modules['psutil'] = FakePsutil(args.processes, args.partitions, args.cores)
+    users = ",".join(str(user) for user in range(1, args.users + 1))
+    os.environ.update({
+        'BOT_TOKEN': "123456:BENCHMARK",
+        'ALLOWED_USERS': users,
+        'GPU_BACKEND': "none",
+        'SAMPLE_INTERVAL': str(args.sample_interval),
+        'ALERT_RULES_FILE': "",
+        # Правила по умолчанию срабатывают на первом же замере у всех пользователей
+        'CPU_LOAD_THRESHOLD': "-1",
+        'ALERT_SUSTAIN': "0",
+        # Без окна объединения и ограничения частоты замеряется сам конвейер оповещений
+        'NOTIFY_COALESCE_WINDOW': "0",
+        'NOTIFY_GLOBAL_RATE': "100000",
+        'NOTIFY_CHAT_RATE': "100000",
+    })
+    workdir = tempfile.mkdtemp(prefix="eots-benchmark-")
+    os.makedirs(os.path.join(workdir, "logs"))
+    FakeHwmon(os.path.join(workdir, "hwmon"), cores=args.cores)
+    os.environ['HWMON_ROOT'] = os.path.join(workdir, "hwmon")
+    os.chdir(workdir)
+    return workdir
+
+
+def update_data(update_id: int, user_id: int, kind: str, payload: str) -> dict:
+    """JSON обновления Telegram, как его присылает Bot API"""
+    user = {'id': user_id, 'is_bot': False, 'first_name': "Benchmark"}
+    chat = {'id': user_id, 'type': "private"}
+    message = {'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': user,
+               'text': payload if kind == 'message' else "benchmark"}
+    if kind == 'message':
+        data = {'update_id': update_id, 'message': message}
+    else:
+        data = {'update_id': update_id, 'callback_query': {
+            'id': str(update_id), 'from': user, 'chat_instance': "benchmark",
+            'data': payload, 'message': message,
+        }}
+    return data
+
+
+def make_update(update_id: int, user_id: int, kind: str, payload: str, bot):
+    from aiogram.types import Update
+
+    return Update.model_validate(update_data(update_id, user_id, kind, payload), context={'bot': bot})
+
+
+async def run_handlers(dp, bot, args) -> dict:
+    """Каждый сценарий: args.requests событий от args.users пользователей, не более args.concurrency одновременно"""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = {}
+    update_id = 0
+    total_start = loop.time()
+    calls_before = len(bot.calls)
+
+    for name, (kind, payload) in SCENARIOS.items():
+        latencies = []
+
+        async def one(update):
+            async with semaphore:
+                start = loop.time()
+                await dp.feed_update(bot, update)
+                latencies.append(loop.time() - start)
+
+        updates = []
+        for i in range(args.requests):
+            update_id += 1
+            updates.append(make_update(update_id, i % args.users + 1, kind, payload, bot))
+        await asyncio.gather(*(one(update) for update in updates))
+        results[name] = summarize(latencies)
+
+    elapsed = loop.time() - total_start
+    messages = len(bot.calls) - calls_before
+    return results, {
+        'seconds': round(elapsed, 3),
+        'api_calls': messages,
+        'messages_per_second': round(messages / elapsed, 1),
+    }
+
+
+async def run_alerts(args) -> dict:
+    """Время от первого замера до доставки оповещения каждому пользователю"""
+    from ..hardware_monitor import check_thresholds
+
+    bot = StubBot(latency=args.latency)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    task = asyncio.create_task(check_thresholds(bot))
+    deadline = start + args.timeout
+    while len(bot.calls) < args.users and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = loop.time() - start
+    task.cancel()
+    return {
+        'delivered': len(bot.calls),
+        'seconds': round(elapsed, 3),
+        'messages_per_second': round(len(bot.calls) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _lookup(result: dict, path: str):
+    for part in path.split('.'):
+        if not isinstance(result, dict) or part not in result:
+            return None
+        result = result[part]
+    return result
+
+
+def compare(current: dict, baseline: dict, max_regression: float):
+    """Строки сравнения и признак регрессии (ухудшение больше max_regression)"""
+    paths = dict(COMPARED)
+    for name in current.get('handlers', {}):
+        paths[f"handlers.{name}.p95_ms"] = True
+    lines = [f"{'метрика':<38} {'было':>10} {'стало':>10} {'изм.':>8}"]
+    regressed = False
+    for path, higher_is_worse in paths.items():
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = change > max_regression if higher_is_worse else change < -max_regression
+        regressed |= worse
+        lines.append(f"{path:<38} {old:>10.2f} {new:>10.2f} {change:>+7.0%}{' ⚠' if worse else ''}")
+    return lines, regressed
+
+
+async def benchmark(args) -> dict:
+    from aiogram import Dispatcher, Router
+
+    from ..bot_handlers import register_handlers
+    from ..sensors import gpu_backend, init_gpu
+    from ..sampler import sampler
+
+    collect_times = []
+    collect = sampler._collect
+
+    def timed_collect():
+        start = time.perf_counter()
+        try:
+            return collect()
+        finally:
+            collect_times.append(time.perf_counter() - start)
+
+    sampler._collect = timed_collect
+    gpu_backend.nvml = FakeNvml(args.gpus)
+    await init_gpu()
+    sampler_task = asyncio.create_task(sampler.run())
+    await sampler.snapshot()
+
+    # Оповещения замеряются отдельно: обработчики не должны конкурировать с ними за цикл
+    alerts = await run_alerts(args)
+
+    dp = Dispatcher()
+    router = Router()
+    register_handlers(router)
+    dp.include_router(router)
+    bot = StubBot(latency=args.latency)
+
+    monitor = LoopMonitor()
+    monitor.start()
+    handlers, handlers_total = await run_handlers(dp, bot, args)
+    loop_stats = monitor.stop()
+    sampler_task.cancel()
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'params': vars(args),
+        },
+        'handlers': handlers,
+        'handlers_total': handlers_total,
+        'loop': loop_stats,
+        'sampler': summarize(collect_times) if collect_times else {},
+        'alerts': alerts,
+        'psutil_calls': sys.modules['psutil'].calls,
+    }
+
+
+def print_result(result: dict):
+    print(f"{'обработчик':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (мс)")
+    for name, stats in result['handlers'].items():
+        print(f"{name:<12} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+    total = result['handlers_total']
+    print(f"\nВызовов API: {total['api_calls']} за {total['seconds']} с "
+          f"({total['messages_per_second']} в секунду)")
+    print(f"Наибольшая задержка event loop: {result['loop']['max_stall_ms']} мс "
+          f"(p99 {result['loop']['p99_stall_ms']} мс)")
+    if result['sampler']:
+        print(f"Замер сборщика: p50 {result['sampler']['p50_ms']} мс, "
+              f"p95 {result['sampler']['p95_ms']} мс")
+    alerts = result['alerts']
+    print(f"Оповещения: {alerts['delivered']} за {alerts['seconds']} с "
+          f"({alerts['messages_per_second']} в секунду)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-замер производительности EOTS")
+    parser.add_argument("--processes", type=int, default=300, help="число процессов имитации")
+    parser.add_argument("--partitions", type=int, default=4, help="число разделов диска")
+    parser.add_argument("--cores", type=int, default=8, help="число ядер CPU")
+    parser.add_argument("--gpus", type=int, default=1, help="число видеокарт")
+    parser.add_argument("--users", type=int, default=20, help="число пользователей (и получателей оповещений)")
+    parser.add_argument("--requests", type=int, default=50, help="событий на сценарий")
+    parser.add_argument("--concurrency", type=int, default=10, help="одновременных событий")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка одного вызова API (сек)")
+    parser.add_argument("--sample-interval", type=float, default=0.2, help="период сборщика (сек)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="предел ожидания оповещений (сек)")
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="допустимое ухудшение при сравнении (доля)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    install_fakes(args)
+
+    result = asyncio.run(benchmark(args))
+    print_result(result)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультат сохранён в {output}")
+
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressed = compare(result, baseline, args.max_regression)
+        print("\n" + "\n".join(lines))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
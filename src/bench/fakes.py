@@ -0,0 +1,312 @@
+# Поддельные бэкенды для проверки бота на машинах без соответствующего железа
+import math
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+
+class _Record:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeNvml:
+    """Имитация подмножества API pynvml с count видеокартами"""
+
+    NVML_TEMPERATURE_GPU = 0
+    NVML_CLOCK_SM = 1
+    NVML_CLOCK_MEM = 2
+
+    class NVMLError(Exception):
+        pass
+
+    def __init__(self, count: int = 1, memory_total: int = 16 * 1024**3):
+        self.count = count
+        self.memory_total = memory_total
+        self.initialized = False
+        self.calls = 0  # число вызовов API, для оценки стоимости замера
+
+    def _call(self):
+        self.calls += 1
+        if not self.initialized:
+            raise self.NVMLError("NVML не инициализирован")
+
+    def _wave(self, handle, period=60.0):
+        # Плавно меняющееся значение 0..1, у каждой карты своя фаза
+        return 0.5 + 0.5 * math.sin(time.time() / period + handle)
+
+    def nvmlInit(self):
+        self.calls += 1
+        self.initialized = True
+
+    def nvmlShutdown(self):
+        self.calls += 1
+        self.initialized = False
+
+    def nvmlDeviceGetCount(self):
+        self._call()
+        return self.count
+
+    def nvmlDeviceGetHandleByIndex(self, index):
+        self._call()
+        if not 0 <= index < self.count:
+            raise self.NVMLError(f"Нет устройства {index}")
+        return index
+
+    def nvmlDeviceGetName(self, handle):
+        self._call()
+        return f"Fake GPU {handle}"
+
+    def nvmlDeviceGetUtilizationRates(self, handle):
+        self._call()
+        load = self._wave(handle)
+        return _Record(gpu=round(100 * load), memory=round(60 * load))
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        self._call()
+        return round(40 + 45 * self._wave(handle))
+
+    def nvmlDeviceGetMemoryInfo(self, handle):
+        self._call()
+        used = int(self.memory_total * self._wave(handle, 600))
+        return _Record(total=self.memory_total, used=used, free=self.memory_total - used)
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        self._call()
+        return int(1000 * (50 + 200 * self._wave(handle)))
+
+    def nvmlDeviceGetEnforcedPowerLimit(self, handle):
+        self._call()
+        return 300 * 1000
+
+    def nvmlDeviceGetClockInfo(self, handle, clock_type):
+        self._call()
+        base = 1800 if clock_type == self.NVML_CLOCK_SM else 9500
+        return round(base * (0.3 + 0.7 * self._wave(handle)))
+
+
+class _FakeProcess:
+    """Имитация psutil.Process для FakePsutil"""
+
+    def __init__(self, owner, pid):
+        if pid not in owner.processes:
+            raise owner.NoSuchProcess(pid)
+        self._owner = owner
+        self.pid = pid
+
+    @contextmanager
+    def oneshot(self):
+        yield
+
+    def _load(self, period=30.0):
+        self._owner.calls += 1
+        return 0.5 + 0.5 * math.sin(time.time() / period + self.pid)
+
+    def name(self):
+        self._owner.calls += 1
+        return f"proc-{self.pid}"
+
+    def create_time(self):
+        self._owner.calls += 1
+        return self._owner.started
+
+    def cpu_times(self):
+        # Накопленное время растёт со скоростью до 20% одного ядра
+        elapsed = time.time() - self._owner.started
+        return _Record(user=elapsed * 0.2 * self._load(), system=elapsed * 0.01)
+
+    def memory_info(self):
+        return _Record(rss=int((32 + 256 * self._load(600)) * 1024**2), vms=0)
+
+    def io_counters(self):
+        elapsed = time.time() - self._owner.started
+        if self.pid % 7 == 0:
+            raise self._owner.AccessDenied(self.pid)
+        return _Record(read_bytes=int(elapsed * 4096 * (self.pid % 5)),
+                       write_bytes=int(elapsed * 1024 * (self.pid % 3)))
+
+    def num_fds(self):
+        self._owner.calls += 1
+        return 8 + self.pid % 64
+
+
+class FakePsutil:
+    """Имитация подмножества API psutil для прогонов без реальной системы
+
+    Подставляется вместо модуля через sys.modules до импорта модулей бота.
+    processes, partitions и cores задают размер «машины», calls считает
+    вызовы API. Счётчики (время CPU, ввод-вывод) растут со временем, так что
+    дельты и скорости получаются ненулевыми.
+    """
+
+    AF_LINK = 17
+    CONN_LISTEN = "LISTEN"
+
+    class Error(Exception):
+        pass
+
+    class NoSuchProcess(Error):
+        pass
+
+    class ZombieProcess(NoSuchProcess):
+        pass
+
+    class AccessDenied(Error):
+        pass
+
+    def __init__(self, processes: int = 300, partitions: int = 4, cores: int = 8,
+                 interfaces: int = 2, memory_total: int = 64 * 1024**3):
+        self.processes = set(range(1, processes + 1))
+        self.partitions = partitions
+        self.cores = cores
+        self.interfaces = interfaces
+        self.memory_total = memory_total
+        self.started = time.time()
+        self.calls = 0
+
+    def _wave(self, phase=0.0, period=60.0):
+        self.calls += 1
+        return 0.5 + 0.5 * math.sin(time.time() / period + phase)
+
+    def _elapsed(self):
+        return time.time() - self.started
+
+    def Process(self, pid=None):
+        return _FakeProcess(self, 1 if pid is None else pid)
+
+    def pids(self):
+        self.calls += 1
+        return sorted(self.processes)
+
+    def boot_time(self):
+        self.calls += 1
+        return self.started - 86400
+
+    def cpu_count(self, logical=True):
+        self.calls += 1
+        return self.cores if logical else max(1, self.cores // 2)
+
+    def cpu_percent(self, interval=None, percpu=False):
+        values = [round(100 * self._wave(i), 1) for i in range(self.cores)]
+        return values if percpu else sum(values) / len(values)
+
+    def cpu_freq(self, percpu=False):
+        return _Record(current=800 + 3200 * self._wave(), min=800.0, max=4000.0)
+
+    def sensors_temperatures(self, fahrenheit=False):
+        return {"coretemp": [_Record(label=f"Core {i}", current=40 + 40 * self._wave(i),
+                                     high=90.0, critical=100.0)
+                             for i in range(self.cores)]}
+
+    def virtual_memory(self):
+        used = int(self.memory_total * (0.2 + 0.6 * self._wave(period=600)))
+        available = self.memory_total - used
+        return _Record(total=self.memory_total, available=available, used=used,
+                       free=available, percent=round(used / self.memory_total * 100, 1))
+
+    def swap_memory(self):
+        total = 8 * 1024**3
+        used = int(total * 0.1 * self._wave(period=900))
+        return _Record(total=total, used=used, free=total - used,
+                       percent=round(used / total * 100, 1))
+
+    def _disk_counters(self, index):
+        elapsed = self._elapsed()
+        return _Record(read_bytes=int(elapsed * 2 * 1024**2 * (index + 1)),
+                       write_bytes=int(elapsed * 1024**2 * (index + 1)),
+                       read_count=int(elapsed * 100), write_count=int(elapsed * 50),
+                       read_time=int(elapsed * 10), write_time=int(elapsed * 20),
+                       busy_time=int(elapsed * 30))
+
+    def disk_io_counters(self, perdisk=False):
+        self.calls += 1
+        disks = {f"sd{chr(97 + i % 26)}{i // 26 or ''}": self._disk_counters(i)
+                 for i in range(self.partitions)}
+        if perdisk:
+            return disks
+        return _Record(**{field: sum(getattr(d, field) for d in disks.values())
+                          for field in ('read_bytes', 'write_bytes', 'read_count',
+                                        'write_count', 'read_time', 'write_time', 'busy_time')})
+
+    def disk_partitions(self, all=False):
+        self.calls += 1
+        return [_Record(device=f"/dev/sd{chr(97 + i % 26)}{i // 26 or ''}",
+                        mountpoint="/" if i == 0 else f"/mnt/data{i}",
+                        fstype="ext4", opts="rw,relatime")
+                for i in range(self.partitions)]
+
+    def disk_usage(self, path):
+        total = 512 * 1024**3
+        used = int(total * (0.1 + 0.8 * self._wave(len(path), 3600)))
+        return _Record(total=total, used=used, free=total - used,
+                       percent=round(used / total * 100, 1))
+
+    def _nic_counters(self, index):
+        elapsed = self._elapsed()
+        return _Record(bytes_sent=int(elapsed * 50 * 1024 * (index + 1)),
+                       bytes_recv=int(elapsed * 200 * 1024 * (index + 1)),
+                       packets_sent=int(elapsed * 50), packets_recv=int(elapsed * 150),
+                       errin=0, errout=0, dropin=0, dropout=0)
+
+    def net_io_counters(self, pernic=False):
+        self.calls += 1
+        nics = {f"eth{i}": self._nic_counters(i) for i in range(self.interfaces)}
+        if pernic:
+            return nics
+        return _Record(**{field: sum(getattr(n, field) for n in nics.values())
+                          for field in ('bytes_sent', 'bytes_recv', 'packets_sent',
+                                        'packets_recv', 'errin', 'errout', 'dropin', 'dropout')})
+
+    def net_if_addrs(self):
+        self.calls += 1
+        return {f"eth{i}": [
+            _Record(family=socket.AF_INET, address=f"10.0.{i}.2", netmask="255.255.255.0", broadcast=None),
+            _Record(family=socket.AF_INET6, address=f"fe80::{i + 1}", netmask=None, broadcast=None),
+            _Record(family=self.AF_LINK, address=f"02:00:00:00:00:{i:02x}", netmask=None, broadcast=None),
+        ] for i in range(self.interfaces)}
+
+    def net_connections(self, kind="inet"):
+        self.calls += 1
+        connections = []
+        for i in range(len(self.processes) // 2):
+            listening = i % 4 == 0
+            connections.append(_Record(
+                fd=-1, family=socket.AF_INET, type=socket.SOCK_STREAM,
+                laddr=_Record(ip="10.0.0.2", port=1024 + i),
+                raddr=() if listening else _Record(ip=f"192.0.2.{i % 17 + 1}", port=40000 + i),
+                status=self.CONN_LISTEN if listening else ("ESTABLISHED" if i % 3 else "TIME_WAIT"),
+                pid=None))
+        return connections
+
+
+class FakeHwmon:
+    """Дерево sysfs hwmon во временном каталоге
+
+    sockets пакетов coretemp по cores ядер на каждый и один датчик nvme.
+    update() переписывает значения temp*_input на месте, как это делает
+    ядро, - открытые дескрипторы читателя остаются действительными.
+    """
+
+    def __init__(self, root: str, sockets: int = 1, cores: int = 8):
+        self.root = root
+        self.inputs = []   # (путь, фаза)
+        chips = [("coretemp", ["Package id %d" % socket_id] + [f"Core {i}" for i in range(cores)])
+                 for socket_id in range(sockets)]
+        chips.append(("nvme", ["Composite"]))
+        for index, (name, labels) in enumerate(chips):
+            directory = os.path.join(root, f"hwmon{index}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "name"), "w") as f:
+                f.write(name + "\n")
+            for number, label in enumerate(labels, 1):
+                with open(os.path.join(directory, f"temp{number}_label"), "w") as f:
+                    f.write(label + "\n")
+                self.inputs.append((os.path.join(directory, f"temp{number}_input"), index + number))
+        self.update()
+
+    def update(self):
+        for path, phase in self.inputs:
+            millidegrees = int(40000 + 40000 * (0.5 + 0.5 * math.sin(time.time() / 60 + phase)))
+            with open(path, "w") as f:
+                f.write(f"{millidegrees}\n")
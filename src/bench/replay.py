@@ -0,0 +1,264 @@
+# Воспроизведение записанных обновлений Telegram: проверка режима webhook и
+# сравнение задержки «обновление → ответ» с long polling
+#
+#   python -m src.bench.replay updates.jsonl --url http://127.0.0.1:8443/webhook --secret СЕКРЕТ
+#   python -m src.bench.replay updates.jsonl --latency 0.05 --output replay.json
+#   python -m src.bench.replay --count 200
+#
+# Файл - по одному JSON обновления на строку (тело запроса webhook или
+# элемент result ответа getUpdates); без файла используются сценарии
+# src/bench/benchmark.py. С --url обновления отправляются запущенному боту, а
+# задержка до ответа видна в его /perf. Без --url бот поднимается здесь же
+# на имитациях (как в src/bench/benchmark.py), и одни и те же обновления проходят
+# через webhook на localhost и через dp.start_polling со StubBot; ответом
+# считается первый вызов API в чат обновления.
+import argparse
+import asyncio
+import copy
+import json
+import os
+import socket
+from collections import Counter
+
+from .benchmark import SCENARIOS, install_fakes, summarize, update_data
+from .fakes import FakeNvml
+from .stub_bot import StubBot
+
+# Чаты офлайн-прогона: у каждого обновления свой, чтобы ответ однозначно находился
+_CHAT_BASE = 10**9
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def scenario_updates(count: int, users: int) -> list:
+    scenarios = list(SCENARIOS.values())
+    return [update_data(i + 1, i % users + 1, *scenarios[i % len(scenarios)]) for i in range(count)]
+
+
+def _chat(data: dict):
+    for key in ('message', 'edited_message', 'channel_post'):
+        if key in data:
+            return data[key]['chat']
+    callback = data.get('callback_query')
+    if callback and 'message' in callback:
+        return callback['message']['chat']
+    return None
+
+
+def isolate_chats(updates: list) -> list:
+    """Копии обновлений, у каждого из которых свой chat_id"""
+    isolated = []
+    for index, data in enumerate(updates):
+        data = copy.deepcopy(data)
+        chat = _chat(data)
+        if chat is not None:
+            chat['id'] = _CHAT_BASE + index
+        isolated.append(data)
+    return isolated
+
+
+async def _paced(updates: list, rate: float, concurrency: int, send):
+    """Вызывает send(index, data) не чаще rate в секунду и не больше concurrency одновременно"""
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(index, data):
+        async with semaphore:
+            await send(index, data)
+
+    tasks = []
+    for index, data in enumerate(updates):
+        if rate > 0:
+            delay = start + index / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(index, data)))
+    await asyncio.gather(*tasks)
+
+
+async def post_updates(url: str, secret: str, updates: list, rate: float, concurrency: int) -> dict:
+    """Отправляет обновления работающему боту; задержка - до ответа HTTP (приёма обновления)"""
+    from aiohttp import ClientSession
+
+    from ..webhook import SECRET_HEADER
+
+    loop = asyncio.get_running_loop()
+    statuses = Counter()
+    latencies = []
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async with ClientSession() as session:
+        async def send(index, data):
+            start = loop.time()
+            try:
+                async with session.post(url, json=data, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except OSError as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append(loop.time() - start)
+
+        await _paced(updates, rate, concurrency, send)
+
+    result = {'statuses': {str(status): count for status, count in statuses.items()}}
+    if latencies:
+        result['accept'] = summarize(latencies)
+    return result
+
+
+async def wait_replies(bot: StubBot, sent: dict, timeout: float) -> list:
+    """Задержки от отправки обновления до первого вызова API в его чат"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    replies = {}
+    seen = 0
+    while True:
+        for moment, _, chat_id, _ in bot.calls[seen:]:
+            if chat_id in sent and chat_id not in replies:
+                replies[chat_id] = moment - sent[chat_id]
+        seen = len(bot.calls)
+        if len(replies) >= len(sent) or loop.time() > deadline:
+            return list(replies.values())
+        await asyncio.sleep(0.005)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_webhook_mode(dp, updates: list, args) -> list:
+    from aiohttp import ClientSession
+
+    from ..webhook import SECRET_HEADER, WebhookServer
+
+    bot = StubBot(latency=args.latency)
+    server = WebhookServer(dp, bot, "replay", args.concurrency, drain_timeout=args.timeout)
+    listen = f"127.0.0.1:{_free_port()}"
+    await server.start(listen, "/webhook")
+    loop = asyncio.get_running_loop()
+    sent = {}
+
+    async with ClientSession() as session:
+        async def send(index, data):
+            sent[_CHAT_BASE + index] = loop.time()
+            async with session.post(f"http://{listen}/webhook", json=data,
+                                    headers={SECRET_HEADER: "replay"}) as response:
+                await response.read()
+
+        await _paced(updates, args.rate, args.concurrency, send)
+    latencies = await wait_replies(bot, sent, args.timeout)
+    await server.stop()
+    return latencies
+
+
+async def run_polling_mode(dp, updates: list, args) -> list:
+    from aiogram.types import Update
+
+    bot = StubBot(latency=args.latency)
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    loop = asyncio.get_running_loop()
+    sent = {}
+
+    async def send(index, data):
+        sent[_CHAT_BASE + index] = loop.time()
+        bot.updates.put_nowait(Update.model_validate(data, context={'bot': bot}))
+
+    await _paced(updates, args.rate, len(updates) or 1, send)
+    latencies = await wait_replies(bot, sent, args.timeout)
+    await dp.stop_polling()
+    await polling
+    return latencies
+
+
+async def replay_offline(updates: list, args) -> dict:
+    from aiogram import Dispatcher, Router
+    from aiogram.types import Update
+
+    from ..bot_handlers import register_handlers
+    from ..sensors import gpu_backend, init_gpu
+    from ..sampler import sampler
+
+    gpu_backend.nvml = FakeNvml(args.gpus)
+    await init_gpu()
+    sampler_task = asyncio.create_task(sampler.run())
+    await sampler.snapshot()
+
+    dp = Dispatcher()
+    router = Router()
+    register_handlers(router)
+    dp.include_router(router)
+
+    updates = isolate_chats(updates)
+    # Прогрев: первый вызов обработчика платит за импорты и первичные замеры,
+    # иначе это досталось бы режиму, который идёт первым
+    warmup = StubBot()
+    await asyncio.gather(*(dp.feed_update(warmup, Update.model_validate(data, context={'bot': warmup}))
+                           for data in updates))
+    result = {}
+    for mode, run in (('webhook', run_webhook_mode), ('polling', run_polling_mode)):
+        latencies = await run(dp, updates, args)
+        result[mode] = summarize(latencies) if latencies else {'count': 0}
+        result[mode]['sent'] = len(updates)
+    sampler_task.cancel()
+    return result
+
+
+def print_result(result: dict):
+    if 'statuses' in result:
+        print("Ответы сервера: " + ", ".join(f"{status}: {count}" for status, count in result['statuses'].items()))
+        if 'accept' in result:
+            stats = result['accept']
+            print(f"Приём обновления: p50 {stats['p50_ms']} мс, p95 {stats['p95_ms']} мс, "
+                  f"p99 {stats['p99_ms']} мс, max {stats['max_ms']} мс")
+        return
+    print(f"{'режим':<10} {'ответов':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (мс)")
+    for mode, stats in result.items():
+        if not stats['count']:
+            print(f"{mode:<10} {0:>4}/{stats['sent']:<4}")
+            continue
+        print(f"{mode:<10} {stats['count']:>4}/{stats['sent']:<4} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение обновлений Telegram через webhook и polling")
+    parser.add_argument("updates", nargs="?", help="файл JSONL с обновлениями (без него - сценарии бенчмарка)")
+    parser.add_argument("--url", help="webhook запущенного бота; без него прогон офлайн на имитациях")
+    parser.add_argument("--secret", default="", help="секрет webhook (WEBHOOK_SECRET бота)")
+    parser.add_argument("--count", type=int, default=100, help="число обновлений из сценариев")
+    parser.add_argument("--rate", type=float, default=50.0, help="обновлений в секунду (0 - без паузы)")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных запросов webhook")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка одного вызова API (сек), офлайн")
+    parser.add_argument("--users", type=int, default=20, help="число пользователей, офлайн")
+    parser.add_argument("--timeout", type=float, default=30.0, help="предел ожидания ответов (сек)")
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.set_defaults(processes=300, partitions=4, cores=8, gpus=1, sample_interval=0.2)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    updates = load_updates(args.updates) if args.updates else scenario_updates(args.count, args.users)
+
+    if args.url:
+        result = asyncio.run(post_updates(args.url, args.secret, updates, args.rate, args.concurrency))
+    else:
+        install_fakes(args)
+        # Кэш отчётов уравнял бы режимы по-разному в зависимости от порядка прогона
+        os.environ.update({'REPORT_CACHE_TTL': "0", 'REPORT_CACHE_TTLS': ""})
+        result = asyncio.run(replay_offline(updates, args))
+    print_result(result)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультат сохранён в {output}")
+
+
+if __name__ == '__main__':
+    main()
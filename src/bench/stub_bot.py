@@ -0,0 +1,88 @@
+# Имитация Telegram Bot API для бенчмарка и проверок без сети
+import asyncio
+from datetime import datetime
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (SendMessage, EditMessageText, EditMessageReplyMarkup,
+                             DeleteMessage, GetUpdates)
+from aiogram.types import Chat, Message, User
+
+
+class _StubSession:
+    timeout = None
+
+    async def close(self):
+        pass
+
+
+class StubBot:
+    """Имитация aiogram.Bot без сети
+
+    Принимает методы API так же, как Bot (await bot(method)), поэтому
+    с ним работают message.answer(), callback.answer() и т.п. Каждый вызов
+    запоминается в calls как (момент, метод, chat_id, текст).
+    latency - задержка одного вызова (сек), для отдельных чатов - slow_chats;
+    retry_after - сколько первых сообщений в каждый чат отвечают RetryAfter.
+    Для dp.start_polling обновления кладутся в очередь updates: getUpdates
+    ждёт первое из них до своего timeout и забирает всё накопившееся.
+    """
+
+    def __init__(self, latency: float = 0.0, slow_chats=None, retry_after: int = 0):
+        self.id = 1
+        self.latency = latency
+        self.slow_chats = slow_chats or {}
+        self.retry_after = retry_after
+        self.calls = []
+        self.updates = asyncio.Queue()
+        self.session = _StubSession()
+        self._attempts = {}
+        self._next_message_id = 1
+
+    async def me(self):
+        return User(id=self.id, is_bot=True, first_name="Stub", username="stub_bot")
+
+    async def _get_updates(self, method):
+        try:
+            updates = [await asyncio.wait_for(self.updates.get(), method.timeout or 0)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+    async def __call__(self, method, request_timeout=None):
+        chat_id = getattr(method, 'chat_id', None)
+        await asyncio.sleep(self.slow_chats.get(chat_id, self.latency))
+        if isinstance(method, GetUpdates):
+            return await self._get_updates(method)
+        name = type(method).__name__
+        if isinstance(method, SendMessage):
+            attempts = self._attempts.get(chat_id, 0)
+            self._attempts[chat_id] = attempts + 1
+            if attempts < self.retry_after:
+                raise TelegramRetryAfter(method, "Flood control exceeded", 1)
+        text = getattr(method, 'text', None) or getattr(method, 'caption', None)
+        self.calls.append((asyncio.get_running_loop().time(), name, chat_id, text))
+        if name.startswith("Send"):
+            message_id = self._next_message_id
+            self._next_message_id += 1
+            return Message(message_id=message_id, date=datetime.now(),
+                           chat=Chat(id=chat_id, type="private"),
+                           text=text if isinstance(text, str) else None).as_(self)
+        if name.startswith("Edit") and getattr(method, 'message_id', None) is not None:
+            return Message(message_id=method.message_id, date=datetime.now(),
+                           chat=Chat(id=chat_id, type="private"),
+                           text=text if isinstance(text, str) else None).as_(self)
+        return True
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self(SendMessage(chat_id=chat_id, text=text, **kwargs))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        return await self(EditMessageText(text=text, chat_id=chat_id, message_id=message_id, **kwargs))
+
+    async def edit_message_reply_markup(self, chat_id=None, message_id=None, **kwargs):
+        return await self(EditMessageReplyMarkup(chat_id=chat_id, message_id=message_id, **kwargs))
+
+    async def delete_message(self, chat_id, message_id, **kwargs):
+        return await self(DeleteMessage(chat_id=chat_id, message_id=message_id, **kwargs))
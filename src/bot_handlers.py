@@ -1,17 +1,39 @@
 from aiogram import Bot, Router, F
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, FSInputFile
+from aiogram.types import (Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton,
+                           InlineKeyboardMarkup, InlineKeyboardButton,
+                           BufferedInputFile, FSInputFile, InputMediaPhoto)
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import psutil
 from datetime import datetime
+import asyncio
+import html
+import math
+import os
 import re
+import socket
+import time
 
-from .utils import log_command, is_user_allowed, execute_command
-from .hardware_monitor import (get_system_info, get_cpu_temp, get_gpu_info,
-                            plot_cpu_graph)
-from .config import FORBIDDEN_COMMANDS
+from .utils import log_command, is_user_allowed, is_admin
+from .middlewares import AuditMiddleware
+from .hardware_monitor import (get_system_info, format_gpu_value, plot_cpu_graph,
+                               CPU_GRAPH_WINDOWS)
+from .sampler import sampler
+from .aggregator import agent_server, selected_hosts, get_source
+from .dashboard import dashboard, WATCH_VIEWS
+from .report_cache import report_cache
+from .disks import disk_scanner
+from .connections import connection_tracker
+from .perf import perf
+from .process_scanner import scanner, SORT_KEYS
+from .watchlist import watchlist, MAX_TARGETS
+from .history import history, HISTORY_METRICS
+from .audit_search import audit_log, AuditQuery
+from .jobs import scheduler, DONE as JOB_DONE
+from .config import FORBIDDEN_COMMANDS, WEBHOOK_URL, AUDIT_PAGE_SIZE, JOBS_PER_USER
 
 class ConsoleStates(StatesGroup):
     waiting_for_command = State()
@@ -24,12 +46,40 @@ def get_main_keyboard():
             [KeyboardButton(text="🎮 GPU"), KeyboardButton(text="🔥 Температура")],
             [KeyboardButton(text="💾 Диск"), KeyboardButton(text="🌐 Сеть")],
             [KeyboardButton(text="📋 Процессы"), KeyboardButton(text="⏱️ Аптайм")],
-            [KeyboardButton(text="⌨️ Консоль")],
+            [KeyboardButton(text="⌨️ Консоль"), KeyboardButton(text="🖧 Хосты")],
         ],
         resize_keyboard=True
     )
     return keyboard
 
+def host_header(source) -> str:
+    """Заголовок отчёта для удалённого хоста (для локального пусто)"""
+    return "" if source is sampler else f"🖧 *Хост:* {source.name}\n\n"
+
+def get_hosts_keyboard(current: str):
+    now = time.time()
+    rows = [[InlineKeyboardButton(
+        text=f"{'• ' if current == sampler.name else ''}🏠 Этот сервер",
+        callback_data=f"host:{sampler.name}"
+    )]]
+    for name in sorted(agent_server.hosts):
+        online = now - agent_server.last_seen.get(name, 0) < 60
+        rows.append([InlineKeyboardButton(
+            text=f"{'• ' if current == name else ''}{'🟢' if online else '⚪'} {name}",
+            callback_data=f"host:{name}"
+        )])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def get_cpu_graph_keyboard(current: int):
+    buttons = [
+        InlineKeyboardButton(
+            text=f"• {label} •" if window == current else label,
+            callback_data=f"cpu_graph:{window}"
+        )
+        for window, label in CPU_GRAPH_WINDOWS.items()
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
 async def cmd_start(message: Message):
     log_command(message.from_user.id, "/start")
     
@@ -52,6 +102,15 @@ async def cmd_help(message: Message):
 /start - Запустить бота
 /help - Показать справку
 /status - Показать общую информацию о сервере
+/history <метрика> <диапазон> - История метрики (например, /history cpu 6h)
+/hosts - Выбрать хост для отчётов
+/watch - Живая панель мониторинга, обновляемая в одном сообщении
+/watch_proc <имя|PID> - Следить за процессом: история RSS, CPU, потоков, FD, IO и поиск утечек памяти
+/unwatch_proc <имя|PID> - Убрать процесс из наблюдения
+/jobs - Задания консоли (команда с & в конце выполняется в фоне)
+/kill <номер> - Остановить задание вместе с его дочерними процессами
+/perf - Задержки обработчиков, зависания event loop и нагрузка сборщика (для администраторов)
+/audit [user=ID] [from=…] [to=…] [текст] - Поиск по журналу команд (для администраторов)
 
 *Доступные функции через кнопки:*
 📊 Общая информация - Базовая информация о системе
@@ -64,6 +123,7 @@ async def cmd_help(message: Message):
 📋 Процессы - Список активных процессов
 ⏱️ Аптайм - Время работы сервера
 ⌨️ Консоль - Консоль для управления сервером
+🖧 Хосты - Выбор сервера, о котором показываются отчёты
 """
     await message.answer(help_text, parse_mode=ParseMode.MARKDOWN)
 
@@ -73,83 +133,107 @@ async def cmd_status(message: Message):
     else:
         log_command(message.from_user.id, "📊 Общая информация")
     
-    status_message = await message.answer("⏳ Сбор информации о системе...")
-    system_info = await get_system_info()
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=status_message.message_id)
+    system_info = await get_system_info(get_source(message.from_user.id))
     await message.answer(system_info, parse_mode=ParseMode.MARKDOWN)
 
 async def cpu_info(message: Message):
     log_command(message.from_user.id, "🖥️ CPU")
     
-    cpu_message = await message.answer("⏳ Сбор информации о CPU...")
-    
-    physical_cores = psutil.cpu_count(logical=False)
-    total_cores = psutil.cpu_count(logical=True)
-    
-    avg_temp, core_temps = await get_cpu_temp()
+    source = get_source(message.from_user.id)
+    snapshot = await source.snapshot()
     
-    cpu_freq = psutil.cpu_freq()
+    cpu_info = host_header(source) + f"*Информация о CPU:*\n"
+    cpu_info += f"*Температура CPU:* {format_gpu_value(snapshot.cpu_temp, '°C')}\n"
+    if source.cpu_count_physical:
+        cpu_info += f"*Физические ядра:* {source.cpu_count_physical}\n"
+    cpu_info += f"*Всего ядер:* {source.cpu_count_logical}\n"
     
-    cpu_usage_per_core = psutil.cpu_percent(percpu=True, interval=1)
+    if not math.isnan(source.cpu_freq_max):
+        cpu_info += f"*Максимальная частота:* {source.cpu_freq_max:.2f}MHz\n"
+        cpu_info += f"*Минимальная частота:* {source.cpu_freq_min:.2f}MHz\n"
+    if not math.isnan(snapshot.cpu_freq):
+        cpu_info += f"*Текущая частота:* {snapshot.cpu_freq:.2f}MHz\n"
     
-    cpu_info = f"*Информация о CPU:*\n"
-    cpu_info += f"*Температура CPU:* {avg_temp:.1f}°C\n"
-    cpu_info += f"*Физические ядра:* {physical_cores}\n"
-    cpu_info += f"*Всего ядер:* {total_cores}\n"
-    
-    if cpu_freq:
-        cpu_info += f"*Максимальная частота:* {cpu_freq.max:.2f}MHz\n"
-        cpu_info += f"*Минимальная частота:* {cpu_freq.min:.2f}MHz\n"
-        cpu_info += f"*Текущая частота:* {cpu_freq.current:.2f}MHz\n"
-    
-    cpu_info += f"*Общая загрузка CPU:* {psutil.cpu_percent()}%\n\n"
+    cpu_info += f"*Общая загрузка CPU:* {snapshot.cpu:.1f}%\n\n"
     
     cpu_info += "*Загрузка по ядрам:*\n"
-    for i, percentage in enumerate(cpu_usage_per_core):
+    for i, percentage in enumerate(snapshot.per_core):
         cpu_info += f"*Ядро {i+1}:* {percentage}%\n"
     
-    plot_cpu_graph()
-    photo = FSInputFile("logs/cpu_graph.png")
-    await message.answer_photo(photo)
+    window = next(iter(CPU_GRAPH_WINDOWS))
+    png = await plot_cpu_graph(window, source)
+    await message.answer_photo(
+        BufferedInputFile(png, filename="cpu_graph.png"),
+        reply_markup=get_cpu_graph_keyboard(window)
+    )
     
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=cpu_message.message_id)
     await message.answer(cpu_info, parse_mode=ParseMode.MARKDOWN)
 
+async def cpu_graph_window(callback: CallbackQuery):
+    if not is_user_allowed(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+
+    window = int(callback.data.split(":", 1)[1])
+    if window not in CPU_GRAPH_WINDOWS:
+        await callback.answer()
+        return
+    log_command(callback.from_user.id, f"🖥️ CPU график {CPU_GRAPH_WINDOWS[window]}")
+
+    png = await plot_cpu_graph(window, get_source(callback.from_user.id))
+    try:
+        await callback.message.edit_media(
+            InputMediaPhoto(media=BufferedInputFile(png, filename="cpu_graph.png")),
+            reply_markup=get_cpu_graph_keyboard(window)
+        )
+    except TelegramBadRequest:
+        # Повторное нажатие на то же окно: сообщение не изменилось
+        pass
+    await callback.answer()
+
 async def ram_info(message: Message):
     log_command(message.from_user.id, "🧠 RAM")
     
-    ram_message = await message.answer("⏳ Сбор информации о RAM...")
+    source = get_source(message.from_user.id)
+    snapshot = await source.snapshot()
     
-    memory = psutil.virtual_memory()
-    swap = psutil.swap_memory()
-    
-    ram_info = f"*Информация о RAM:*\n"
-    ram_info += f"*Всего:* {memory.total / (1024**3):.2f} GB\n"
-    ram_info += f"*Доступно:* {memory.available / (1024**3):.2f} GB\n"
-    ram_info += f"*Использовано:* {memory.used / (1024**3):.2f} GB\n"
-    ram_info += f"*Процент использования:* {memory.percent}%\n\n"
+    ram_info = host_header(source) + f"*Информация о RAM:*\n"
+    ram_info += f"*Всего:* {snapshot.mem_total / (1024**3):.2f} GB\n"
+    ram_info += f"*Доступно:* {snapshot.mem_available / (1024**3):.2f} GB\n"
+    ram_info += f"*Использовано:* {snapshot.mem_used / (1024**3):.2f} GB\n"
+    ram_info += f"*Процент использования:* {snapshot.mem_percent}%\n\n"
     
     ram_info += f"*Информация о SWAP:*\n"
-    ram_info += f"*Всего:* {swap.total / (1024**3):.2f} GB\n"
-    ram_info += f"*Использовано:* {swap.used / (1024**3):.2f} GB\n"
-    ram_info += f"*Свободно:* {swap.free / (1024**3):.2f} GB\n"
-    ram_info += f"*Процент использования:* {swap.percent}%\n"
+    ram_info += f"*Всего:* {snapshot.swap_total / (1024**3):.2f} GB\n"
+    ram_info += f"*Использовано:* {snapshot.swap_used / (1024**3):.2f} GB\n"
+    ram_info += f"*Свободно:* {snapshot.swap_free / (1024**3):.2f} GB\n"
+    ram_info += f"*Процент использования:* {snapshot.swap_percent}%\n"
     
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=ram_message.message_id)
     await message.answer(ram_info, parse_mode=ParseMode.MARKDOWN)
 
 async def gpu_info(message: Message):
     log_command(message.from_user.id, "🎮 GPU")
     
-    temp_message = await message.answer("⏳ Сбор информации о GPU...")
-    gpu_utilization, gpu_temp = get_gpu_info()
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=temp_message.message_id)
-    if gpu_utilization is not None:
-        info = (
-            f"*Информация о GPU:*\n"
-            f"Загрузка GPU: {gpu_utilization}\n"
-            f"Температура GPU: {gpu_temp}"
-        )
+    source = get_source(message.from_user.id)
+    snapshot = await source.snapshot()
+    if snapshot.gpus:
+        info = host_header(source) + "*Информация о GPU:*\n"
+        for gpu in snapshot.gpus:
+            info += f"\n*GPU {gpu.index}:* {gpu.name}\n"
+            info += f"Загрузка GPU: {format_gpu_value(gpu.utilization, '%')}\n"
+            info += f"Температура GPU: {format_gpu_value(gpu.temperature, '°C')}\n"
+            if not math.isnan(gpu.memory_total):
+                info += (f"Память: {gpu.memory_used / (1024**3):.2f} / "
+                         f"{gpu.memory_total / (1024**3):.2f} GB\n")
+            if not math.isnan(gpu.power):
+                info += f"Питание: {gpu.power:.0f} / {format_gpu_value(gpu.power_limit, ' W')}\n"
+            if not math.isnan(gpu.clock_sm):
+                info += f"Частоты: ядро {gpu.clock_sm:.0f} MHz, память {format_gpu_value(gpu.clock_memory, ' MHz')}\n"
+    elif not math.isnan(snapshot.gpu_util):
+        # Агенты присылают только сводные показатели GPU
+        info = host_header(source) + "*Информация о GPU:*\n"
+        info += f"Загрузка GPU: {format_gpu_value(snapshot.gpu_util, '%')}\n"
+        info += f"Температура GPU: {format_gpu_value(snapshot.gpu_temp, '°C')}\n"
     else:
         info = "❌ Данные о GPU недоступны."
     await message.answer(info, parse_mode=ParseMode.MARKDOWN)
@@ -157,85 +241,178 @@ async def gpu_info(message: Message):
 async def temp_info(message: Message):
     log_command(message.from_user.id, "🔥 Температура")
     
-    temp_message = await message.answer("⏳ Сбор информации о температуре...")
-    avg_temp, core_temps = await get_cpu_temp()
-    gpu_utilization, gpu_temp = get_gpu_info()
+    source = get_source(message.from_user.id)
+    snapshot = await source.snapshot()
+    has_cpu_temp = not math.isnan(snapshot.cpu_temp)
+    has_gpu_temp = not math.isnan(snapshot.gpu_temp)
     
-    if avg_temp is None and gpu_temp is None:
-        await message.bot.delete_message(chat_id=message.chat.id, message_id=temp_message.message_id)
+    if not has_cpu_temp and not has_gpu_temp:
         await message.answer("❌ Температура недоступна.", parse_mode=ParseMode.MARKDOWN)
         return
         
-    temp_info = "*Информация о температуре:*\n"
-    if avg_temp is not None:
-        temp_info += f"*Общая температура процессора:* {avg_temp:.1f}°C\n\n"
-        temp_info += "*Температура по ядрам:*\n"
-        for i, temp in core_temps.items():
-            temp_info += f"*Ядро {i+1}:* {temp:.1f}°C\n"
+    temp_info = host_header(source) + "*Информация о температуре:*\n"
+    if has_cpu_temp:
+        temp_info += f"*Общая температура процессора:* {snapshot.cpu_temp:.1f}°C\n\n"
+    # Датчики сгруппированы по чипам: пакеты, ядра и прочие
+    current_chip = None
+    for (chip, label), temp in snapshot.core_temps.items():
+        if chip != current_chip:
+            if current_chip is not None:
+                temp_info += "\n"
+            temp_info += f"*{escape_markdown(chip)}:*\n"
+            current_chip = chip
+        temp_info += f"{escape_markdown(label)}: {temp:.1f}°C\n"
+    if current_chip is not None:
         temp_info += "\n"
-    if gpu_temp is not None:
-        temp_info += f"*Температура GPU:* {gpu_temp}\n"
+    if has_gpu_temp:
+        temp_info += f"*Температура GPU:* {format_gpu_value(snapshot.gpu_temp, '°C')}\n"
+        if len(snapshot.gpus) > 1:
+            for gpu in snapshot.gpus:
+                temp_info += f"*GPU {gpu.index}:* {format_gpu_value(gpu.temperature, '°C')}\n"
         
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=temp_message.message_id)
     await message.answer(temp_info, parse_mode=ParseMode.MARKDOWN)
 
+def escape_markdown(text: str) -> str:
+    """Экранирует специальные символы для Markdown (v1)"""
+    for char in ('_', '*', '`', '['):
+        text = text.replace(char, f'\\{char}')
+    return text
+
+def format_speed(bytes_per_second: float) -> str:
+    if bytes_per_second >= 1024**2:
+        return f"{bytes_per_second / 1024**2:.1f} MB/s"
+    return f"{bytes_per_second / 1024:.1f} KB/s"
+
+# Предел длины сообщения Telegram (символов)
+_MESSAGE_LIMIT = 4096
+
+def fit_message(lines, limit: int = _MESSAGE_LIMIT) -> str:
+    """Склеивает строки, обрезая по границе строки, чтобы разметка не разорвалась"""
+    text = "\n".join(lines)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit - 2)
+    return text[:max(cut, 0)] + "\n…"
+
+async def build_partitions_report() -> list:
+    """Блоки разделов: сначала не ответившие, затем по убыванию заполненности"""
+    results = sorted(await disk_scanner.scan(),
+                     key=lambda result: -1.0 if result.error else -result.usage.percent)
+    blocks = []
+    for result in results:
+        partition = result.partition
+        lines = [
+            f"*Раздел:* {escape_markdown(partition.mountpoint)}",
+            f"*Файловая система:* {escape_markdown(partition.fstype)}",
+        ]
+        if result.error:
+            lines.append(f"❌ {result.error}")
+        else:
+            partition_usage = result.usage
+            lines += [
+                f"*Всего:* {partition_usage.total / (1024**3):.2f} GB",
+                f"*Использовано:* {partition_usage.used / (1024**3):.2f} GB",
+                f"*Свободно:* {partition_usage.free / (1024**3):.2f} GB",
+                f"*Процент использования:* {partition_usage.percent}%",
+            ]
+        blocks.append("\n".join(lines) + "\n")
+    return blocks
+
+async def build_disk_report(source) -> str:
+    header = [host_header(source) + "*Информация о дисках:*", ""]
+    
+    snapshot = await source.snapshot()
+    lines = []
+    devices = [(device, rates) for device, rates in sorted(snapshot.disk_rates.items())
+               if not device.startswith(("loop", "ram"))]
+    if devices:
+        lines.append("*Ввод-вывод по устройствам:*")
+        for device, (read, write, reads, writes) in devices:
+            lines.append(f"*{escape_markdown(device)}:* чтение {format_speed(read)} ({reads:.0f} IOPS), "
+                         f"запись {format_speed(write)} ({writes:.0f} IOPS)")
+        lines.append("")
+    if not math.isnan(snapshot.disk_read):
+        lines += [
+            "*Статистика дисковых операций:*",
+            f"*Всего прочитано:* {snapshot.disk_read / (1024**3):.2f} GB",
+            f"*Всего записано:* {snapshot.disk_write / (1024**3):.2f} GB",
+        ]
+    
+    # Разделы известны только для локального хоста; проверка места дорогая, поэтому кэшируется
+    if source is sampler:
+        blocks = await report_cache.get(("disk", source.name, ParseMode.MARKDOWN),
+                                        build_partitions_report)
+        # Разделов может быть много (контейнеры, сетевые ФС): не влезающие в сообщение
+        # наименее заполненные сворачиваются в одну строку
+        budget = _MESSAGE_LIMIT - len("\n".join(header + lines)) - 100
+        shown = 0
+        for block in blocks:
+            budget -= len(block) + 1
+            if budget < 0:
+                break
+            header.append(block)
+            shown += 1
+        if shown < len(blocks):
+            header += [f"_…и ещё разделов: {len(blocks) - shown}_", ""]
+    return fit_message(header + lines)
+
 async def disk_info(message: Message):
     log_command(message.from_user.id, "💾 Диск")
     
-    disk_message = await message.answer("⏳ Сбор информации о дисках...")
-    
-    disk_info = "*Информация о дисках:*\n\n"
+    disk_info = await build_disk_report(get_source(message.from_user.id))
+    await message.answer(disk_info, parse_mode=ParseMode.MARKDOWN)
+
+async def build_network_report(source) -> str:
+    lines = [host_header(source) + "*Информация о сети:*", ""]
+    snapshot = await source.snapshot()
     
-    partitions = psutil.disk_partitions()
-    for partition in partitions:
-        try:
-            partition_usage = psutil.disk_usage(partition.mountpoint)
-            disk_info += f"*Раздел:* {partition.mountpoint}\n"
-            disk_info += f"*Файловая система:* {partition.fstype}\n"
-            disk_info += f"*Всего:* {partition_usage.total / (1024**3):.2f} GB\n"
-            disk_info += f"*Использовано:* {partition_usage.used / (1024**3):.2f} GB\n"
-            disk_info += f"*Свободно:* {partition_usage.free / (1024**3):.2f} GB\n"
-            disk_info += f"*Процент использования:* {partition_usage.percent}%\n\n"
-        except:
-            continue
+    # Адреса интерфейсов известны только для локального хоста
+    net_if_addrs = psutil.net_if_addrs() if source is sampler else {}
+    for interface_name in sorted(set(net_if_addrs) | set(snapshot.nic_rates)):
+        lines.append(f"*Интерфейс:* {escape_markdown(interface_name)}")
+        for address in net_if_addrs.get(interface_name, ()):
+            if address.family == psutil.AF_LINK:
+                lines.append(f"*MAC-адрес:* {address.address}")
+            elif address.family == socket.AF_INET:
+                lines.append(f"*IPv4-адрес:* {address.address}")
+            elif address.family == socket.AF_INET6:
+                lines.append(f"*IPv6-адрес:* {escape_markdown(address.address)}")
+        rates = snapshot.nic_rates.get(interface_name)
+        if rates is not None:
+            received, sent, packets_received, packets_sent = rates
+            lines.append(f"*Приём:* {format_speed(received)} ({packets_received:.0f} пак/с)")
+            lines.append(f"*Передача:* {format_speed(sent)} ({packets_sent:.0f} пак/с)")
+        lines.append("")
     
-    disk_io = psutil.disk_io_counters()
-    if disk_io:
-        disk_info += "*Статистика дисковых операций:*\n"
-        disk_info += f"*Всего прочитано:* {disk_io.read_bytes / (1024**3):.2f} GB\n"
-        disk_info += f"*Всего записано:* {disk_io.write_bytes / (1024**3):.2f} GB\n"
+    if not math.isnan(snapshot.net_sent):
+        lines += [
+            "*Статистика сетевого ввода-вывода:*",
+            f"*Всего байт отправлено:* {snapshot.net_sent / (1024**2):.2f} MB",
+            f"*Всего байт получено:* {snapshot.net_recv / (1024**2):.2f} MB",
+            f"*Пакетов отправлено:* {int(snapshot.net_packets_sent)}",
+            f"*Пакетов получено:* {int(snapshot.net_packets_recv)}",
+        ]
     
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=disk_message.message_id)
-    await message.answer(disk_info, parse_mode=ParseMode.MARKDOWN)
+    if source is sampler:
+        summary = await connection_tracker.summary()
+        if summary is None:
+            lines += ["", f"❌ Соединения недоступны: {connection_tracker.error}"]
+        else:
+            age = time.time() - summary.taken
+            lines += ["", f"*Соединения* (снимок {age:.0f} с назад): всего {summary.total}, "
+                          f"слушают {summary.listening}"]
+            lines += [f"{escape_markdown(state)}: {count}" for state, count in summary.states]
+            if summary.remotes:
+                lines.append("*Чаще всего с адресами:*")
+                lines += [f"{escape_markdown(address)}: {count}" for address, count in summary.remotes]
+    return "\n".join(lines)
 
 async def network_info(message: Message):
     log_command(message.from_user.id, "🌐 Сеть")
     
-    network_message = await message.answer("⏳ Сбор информации о сети...")
-    
-    network_info = "*Информация о сети:*\n\n"
-    
-    net_if_addrs = psutil.net_if_addrs()
-    for interface_name, interface_addresses in net_if_addrs.items():
-        network_info += f"*Интерфейс:* {interface_name}\n"
-        for address in interface_addresses:
-            if address.family == psutil.AF_LINK:
-                network_info += f"*MAC-адрес:* {address.address}\n"
-            elif address.family == 2:  # IPv4
-                network_info += f"*IPv4-адрес:* {address.address}\n"
-            elif address.family == 30:  # IPv6
-                network_info += f"*IPv6-адрес:* {address.address}\n"
-        network_info += "\n"
-    
-    net_io = psutil.net_io_counters()
-    if net_io:
-        network_info += "*Статистика сетевого ввода-вывода:*\n"
-        network_info += f"*Всего байт отправлено:* {net_io.bytes_sent / (1024**2):.2f} MB\n"
-        network_info += f"*Всего байт получено:* {net_io.bytes_recv / (1024**2):.2f} MB\n"
-        network_info += f"*Пакетов отправлено:* {net_io.packets_sent}\n"
-        network_info += f"*Пакетов получено:* {net_io.packets_recv}\n"
-    
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=network_message.message_id)
+    source = get_source(message.from_user.id)
+    network_info = await report_cache.get(("network", source.name, ParseMode.MARKDOWN),
+                                          lambda: build_network_report(source))
     await message.answer(network_info, parse_mode=ParseMode.MARKDOWN)
 
 def escape_markdown_v2(text: str) -> str:
@@ -245,38 +422,154 @@ def escape_markdown_v2(text: str) -> str:
         text = text.replace(char, f'\\{char}')
     return text
 
+def get_process_keyboard(current: str):
+    buttons = [
+        InlineKeyboardButton(
+            text=f"• {label} •" if key == current else label,
+            callback_data=f"proc_sort:{key}"
+        )
+        for key, label in SORT_KEYS.items()
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+async def build_process_report(sort_by: str) -> str:
+    top, total = await scanner.top(sort_by, 10)
+    
+    processes_info = "<b>Информация о процессах:</b>\n\n"
+    processes_info += f"<b>Топ-10 процессов по {SORT_KEYS[sort_by]}:</b>\n"
+    
+    for i, proc in enumerate(top, 1):
+        processes_info += f"{i}. <b>PID:</b> {proc.pid}, <b>Имя:</b> {html.escape(proc.name)}, <b>CPU:</b> {proc.cpu:.1f}%, <b>RAM:</b> {proc.ram:.1f}%"
+        if sort_by == 'io':
+            io = "н/д" if proc.io is None else f"{proc.io / 1024:.1f} KB/s"
+            processes_info += f", <b>IO:</b> {io}"
+        elif sort_by == 'fds':
+            processes_info += f", <b>FD:</b> {'н/д' if proc.fds is None else proc.fds}"
+        processes_info += "\n"
+    
+    processes_info += f"\n<b>Всего процессов:</b> {total}"
+    return processes_info
+
 async def process_info(message: Message):
     log_command(message.from_user.id, "📋 Процессы")
     
-    process_message = await message.answer("⏳ Сбор информации о процессах...")
+    processes_info = await build_process_report('cpu')
     
-    processes_info = "<b>Информация о процессах:</b>\n\n"
-    processes_info += "<b>Топ-10 процессов по использованию CPU:</b>\n"
+    await message.answer(processes_info, parse_mode=ParseMode.HTML,
+                         reply_markup=get_process_keyboard('cpu'))
+
+async def process_sort(callback: CallbackQuery):
+    if not is_user_allowed(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+
+    sort_by = callback.data.split(":", 1)[1]
+    if sort_by not in SORT_KEYS:
+        await callback.answer()
+        return
+    log_command(callback.from_user.id, f"📋 Процессы по {SORT_KEYS[sort_by]}")
+
+    processes_info = await build_process_report(sort_by)
+    try:
+        await callback.message.edit_text(processes_info, parse_mode=ParseMode.HTML,
+                                         reply_markup=get_process_keyboard(sort_by))
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
+
+# Имя процесса или PID для /watch_proc
+WATCH_PROC_PATTERN = re.compile(r"[\w.@:+-]{1,64}")
+# Сколько процессов одной цели показывать
+_WATCH_PROC_ROWS = 5
+
+def build_watchlist_report() -> str:
+    if not watchlist.targets:
+        return "Список наблюдения пуст. Добавьте процесс: /watch_proc &lt;имя|PID&gt;"
     
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent']):
-        try:
-            proc_info = proc.info
-            proc_info['cpu_percent'] = proc.cpu_percent(interval=0.1)
-            processes.append(proc_info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    report = f"<b>Наблюдение за процессами</b> (история {watchlist.window / 60:.0f} мин):\n"
+    for target in list(watchlist.targets.values()):
+        processes = sorted(target.processes.values(), reverse=True,
+                           key=lambda process: (process.samples.latest() or (0, 0))[1])
+        report += f"\n<b>{html.escape(target.name or target.spec)}</b>"
+        if target.spec.isdigit():
+            report += f" (добавлен по PID {target.spec})"
+        report += f": процессов {len(processes)}"
+        if target.started or target.exited:
+            report += f", новых {target.started}, завершилось {target.exited}"
+        report += "\n"
+        if not processes:
+            report += "  не запущен\n"
+            continue
+        for process in processes[:_WATCH_PROC_ROWS]:
+            row = process.samples.latest()
+            if row is None:
+                report += f"• PID {process.pid}: ещё нет замеров\n"
+                continue
+            _, rss, cpu, threads, fds = row[:5]
+            read, write = process.io_rates()
+            trend = process.last_trend
+            report += f"• PID {process.pid}: RSS {rss / 1024**2:.1f} MB"
+            if trend is not None and trend.span:
+                report += f" ({trend.slope * 3600 / 1024**2:+.1f} MB/ч, R² {trend.r2:.2f})"
+            report += (f", CPU {format_gpu_value(cpu, '%')}, потоков {threads:.0f}, "
+                       f"FD {'н/д' if math.isnan(fds) else f'{fds:.0f}'}")
+            if not math.isnan(read):
+                report += f", IO ↓ {format_speed(read)} ↑ {format_speed(write)}"
+            report += "\n"
+            if process.leaking:
+                report += "  ⚠️ <b>RSS растёт по линейному тренду — возможна утечка памяти</b>\n"
+        if len(processes) > _WATCH_PROC_ROWS:
+            report += f"  … и ещё {len(processes) - _WATCH_PROC_ROWS}\n"
+    return report
+
+async def cmd_watch_proc(message: Message):
+    log_command(message.from_user.id, message.text)
     
-    processes = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
     
-    for i, proc in enumerate(processes[:10], 1):
-        processes_info += f"{i}. <b>PID:</b> {proc['pid']}, <b>Имя:</b> {proc['name']}, <b>CPU:</b> {proc['cpu_percent']:.1f}%, <b>RAM:</b> {proc['memory_percent']:.1f}%\n"
+    args = message.text.split()[1:]
+    header = ""
+    if args:
+        spec = args[0]
+        if not WATCH_PROC_PATTERN.fullmatch(spec):
+            await message.answer("Использование: /watch_proc <имя процесса|PID>")
+            return
+        if spec not in watchlist.targets and len(watchlist.targets) >= MAX_TARGETS:
+            await message.answer(f"❌ В списке наблюдения уже {MAX_TARGETS} процессов. "
+                                 "Уберите лишние: /unwatch_proc <имя|PID>")
+            return
+        target = await watchlist.add(spec)
+        if target.pid is not None and not target.processes:
+            watchlist.remove(spec)
+            await message.answer(f"❌ Процесс с PID {spec} не найден.")
+            return
+        header = (f"👁 <b>{html.escape(target.name or spec)}</b> в списке наблюдения "
+                  f"(найдено процессов: {len(target.processes)}), замер каждые "
+                  f"{watchlist.interval:g} сек.\n\n")
     
-    processes_info += f"\n<b>Всего процессов:</b> {len(processes)}"
+    await message.answer(header + build_watchlist_report(), parse_mode=ParseMode.HTML)
+
+async def cmd_unwatch_proc(message: Message):
+    log_command(message.from_user.id, message.text)
     
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=process_message.message_id)
-    await message.answer(processes_info, parse_mode=ParseMode.HTML)
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    args = message.text.split()[1:]
+    if not args:
+        await message.answer("Использование: /unwatch_proc <имя процесса|PID>")
+        return
+    if watchlist.remove(args[0]):
+        await message.answer(f"✅ {html.escape(args[0])} убран из списка наблюдения.", parse_mode=ParseMode.HTML)
+    else:
+        await message.answer(f"❌ {html.escape(args[0])} нет в списке наблюдения.", parse_mode=ParseMode.HTML)
 
 async def uptime_info(message: Message):
     log_command(message.from_user.id, "⏱️ Аптайм")
     
-    uptime_message = await message.answer("⏳ Сбор информации об аптайме...")
-    
     boot_time = datetime.fromtimestamp(psutil.boot_time())
     uptime = datetime.now() - boot_time
     
@@ -288,7 +581,6 @@ async def uptime_info(message: Message):
     uptime_info += f"*Время запуска:* {boot_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
     uptime_info += f"*Аптайм:* {days} дн. {hours} ч. {minutes} мин. {seconds} сек."
     
-    await message.bot.delete_message(chat_id=message.chat.id, message_id=uptime_message.message_id)
     await message.answer(uptime_info, parse_mode=ParseMode.MARKDOWN)
 
 async def console_command(message: Message, state: FSMContext):
@@ -302,6 +594,7 @@ async def console_command(message: Message, state: FSMContext):
     await message.answer(
         "🖥️ Режим консоли активирован.\n\n"
         "Введите команду для выполнения.\n"
+        "Команда с & в конце выполняется в фоне, список заданий - /jobs.\n"
         "Для выхода введите 'exit' или 'quit'.\n\n"
         "⚠️ Примечание: некоторые команды заблокированы в целях безопасности."
     )
@@ -323,14 +616,443 @@ async def handle_console_command(message: Message, state: FSMContext):
         await message.answer(f"⛔ Команда '{base_cmd}' запрещена к выполнению.")
         return
 
-    log_command(message.from_user.id, f"Console: {command}")
+    # "команда &" - сразу в фон, с таймаутом JOB_TIMEOUT
+    background = command.endswith("&")
+    if background:
+        command = command[:-1].strip()
+        if not command:
+            return
+
+    log_command(message.from_user.id, f"Console: {command}{' &' if background else ''}")
+    
+    async def show_output(text: str, status: str, reply_markup=None):
+        try:
+            await progress.edit_text(
+                f"📝 Результат выполнения команды:\n\n<pre>{html.escape(text)}</pre>\n{status}",
+                parse_mode=ParseMode.HTML, reply_markup=reply_markup
+            )
+        except TelegramBadRequest:
+            # Текст не изменился с прошлой правки
+            pass
+    
+    async def on_output(tail: str):
+        await show_output(tail, f"⏳ Выполняется (задание #{job.id})...", get_job_keyboard(job))
+    
+    async def on_finish(job):
+        result = job.result
+        if result.error:
+            await progress.edit_text(result.error)
+            return
+        
+        if job.killed:
+            status = "🛑 Команда остановлена"
+        elif result.timed_out:
+            status = f"Ошибка: превышено время выполнения команды ({job.timeout} секунд)"
+        elif result.returncode == 0:
+            status = "✅ Команда выполнена"
+        else:
+            status = f"❌ Код завершения: {result.returncode}"
+        if job.background:
+            # Правка сообщения не приходит уведомлением
+            await progress.reply(f"{status}: задание #{job.id} <code>{html.escape(job.command)}</code>",
+                                 parse_mode=ParseMode.HTML)
+        
+        if result.size == 0:
+            await progress.edit_text(f"{status} (нет вывода)")
+            return
+        
+        if result.complete:
+            await show_output(result.tail, status)
+            return
+        
+        # Вывод не помещается в сообщение: хвост в сообщении, полностью - файлом
+        await show_output("...\n" + result.tail, f"{status}\n📎 Полный вывод во вложении")
+        path = await asyncio.to_thread(result.compress)
+        try:
+            await message.answer_document(FSInputFile(path, filename="output.txt.gz"))
+        finally:
+            os.unlink(path)
+    
+    queued = len(scheduler.active()) >= scheduler.max_concurrent
+    job = scheduler.create(message.from_user.id, command, background,
+                           on_output=None if background else on_output, on_finish=on_finish)
+    if job is None:
+        await message.answer(f"⛔ У вас уже {JOBS_PER_USER} незавершённых заданий, "
+                             "дождитесь их или остановите через /kill <номер>.")
+        return
+    try:
+        progress = await message.answer(
+            f"⏳ Задание #{job.id} {'в очереди' if queued else 'выполняется'}"
+            f"{' в фоне, результат придёт ответом на это сообщение' if background else '...'}",
+            reply_markup=get_job_keyboard(job)
+        )
+    except Exception:
+        scheduler.discard(job)
+        raise
+    scheduler.start(job)
+
+def get_job_keyboard(job):
+    buttons = [InlineKeyboardButton(text="⏹ Остановить", callback_data=f"job:kill:{job.id}")]
+    if not job.background:
+        buttons.insert(0, InlineKeyboardButton(text="📥 В фон", callback_data=f"job:detach:{job.id}"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+def _job_access(user_id: int, job_id: str):
+    """Задание, если пользователь - его владелец или администратор"""
+    job = scheduler.jobs.get(int(job_id)) if job_id.isdigit() else None
+    if job is None or (job.user_id != user_id and not is_admin(user_id)):
+        return None
+    return job
+
+async def job_control(callback: CallbackQuery):
+    if not is_user_allowed(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+    
+    _, action, job_id = callback.data.split(":", 2)
+    job = _job_access(callback.from_user.id, job_id)
+    if job is None or job.state == JOB_DONE:
+        await callback.answer("Задание уже завершено.")
+        return
+    log_command(callback.from_user.id, f"⌨️ Задание #{job.id}: {action}")
+    
+    if action == "detach":
+        job.detach()
+        try:
+            await callback.message.edit_reply_markup(reply_markup=get_job_keyboard(job))
+        except TelegramBadRequest:
+            pass
+        await callback.answer(f"Задание #{job.id} в фоне, результат придёт ответом")
+    elif action == "kill":
+        await callback.answer(f"Останавливаю задание #{job.id}")
+        await scheduler.kill(job.id)
+    else:
+        await callback.answer()
+
+async def cmd_jobs(message: Message):
+    log_command(message.from_user.id, "/jobs")
+    
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    admin = is_admin(message.from_user.id)
+    jobs = [job for job in scheduler.jobs.values() if admin or job.user_id == message.from_user.id]
+    if not jobs:
+        await message.answer("Заданий нет. Команда консоли с & в конце запускается в фоне.")
+        return
+    
+    marks = {'queued': "⏸", 'spawning': "▶️", 'running': "▶️"}
+    rows = []
+    for job in reversed(jobs):
+        if job.state == JOB_DONE:
+            mark = "🛑" if job.killed else "✅" if job.result.returncode == 0 else "❌"
+        else:
+            mark = marks[job.state]
+        owner = f" [{job.user_id}]" if admin and job.user_id != message.from_user.id else ""
+        rows.append(f"{mark} <b>#{job.id}</b> {job.elapsed:.0f} с{owner}{' (фон)' if job.background else ''}: "
+                    f"<code>{html.escape(job.command[:80])}</code>")
+    jobs_info = (f"<b>Задания консоли</b> (выполняется {scheduler.running} из {scheduler.max_concurrent}):\n"
+                 + "\n".join(rows) + "\n\nОстановить: /kill &lt;номер&gt;")
+    await message.answer(jobs_info, parse_mode=ParseMode.HTML)
+
+async def cmd_kill(message: Message):
+    log_command(message.from_user.id, message.text)
     
-    result = await execute_command(command)
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    args = message.text.split()[1:]
+    job = _job_access(message.from_user.id, args[0].lstrip("#")) if args else None
+    if job is None:
+        await message.answer("Использование: /kill <номер задания из /jobs>")
+        return
+    if not await scheduler.kill(job.id):
+        await message.answer(f"Задание #{job.id} уже завершено.")
+        return
+    await message.answer(f"🛑 Задание #{job.id} остановлено.")
+
+# Единицы длительности для диапазона истории
+_RANGE_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+def format_metric_value(value: float, unit: str) -> str:
+    if unit == 'B/s':
+        return f"{value / 1024:.1f} KB/s"
+    return f"{value:.1f}{unit}"
+
+async def cmd_history(message: Message):
+    log_command(message.from_user.id, message.text)
+    
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    args = message.text.split()[1:]
+    metric = args[0] if args else None
+    match = re.fullmatch(r"(\d+)([mhd])", args[1] if len(args) > 1 else "1h")
+    if metric not in HISTORY_METRICS or not match:
+        await message.answer(
+            "Использование: /history <метрика> <диапазон>\n"
+            f"Метрики: {', '.join(HISTORY_METRICS)}\n"
+            "Диапазон: 30m, 6h, 7d (по умолчанию 1h)"
+        )
+        return
+    
+    end = time.time()
+    start = end - int(match.group(1)) * _RANGE_UNITS[match.group(2)]
+    tier, rows, summary = await history.query(metric, start, end)
+    if summary is None:
+        await message.answer(f"❌ Нет данных по метрике {metric} за {match.group(0)}.")
+        return
+    
+    unit = HISTORY_METRICS[metric][2]
+    time_format = '%d.%m %H:%M' if end - start > 86400 else '%H:%M'
+    history_info = f"<b>История {metric} за {match.group(0)}</b> ({tier})\n"
+    history_info += (f"мин {format_metric_value(summary[0], unit)} / "
+                     f"сред {format_metric_value(summary[1], unit)} / "
+                     f"макс {format_metric_value(summary[2], unit)}\n")
+    
+    rows_text = []
+    for timestamp, low, avg, high in rows:
+        moment = datetime.fromtimestamp(timestamp).strftime(time_format)
+        rows_text.append(f"{moment:>11}  {format_metric_value(avg, unit):>12}  "
+                         f"({format_metric_value(low, unit)}…{format_metric_value(high, unit)})")
+    history_info += "<pre>" + "\n".join(rows_text) + "</pre>"
+    
+    await message.answer(history_info, parse_mode=ParseMode.HTML)
+
+# Страницы /audit: пользователь -> (запрос, курсоры начала страниц, номер страницы)
+_audit_pages = {}
+# Предел длины сообщения Telegram с запасом на заголовок
+_AUDIT_TEXT_LIMIT = 3800
+
+def parse_audit_time(value: str, end: bool = False):
+    """ГГГГ-ММ-ДД, ГГГГ-ММ-ДДTЧЧ:ММ или относительное 30m/24h/7d"""
+    match = re.fullmatch(r"(\d+)([mhd])", value)
+    if match:
+        return datetime.fromtimestamp(time.time() - int(match.group(1)) * _RANGE_UNITS[match.group(2)])
+    for time_format in ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            moment = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        if end and time_format == '%Y-%m-%d':
+            # Дата без времени в to= включает весь день
+            moment = moment.replace(hour=23, minute=59, second=59)
+        return moment
+    return None
+
+def parse_audit_query(args):
+    user_id = start = end = None
+    words = []
+    for arg in args:
+        key, _, value = arg.partition("=")
+        if key == "user" and value:
+            if not value.isdigit():
+                return None
+            user_id = int(value)
+        elif key in ("from", "to") and value:
+            moment = parse_audit_time(value, end=key == "to")
+            if moment is None:
+                return None
+            if key == "from":
+                start = moment
+            else:
+                end = moment
+        else:
+            words.append(arg)
+    return AuditQuery(user_id, start, end, " ".join(words))
+
+def format_audit_entry(line: str) -> str:
+    # "2026-10-17 13:45:01,123 - INFO - сообщение" -> "2026-10-17 13:45:01 сообщение"
+    parts = line.split(" - ", 2)
+    return f"{line[:19]} {parts[2] if len(parts) == 3 else line[19:]}"
+
+def get_audit_keyboard(page: int, has_next: bool):
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data="audit:prev"))
+    if has_next:
+        buttons.append(InlineKeyboardButton(text="Далее ▶️", callback_data="audit:next"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+async def build_audit_page(user_id: int):
+    query, cursors, page = _audit_pages[user_id]
+    entries, cursor = await asyncio.to_thread(audit_log.search, query, cursors[page], AUDIT_PAGE_SIZE)
+    if cursor is not None and len(cursors) == page + 1:
+        cursors.append(cursor)
+    
+    if not entries:
+        return "🔍 Записей не найдено." if page == 0 else "🔍 Больше записей нет.", None
+    rows = []
+    length = 0
+    for entry in entries:
+        row = html.escape(format_audit_entry(entry))
+        if length + len(row) > _AUDIT_TEXT_LIMIT:
+            rows.append("…")
+            break
+        rows.append(row)
+        length += len(row) + 1
+    audit_info = f"<b>Журнал команд</b>, страница {page + 1}\n<pre>" + "\n".join(rows) + "</pre>"
+    return audit_info, get_audit_keyboard(page, cursor is not None)
+
+async def cmd_audit(message: Message):
+    log_command(message.from_user.id, message.text)
+    
+    if not is_admin(message.from_user.id):
+        await message.answer("⛔ Команда доступна только администраторам.")
+        return
     
-    if len(result) > 4000:
-        result = result[:4000] + "\n... (вывод обрезан)"
+    query = parse_audit_query(message.text.split()[1:])
+    if query is None:
+        await message.answer(
+            "Использование: /audit [user=ID] [from=…] [to=…] [текст]\n"
+            "Время: 2026-10-17, 2026-10-17T13:45 или назад от текущего: 30m, 24h, 7d\n"
+            "Текст ищется с учётом регистра"
+        )
+        return
+    
+    _audit_pages[message.from_user.id] = (query, [None], 0)
+    audit_info, keyboard = await build_audit_page(message.from_user.id)
+    await message.answer(audit_info, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+
+async def audit_page(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+    
+    state = _audit_pages.get(callback.from_user.id)
+    if state is None:
+        await callback.answer("Поиск устарел, повторите /audit.")
+        return
+    query, cursors, page = state
+    page += 1 if callback.data == "audit:next" else -1
+    if not 0 <= page < len(cursors):
+        await callback.answer()
+        return
+    _audit_pages[callback.from_user.id] = (query, cursors, page)
+    log_command(callback.from_user.id, f"🔍 Журнал: страница {page + 1}")
+    
+    audit_info, keyboard = await build_audit_page(callback.from_user.id)
+    try:
+        await callback.message.edit_text(audit_info, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
+
+async def cmd_watch(message: Message):
+    log_command(message.from_user.id, "/watch")
+    
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    panel = await message.answer("📊 Панель мониторинга")
+    await dashboard.watch(message.bot, message.chat.id, panel.message_id,
+                          message.from_user.id, 'overview')
+
+async def watch_control(callback: CallbackQuery):
+    if not is_user_allowed(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+    
+    action = callback.data.split(":", 1)[1]
+    if action == "stop":
+        log_command(callback.from_user.id, "📊 Панель: стоп")
+        await dashboard.stop(callback.message.chat.id, callback.message.message_id)
+        await callback.answer("Обновление остановлено")
+        return
+    if action not in WATCH_VIEWS:
+        await callback.answer()
+        return
+    log_command(callback.from_user.id, f"📊 Панель: {WATCH_VIEWS[action]}")
+    
+    await dashboard.watch(callback.bot, callback.message.chat.id, callback.message.message_id,
+                          callback.from_user.id, action)
+    await callback.answer()
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+async def cmd_perf(message: Message):
+    log_command(message.from_user.id, "/perf")
+    
+    if not is_admin(message.from_user.id):
+        await message.answer("⛔ Команда доступна только администраторам.")
+        return
+    
+    rows = [f"{'обработчик':<20} {'n':>5} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}"]
+    handlers = sorted(perf.handlers.items(), key=lambda item: item[1].percentile(95), reverse=True)
+    for name, histogram in handlers:
+        rows.append(f"{name[:20]:<20} {histogram.count:>5} {_ms(histogram.percentile(50)):>7} "
+                    f"{_ms(histogram.percentile(95)):>7} {_ms(histogram.percentile(99)):>7} "
+                    f"{_ms(histogram.max):>7}")
+    perf_info = "<b>Задержки обработчиков (мс):</b>\n<pre>" + html.escape("\n".join(rows)) + "</pre>\n"
+    perf_info += (f"<b>Обновление → ответ ({'webhook' if WEBHOOK_URL else 'polling'}):</b> "
+                  f"p50 {_ms(perf.updates.percentile(50))} / p95 {_ms(perf.updates.percentile(95))} / "
+                  f"p99 {_ms(perf.updates.percentile(99))} мс, всего {perf.updates.count}\n")
+    
+    watchdog = perf.watchdog
+    perf_info += (f"<b>Event loop:</b> лаг p99 {_ms(watchdog.lag.percentile(99))} мс, "
+                  f"макс {_ms(watchdog.lag.max)} мс; зависаний дольше "
+                  f"{watchdog.threshold:g} с: {watchdog.stall_count}\n")
+    for stall in watchdog.worst():
+        moment = datetime.fromtimestamp(stall.started).strftime('%d.%m %H:%M:%S')
+        # Последняя строка стека с кодом - место, где стоял цикл
+        where = [line for line in stall.stack.strip().splitlines() if line.startswith("  File")]
+        perf_info += (f"• {moment}: {stall.duration:.3f} с"
+                      f"{' — <code>' + html.escape(where[-1].strip()) + '</code>' if where else ''}\n")
+    
+    cadence = sampler.cadence
+    perf_info += (f"\n<b>Сборщик метрик:</b> замер p50 {_ms(perf.collect.percentile(50))} / "
+                  f"p95 {_ms(perf.collect.percentile(95))} мс (в потоке), подписчики p95 "
+                  f"{_ms(perf.listeners.percentile(95))} мс (в event loop)\n"
+                  f"интервал {cadence.interval:.2g} с из {cadence.minimum:g}…{cadence.maximum:g} с "
+                  f"({html.escape(cadence.reason)}), CPU на замер {_ms(cadence.cost)} мс, "
+                  f"нагрузка {cadence.overhead:.2%} ядра при бюджете {cadence.budget:.2%}")
+    
+    # Доля попаданий помогает подобрать REPORT_CACHE_TTLS
+    cache_stats = report_cache.stats()
+    if cache_stats:
+        perf_info += "\n\n<b>Кэш отчётов:</b>\n<pre>" + html.escape(cache_stats) + "</pre>"
+    
+    await message.answer(perf_info, parse_mode=ParseMode.HTML)
+
+async def hosts_info(message: Message):
+    log_command(message.from_user.id, "🖧 Хосты")
+    
+    if not is_user_allowed(message.from_user.id):
+        await message.answer("⛔ У вас нет доступа к этому боту.")
+        return
+    
+    current = get_source(message.from_user.id).name
+    await message.answer(
+        "🖧 Выберите хост для отчётов CPU, RAM, GPU, температуры, дисков и сети.\n"
+        "Процессы и консоль всегда относятся к этому серверу.",
+        reply_markup=get_hosts_keyboard(current)
+    )
+
+async def select_host(callback: CallbackQuery):
+    if not is_user_allowed(callback.from_user.id):
+        await callback.answer("⛔ Нет доступа.")
+        return
+    
+    name = callback.data.split(":", 1)[1]
+    if name == sampler.name:
+        selected_hosts.pop(callback.from_user.id, None)
+    elif name in agent_server.hosts:
+        selected_hosts[callback.from_user.id] = name
+    else:
+        await callback.answer("Хост не найден.")
+        return
+    log_command(callback.from_user.id, f"🖧 Хост: {name}")
     
-    await message.answer(f"📝 Результат выполнения команды:\n\n```\n{result}\n```", parse_mode=ParseMode.MARKDOWN)
+    try:
+        await callback.message.edit_reply_markup(reply_markup=get_hosts_keyboard(name))
+    except TelegramBadRequest:
+        pass
+    await callback.answer(f"Выбран хост: {name}")
 
 async def unknown_message(message: Message, state: FSMContext):
     current_state = await state.get_state()
@@ -345,18 +1067,36 @@ async def unknown_message(message: Message, state: FSMContext):
     )
 
 def register_handlers(router: Router):
+    router.message.middleware(AuditMiddleware())
+    router.callback_query.middleware(AuditMiddleware())
     router.message.register(cmd_start, CommandStart())
     router.message.register(cmd_help, Command("help"))
     router.message.register(cmd_status, Command("status"))
+    router.message.register(cmd_history, Command("history"))
     router.message.register(cmd_status, F.text == "📊 Общая информация")
     router.message.register(cpu_info, F.text == "🖥️ CPU")
+    router.callback_query.register(cpu_graph_window, F.data.startswith("cpu_graph:"))
     router.message.register(ram_info, F.text == "🧠 RAM")
     router.message.register(gpu_info, F.text == "🎮 GPU")
     router.message.register(temp_info, F.text == "🔥 Температура")
     router.message.register(disk_info, F.text == "💾 Диск")
     router.message.register(network_info, F.text == "🌐 Сеть")
     router.message.register(process_info, F.text == "📋 Процессы")
+    router.callback_query.register(process_sort, F.data.startswith("proc_sort:"))
+    router.message.register(cmd_watch_proc, Command("watch_proc"))
+    router.message.register(cmd_unwatch_proc, Command("unwatch_proc"))
     router.message.register(uptime_info, F.text == "⏱️ Аптайм")
+    router.message.register(cmd_perf, Command("perf"))
+    router.message.register(cmd_audit, Command("audit"))
+    router.callback_query.register(audit_page, F.data.startswith("audit:"))
+    router.message.register(cmd_watch, Command("watch"))
+    router.callback_query.register(watch_control, F.data.startswith("watch:"))
+    router.message.register(hosts_info, Command("hosts"))
+    router.message.register(hosts_info, F.text == "🖧 Хосты")
+    router.callback_query.register(select_host, F.data.startswith("host:"))
     router.message.register(console_command, F.text == "⌨️ Консоль")
+    router.message.register(cmd_jobs, Command("jobs"))
+    router.message.register(cmd_kill, Command("kill"))
+    router.callback_query.register(job_control, F.data.startswith("job:"))
     router.message.register(handle_console_command, ConsoleStates.waiting_for_command)
     router.message.register(unknown_message) 
\ No newline at end of file
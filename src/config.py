@@ -4,20 +4,106 @@ import os
 # Загрузка данных из .env
 load_dotenv()
 
+# Настройки сборщика метрик, общие с агентом
+from .base_config import (GPU_BACKEND, HWMON_ROOT, SAMPLE_INTERVAL, SAMPLE_HISTORY,
+                          SAMPLE_INTERVAL_MAX, SAMPLE_NEAR_MARGIN, SAMPLE_FAST_CHANGE,
+                          MONITOR_CPU_BUDGET, WATCHDOG_INTERVAL, STALL_THRESHOLD)
+
 API_TOKEN = os.getenv("BOT_TOKEN")
-ALLOWED_USERS = set(map(int, os.getenv("ALLOWED_USERS", "").split(",")))
+ALLOWED_USERS = {int(user) for user in os.getenv("ALLOWED_USERS", "").split(",") if user.strip()}
+# Администраторы (доступ к /perf); по умолчанию все ALLOWED_USERS
+ADMIN_USERS = {int(user) for user in os.getenv("ADMIN_USERS", "").split(",") if user.strip()} or ALLOWED_USERS
 ALLOWED_DIRECTORIES = set(os.getenv("ALLOWED_DIRECTORIES", "").split(","))
 FORBIDDEN_COMMANDS = set(os.getenv("FORBIDDEN_COMMANDS", "").split(","))
-CPU_LOAD_THRESHOLD = int(os.getenv("CPU_LOAD_THRESHOLD"))
-CPU_TEMP_THRESHOLD = int(os.getenv("CPU_TEMP_THRESHOLD"))
-GPU_LOAD_THRESHOLD = int(os.getenv("GPU_LOAD_THRESHOLD"))
-GPU_TEMP_THRESHOLD = int(os.getenv("GPU_TEMP_THRESHOLD"))
-CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL"))
-
-# Состояние для отслеживания уже отправленных уведомлений
-notification_state = {
-    'cpu_load': False,
-    'cpu_temp': False,
-    'gpu_load': False,
-    'gpu_temp': False
-} 
\ No newline at end of file
+CPU_LOAD_THRESHOLD = int(os.getenv("CPU_LOAD_THRESHOLD", "90"))
+CPU_TEMP_THRESHOLD = int(os.getenv("CPU_TEMP_THRESHOLD", "80"))
+GPU_LOAD_THRESHOLD = int(os.getenv("GPU_LOAD_THRESHOLD", "90"))
+GPU_TEMP_THRESHOLD = int(os.getenv("GPU_TEMP_THRESHOLD", "80"))
+# Сколько секунд превышение порога должно держаться для правил по умолчанию
+ALERT_SUSTAIN = int(os.getenv("ALERT_SUSTAIN", "60"))
+# JSON-файл с правилами оповещений; без него правила строятся из порогов выше
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE", "alerts.json")
+# Доставка уведомлений: сообщений в секунду всего и в один чат, окно объединения (сек),
+# число повторов при ошибках
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+NOTIFY_CHAT_RATE = float(os.getenv("NOTIFY_CHAT_RATE", "1"))
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", "2"))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+# Приём метрик от агентов других хостов: 'адрес:порт' или 'unix:/путь' (пусто - выключен)
+# и общий токен агентов
+AGENT_LISTEN = os.getenv("AGENT_LISTEN", "")
+AGENT_TOKEN = os.getenv("AGENT_TOKEN", "")
+# История замеров одного агента в памяти бота (сек) и срок, после которого
+# молчащий хост удаляется из списка вместе с историей (сек)
+AGENT_HISTORY = int(os.getenv("AGENT_HISTORY", "900"))
+AGENT_HOST_TTL = float(os.getenv("AGENT_HOST_TTL", "3600"))
+# Эндпоинт OpenMetrics для Prometheus: 'адрес:порт' (пусто - выключен)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "")
+# Режим webhook вместо long polling: публичный URL (пусто - polling), адрес локального
+# сервера 'адрес:порт', путь, секрет заголовка X-Telegram-Bot-Api-Secret-Token
+# (пусто - случайный при каждом запуске; символы A-Z, a-z, 0-9, _ и -),
+# число одновременно обрабатываемых обновлений и предел ожидания их при остановке (сек)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1:8443")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "16"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+# Время жизни кэша отрисованных графиков (сек)
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "5"))
+# Кэш отчётов: время жизни по умолчанию (сек) и по отчётам в виде "disk=30,network=5"
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "5"))
+REPORT_CACHE_TTLS = {
+    name.strip(): float(ttl)
+    for name, _, ttl in (item.partition("=") for item in os.getenv("REPORT_CACHE_TTLS", "disk=30").split(","))
+    if name.strip() and ttl
+}
+# Проверка места на разделах: таймаут одного раздела (сек) и число потоков
+DISK_SCAN_TIMEOUT = float(os.getenv("DISK_SCAN_TIMEOUT", "2"))
+DISK_SCAN_WORKERS = int(os.getenv("DISK_SCAN_WORKERS", "8"))
+# Минимальный интервал обновления списка сетевых соединений (сек)
+NET_CONNECTIONS_INTERVAL = float(os.getenv("NET_CONNECTIONS_INTERVAL", "30"))
+# Живая панель /watch: период обновления и время до автоостановки (сек)
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "5"))
+WATCH_TIMEOUT = float(os.getenv("WATCH_TIMEOUT", "900"))
+# Общий интервал замера CPU для списка процессов (сек)
+PROCESS_SCAN_INTERVAL = float(os.getenv("PROCESS_SCAN_INTERVAL", "0.5"))
+# Наблюдение за процессами (/watch_proc): начальный список имён или PID через запятую,
+# период замера, глубина истории и период поиска новых процессов (сек)
+WATCHLIST = [item.strip() for item in os.getenv("WATCHLIST", "").split(",") if item.strip()]
+WATCHLIST_INTERVAL = float(os.getenv("WATCHLIST_INTERVAL", "5"))
+WATCHLIST_WINDOW = float(os.getenv("WATCHLIST_WINDOW", "3600"))
+WATCHLIST_RESCAN = float(os.getenv("WATCHLIST_RESCAN", "30"))
+# Утечка памяти: минимальный R² линейного тренда RSS и рост за окно (доля)
+LEAK_MIN_R2 = float(os.getenv("LEAK_MIN_R2", "0.8"))
+LEAK_MIN_GROWTH = float(os.getenv("LEAK_MIN_GROWTH", "0.05"))
+# История метрик: каталог, срок хранения сырых и минутных данных (дней),
+# период сброса на диск (сек)
+HISTORY_DIR = os.getenv("HISTORY_DIR", "logs/history")
+HISTORY_RAW_DAYS = int(os.getenv("HISTORY_RAW_DAYS", "2"))
+HISTORY_MINUTE_DAYS = int(os.getenv("HISTORY_MINUTE_DAYS", "62"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "10"))
+# Поиск по журналу /audit: каталог индексов смещений по часам и записей на страницу
+AUDIT_INDEX_DIR = os.getenv("AUDIT_INDEX_DIR", "logs/audit_index")
+AUDIT_PAGE_SIZE = int(os.getenv("AUDIT_PAGE_SIZE", "20"))
+# Консоль: таймаут команды (сек), минимальный интервал правки сообщения (сек),
+# размер хвоста вывода в сообщении (символов), объём вывода в памяти до сброса на диск (байт)
+CONSOLE_TIMEOUT = int(os.getenv("CONSOLE_TIMEOUT", "10"))
+CONSOLE_EDIT_INTERVAL = float(os.getenv("CONSOLE_EDIT_INTERVAL", "1.5"))
+CONSOLE_TAIL_CHARS = int(os.getenv("CONSOLE_TAIL_CHARS", "3500"))
+CONSOLE_SPOOL_MEMORY = int(os.getenv("CONSOLE_SPOOL_MEMORY", str(64 * 1024)))
+# Задания консоли: одновременно на весь бот и у одного пользователя, таймаут фонового
+# задания (сек), сколько завершённых хранить для /jobs, ожидание после SIGTERM (сек)
+JOBS_MAX_CONCURRENT = int(os.getenv("JOBS_MAX_CONCURRENT", "4"))
+JOBS_PER_USER = int(os.getenv("JOBS_PER_USER", "2"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "3600"))
+JOBS_HISTORY = int(os.getenv("JOBS_HISTORY", "20"))
+JOB_KILL_GRACE = float(os.getenv("JOB_KILL_GRACE", "3"))
+# Ограничения ресурсов команды (0 - без ограничения): процессорное время (сек),
+# память данных (МБ, RLIMIT_DATA: куча и анонимные записываемые отображения; не
+# адресное пространство, которое java, node и go резервируют с большим запасом),
+# размер записываемого файла (МБ), прибавка к nice
+JOB_CPU_SECONDS = int(os.getenv("JOB_CPU_SECONDS", "600"))
+JOB_MEMORY_MB = int(os.getenv("JOB_MEMORY_MB", "1024"))
+JOB_FILE_MB = int(os.getenv("JOB_FILE_MB", "1024"))
+JOB_NICE = int(os.getenv("JOB_NICE", "10"))
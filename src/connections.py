@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import Counter
+
+import psutil
+
+from .config import NET_CONNECTIONS_INTERVAL
+from .utils import logger
+
+# Интервал обновления растягивается до этой кратности длительности самого вызова
+_COST_FACTOR = 20
+
+
+class ConnectionSummary:
+    """Сводка по сетевым соединениям на момент снимка"""
+    __slots__ = ('taken', 'duration', 'total', 'states', 'listening', 'remotes')
+
+    def __init__(self, taken, duration, total, states, listening, remotes):
+        self.taken = taken          # time.time() снимка
+        self.duration = duration    # сколько занял net_connections (сек)
+        self.total = total
+        self.states = states        # [(состояние, число)] по убыванию
+        self.listening = listening  # число слушающих сокетов
+        self.remotes = remotes      # [(удалённый адрес, число)] по убыванию
+
+
+def summarize_connections(connections, duration: float, top: int = 5) -> ConnectionSummary:
+    states = Counter()
+    remotes = Counter()
+    listening = 0
+    for connection in connections:
+        if connection.status == psutil.CONN_LISTEN:
+            listening += 1
+            continue
+        states[connection.status] += 1
+        if connection.raddr:
+            remotes[connection.raddr.ip] += 1
+    return ConnectionSummary(time.time(), duration, len(connections), states.most_common(),
+                             listening, remotes.most_common(top))
+
+
+class ConnectionTracker:
+    """Кэшированная сводка net_connections с обновлением в фоне
+
+    net_connections на нагруженном хосте обходит тысячи сокетов, поэтому
+    вызывается в потоке не чаще interval секунд (и не чаще, чем раз в
+    _COST_FACTOR собственных длительностей). Запрос отдаёт последнюю сводку
+    сразу, а устаревшую обновляет в фоне; ждать приходится только первой.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._summary = None
+        self._refreshed_at = None   # loop.time() последнего обновления
+        self._task = None
+        self.error = None
+
+    def _collect(self) -> ConnectionSummary:
+        start = time.perf_counter()
+        connections = psutil.net_connections(kind='inet')
+        return summarize_connections(connections, time.perf_counter() - start)
+
+    async def _refresh(self):
+        try:
+            self._summary = await asyncio.to_thread(self._collect)
+            self.error = None
+        except psutil.AccessDenied:
+            self.error = "нет прав на список соединений"
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Ошибка получения сетевых соединений: {str(e)}")
+        finally:
+            self._refreshed_at = asyncio.get_running_loop().time()
+            self._task = None
+
+    def _stale(self) -> bool:
+        if self._refreshed_at is None:
+            return True
+        cost = self._summary.duration * _COST_FACTOR if self._summary else 0.0
+        return asyncio.get_running_loop().time() - self._refreshed_at > max(self.interval, cost)
+
+    async def summary(self):
+        """Последняя сводка (None, если получить не удалось)"""
+        if self._task is None and self._stale():
+            self._task = asyncio.create_task(self._refresh())
+        if self._summary is None and self._task is not None:
+            await asyncio.shield(self._task)
+        return self._summary
+
+
+connection_tracker = ConnectionTracker(NET_CONNECTIONS_INTERVAL)
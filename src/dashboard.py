@@ -0,0 +1,215 @@
+import asyncio
+import html
+import math
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from .aggregator import get_source
+from .config import WATCH_INTERVAL, WATCH_TIMEOUT
+from .sampler import sampler
+from .utils import logger
+
+# Вкладки панели: ключ -> подпись кнопки
+WATCH_VIEWS = {'overview': "📊 Обзор", 'cores': "🖥️ Ядра"}
+
+_BAR_WIDTH = 10
+
+
+def _bar(percent: float) -> str:
+    if math.isnan(percent):
+        return "·" * _BAR_WIDTH
+    filled = round(max(0.0, min(percent, 100.0)) / 100 * _BAR_WIDTH)
+    return "█" * filled + "░" * (_BAR_WIDTH - filled)
+
+
+def _percent(percent: float) -> str:
+    return "   н/д" if math.isnan(percent) else f"{percent:5.0f}%"
+
+
+def _rate(source, field: str) -> str:
+    """Скорость счётчика по двум последним замерам"""
+    timestamps = source.samples.column('time', 2)
+    values = source.samples.column(field, 2)
+    if len(values) < 2 or math.isnan(values[1]) or timestamps[1] <= timestamps[0]:
+        return "н/д"
+    rate = max(0.0, values[1] - values[0]) / (timestamps[1] - timestamps[0])
+    if rate >= 1024 ** 2:
+        return f"{rate / 1024 ** 2:.1f} MB/s"
+    return f"{rate / 1024:.0f} KB/s"
+
+
+def render_dashboard(source, view: str) -> str:
+    """Текст панели (HTML) по последнему снимку хоста
+
+    Значения округляются, чтобы на спокойной системе текст не менялся
+    и лишние правки сообщения не отправлялись.
+    """
+    snapshot = source.latest()
+    title = "🏠 Этот сервер" if source.name == "local" else f"🖧 {html.escape(source.name)}"
+    text = f"<b>Панель мониторинга</b> — {title}\n"
+    if snapshot is None:
+        return text + "⏳ Ожидание первого замера..."
+
+    lines = []
+    if view == 'cores':
+        for i, percent in enumerate(snapshot.per_core):
+            lines.append(f"{i + 1:>4} {_percent(percent)} {_bar(percent)}")
+    else:
+        lines.append(f"CPU  {_percent(snapshot.cpu)} {_bar(snapshot.cpu)}")
+        lines.append(f"RAM  {_percent(snapshot.mem_percent)} {_bar(snapshot.mem_percent)}")
+        lines.append(f"SWAP {_percent(snapshot.swap_percent)} {_bar(snapshot.swap_percent)}")
+        if not math.isnan(snapshot.gpu_util):
+            lines.append(f"GPU  {_percent(snapshot.gpu_util)} {_bar(snapshot.gpu_util)}")
+        temps = "t°   CPU " + ("н/д" if math.isnan(snapshot.cpu_temp) else f"{snapshot.cpu_temp:.0f}°C")
+        if not math.isnan(snapshot.gpu_temp):
+            temps += f", GPU {snapshot.gpu_temp:.0f}°C"
+        lines.append(temps)
+        lines.append(f"Диск ↓ {_rate(source, 'disk_read')}  ↑ {_rate(source, 'disk_write')}")
+        lines.append(f"Сеть ↓ {_rate(source, 'net_recv')}  ↑ {_rate(source, 'net_sent')}")
+    text += "<pre>" + "\n".join(lines) + "</pre>"
+    return text + f"\n🔄 Обновление каждые {WATCH_INTERVAL:g} сек"
+
+
+def get_watch_keyboard(current: str):
+    buttons = [
+        InlineKeyboardButton(
+            text=f"• {label} •" if view == current else label,
+            callback_data=f"watch:{view}"
+        )
+        for view, label in WATCH_VIEWS.items()
+    ]
+    buttons.append(InlineKeyboardButton(text="⏹ Стоп", callback_data="watch:stop"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+def get_resume_keyboard(view: str):
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="▶️ Продолжить", callback_data=f"watch:{view}")
+    ]])
+
+
+class Watch:
+    """Панель в одном чате"""
+    __slots__ = ('chat_id', 'message_id', 'user_id', 'view', 'text', 'expires', 'paused_until')
+
+    def __init__(self, chat_id, message_id, user_id, view, expires):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.user_id = user_id
+        self.view = view
+        self.text = None       # последний отправленный текст
+        self.expires = expires
+        self.paused_until = 0.0
+
+
+class Dashboard:
+    """Живые панели: одно сообщение на чат, обновляемое правкой
+
+    Все панели обновляются одним циклом: текст для пары (хост, вкладка)
+    строится один раз за такт и раздаётся всем чатам, которые на неё смотрят.
+    Правка не отправляется, если текст не изменился. Цикл запускается с
+    первой панелью и завершается, когда панелей не остаётся.
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.watches = {}   # chat_id -> Watch
+        self._bot = None
+        self._task = None
+        self.edits = 0
+        self.skipped = 0
+
+    async def watch(self, bot, chat_id: int, message_id: int, user_id: int, view: str):
+        """Делает сообщение панелью чата (предыдущая панель чата останавливается)"""
+        self._bot = bot
+        loop = asyncio.get_running_loop()
+        previous = self.watches.get(chat_id)
+        watch = Watch(chat_id, message_id, user_id, view, loop.time() + self.timeout)
+        self.watches[chat_id] = watch
+        if previous is not None and previous.message_id != message_id:
+            await self._freeze(previous)
+        await self._update(watch, self._render(watch, {}))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, chat_id: int, message_id: int):
+        watch = self.watches.get(chat_id)
+        if watch is not None and watch.message_id == message_id:
+            del self.watches[chat_id]
+            await self._freeze(watch)
+
+    def _render(self, watch, rendered: dict) -> str:
+        source = get_source(watch.user_id)
+        key = (source.name, watch.view)
+        text = rendered.get(key)
+        if text is None:
+            if source is sampler:
+                # Пока панель открыта, сборщик не уходит в простой реже её обновления
+                sampler.cadence.require("панель /watch", self.interval, 2 * self.interval)
+            text = rendered[key] = render_dashboard(source, watch.view)
+        return text
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while self.watches:
+                next_tick += self.interval
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                await self._tick(loop.time())
+        finally:
+            self._task = None
+
+    async def _tick(self, now: float):
+        rendered = {}
+        updates = []
+        for watch in list(self.watches.values()):
+            if now >= watch.expires:
+                del self.watches[watch.chat_id]
+                updates.append(self._freeze(watch))
+                continue
+            if now < watch.paused_until:
+                continue
+            text = self._render(watch, rendered)
+            if text == watch.text:
+                self.skipped += 1
+                continue
+            updates.append(self._update(watch, text))
+        if updates:
+            await asyncio.gather(*updates)
+
+    async def _update(self, watch, text: str):
+        try:
+            await self._bot.edit_message_text(
+                text, chat_id=watch.chat_id, message_id=watch.message_id,
+                parse_mode=ParseMode.HTML, reply_markup=get_watch_keyboard(watch.view)
+            )
+            watch.text = text
+            self.edits += 1
+        except TelegramRetryAfter as e:
+            watch.paused_until = asyncio.get_running_loop().time() + e.retry_after
+        except TelegramBadRequest as e:
+            if "not modified" in str(e):
+                watch.text = text
+            else:
+                # Сообщение удалено или недоступно - панель больше не нужна
+                if self.watches.get(watch.chat_id) is watch:
+                    del self.watches[watch.chat_id]
+        except Exception as e:
+            logger.error(f"Ошибка обновления панели в чате {watch.chat_id}: {str(e)}")
+
+    async def _freeze(self, watch):
+        """Оставляет последний текст и заменяет кнопки на «Продолжить»"""
+        try:
+            await self._bot.edit_message_reply_markup(
+                chat_id=watch.chat_id, message_id=watch.message_id,
+                reply_markup=get_resume_keyboard(watch.view)
+            )
+        except Exception:
+            pass
+
+
+dashboard = Dashboard(WATCH_INTERVAL, WATCH_TIMEOUT)
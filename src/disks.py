@@ -0,0 +1,125 @@
+import asyncio
+import select
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from .config import DISK_SCAN_TIMEOUT, DISK_SCAN_WORKERS
+from .utils import logger
+
+# Виртуальные файловые системы, у которых нет смысла спрашивать место: служебные
+# ФС ядра, слои контейнеров (overlay, aufs), образы snap (squashfs, erofs) и
+# FUSE-помощники LXC и рабочего стола
+PSEUDO_FILESYSTEMS = frozenset({
+    'autofs', 'binder', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs',
+    'devfs', 'devpts', 'devtmpfs', 'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nfsd',
+    'nsfs', 'proc', 'pstore', 'ramfs', 'rootfs', 'rpc_pipefs', 'securityfs', 'selinuxfs',
+    'squashfs', 'erofs', 'sysfs', 'tmpfs', 'tracefs', 'overlay', 'aufs',
+    'fuse.lxcfs', 'fuse.snapfuse', 'fuse.gvfsd-fuse', 'fuse.portal',
+    'fuse.xdg-document-portal', 'fuse.vmware-vmblock',
+})
+
+_MOUNTINFO = "/proc/self/mountinfo"
+# Без mountinfo (не Linux) список разделов перечитывается не чаще этого (сек)
+_MOUNTS_TTL = 60.0
+
+
+def select_partitions(partitions):
+    """Разделы, место на которых стоит показывать
+
+    Блочное устройство показывается один раз, под самым коротким путём:
+    bind-монтирования контейнеров и kubelet - та же ФС с тем же местом.
+    Сетевые ФС различаются точкой монтирования.
+    """
+    chosen = {}
+    for partition in partitions:
+        if partition.fstype in PSEUDO_FILESYSTEMS:
+            continue
+        key = partition.device if partition.device.startswith("/dev/") else partition.mountpoint
+        current = chosen.get(key)
+        if current is None or len(partition.mountpoint) < len(current.mountpoint):
+            chosen[key] = partition
+    # Одна точка монтирования может встречаться несколько раз (перекрытые монтирования)
+    unique = {}
+    for partition in chosen.values():
+        unique.setdefault(partition.mountpoint, partition)
+    return list(unique.values())
+
+
+class PartitionUsage:
+    """Результат проверки одного раздела: usage или текст ошибки"""
+    __slots__ = ('partition', 'usage', 'error')
+
+    def __init__(self, partition, usage=None, error=None):
+        self.partition = partition
+        self.usage = usage
+        self.error = error
+
+
+class DiskScanner:
+    """Проверка места на разделах в пуле потоков с таймаутом на каждый раздел
+
+    Список разделов кэшируется и перечитывается, только когда ядро сообщает
+    об изменении таблицы монтирования (POLLPRI на /proc/self/mountinfo).
+    Зависший раздел (например, недоступный NFS) занимает один поток пула;
+    пока его вызов не вернётся, раздел не опрашивается повторно и
+    сразу помечается как не отвечающий.
+    """
+
+    def __init__(self, timeout: float, workers: int):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="disk-usage")
+        self._partitions = None
+        self._loaded_at = 0.0
+        self._poller = None
+        self._hung = {}   # точка монтирования -> незавершённый Future
+        try:
+            self._mountinfo = open(_MOUNTINFO, 'rb')
+            self._poller = select.poll()
+            self._poller.register(self._mountinfo, select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            self._mountinfo = None
+
+    def _mounts_changed(self) -> bool:
+        if self._partitions is None:
+            return True
+        if self._poller is None:
+            return time.monotonic() - self._loaded_at > _MOUNTS_TTL
+        # Ядро выставляет POLLPRI один раз на каждое изменение таблицы
+        return bool(self._poller.poll(0))
+
+    def partitions(self):
+        """Разделы без виртуальных ФС и повторов (кэш до изменения таблицы монтирования)"""
+        if self._mounts_changed():
+            self._partitions = select_partitions(psutil.disk_partitions(all=True))
+            self._loaded_at = time.monotonic()
+        return self._partitions
+
+    async def _usage(self, partition) -> PartitionUsage:
+        mountpoint = partition.mountpoint
+        future = self._hung.get(mountpoint)
+        if future is not None:
+            if not future.done():
+                return PartitionUsage(partition, error="не отвечает")
+            del self._hung[mountpoint]
+
+        future = self._executor.submit(psutil.disk_usage, mountpoint)
+        try:
+            usage = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._hung[mountpoint] = future
+            logger.warning(f"Раздел {mountpoint} ({partition.fstype}) не ответил за {self.timeout:g} с")
+            return PartitionUsage(partition, error="не отвечает")
+        except OSError as e:
+            logger.warning(f"Ошибка проверки раздела {mountpoint}: {str(e)}")
+            return PartitionUsage(partition, error=e.strerror or str(e))
+        return PartitionUsage(partition, usage)
+
+    async def scan(self):
+        """Место на всех разделах; время ответа ограничено таймаутом одного раздела"""
+        partitions = await asyncio.to_thread(self.partitions)
+        return await asyncio.gather(*(self._usage(partition) for partition in partitions))
+
+
+disk_scanner = DiskScanner(DISK_SCAN_TIMEOUT, DISK_SCAN_WORKERS)
@@ -0,0 +1,208 @@
+import gzip
+import math
+import time
+
+from aiohttp import web
+
+from .aggregator import agent_server
+from .sampler import sampler
+from .utils import logger
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Скалярные поля снимка: поле -> (метрика, описание)
+GAUGES = {
+    'cpu': ("eots_cpu_usage_percent", "Загрузка CPU, %"),
+    'cpu_freq': ("eots_cpu_frequency_mhz", "Текущая частота CPU, МГц"),
+    'cpu_temp': ("eots_cpu_temperature_celsius", "Средняя температура CPU, °C"),
+    'mem_percent': ("eots_memory_usage_percent", "Использование RAM, %"),
+    'mem_total': ("eots_memory_total_bytes", "Всего RAM, байт"),
+    'mem_used': ("eots_memory_used_bytes", "Использовано RAM, байт"),
+    'mem_available': ("eots_memory_available_bytes", "Доступно RAM, байт"),
+    'swap_percent': ("eots_swap_usage_percent", "Использование SWAP, %"),
+    'swap_used': ("eots_swap_used_bytes", "Использовано SWAP, байт"),
+    'gpu_util': ("eots_gpu_max_usage_percent", "Наибольшая загрузка GPU, %"),
+    'gpu_temp': ("eots_gpu_max_temperature_celsius", "Наибольшая температура GPU, °C"),
+}
+
+# Показания видеокарты: атрибут GpuReading -> (метрика, описание)
+GPU_GAUGES = {
+    'utilization': ("eots_gpu_usage_percent", "Загрузка GPU, %"),
+    'memory_utilization': ("eots_gpu_memory_controller_percent", "Активность контроллера памяти GPU, %"),
+    'temperature': ("eots_gpu_temperature_celsius", "Температура GPU, °C"),
+    'memory_used': ("eots_gpu_memory_used_bytes", "Использовано памяти GPU, байт"),
+    'memory_total': ("eots_gpu_memory_total_bytes", "Всего памяти GPU, байт"),
+    'power': ("eots_gpu_power_watts", "Потребление GPU, Вт"),
+    'clock_sm': ("eots_gpu_clock_sm_mhz", "Частота ядра GPU, МГц"),
+}
+
+# Счётчики устройств: атрибут psutil -> (метрика без _total, описание)
+DISK_COUNTERS = {
+    'read_bytes': ("eots_disk_read_bytes", "Прочитано с устройства, байт"),
+    'write_bytes': ("eots_disk_written_bytes", "Записано на устройство, байт"),
+    'read_count': ("eots_disk_reads", "Операций чтения"),
+    'write_count': ("eots_disk_writes", "Операций записи"),
+}
+NIC_COUNTERS = {
+    'bytes_recv': ("eots_network_receive_bytes", "Принято интерфейсом, байт"),
+    'bytes_sent': ("eots_network_transmit_bytes", "Отправлено интерфейсом, байт"),
+    'packets_recv': ("eots_network_receive_packets", "Принято пакетов"),
+    'packets_sent': ("eots_network_transmit_packets", "Отправлено пакетов"),
+    'errin': ("eots_network_receive_errors", "Ошибок приёма"),
+    'errout': ("eots_network_transmit_errors", "Ошибок передачи"),
+}
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Family:
+    """Строки одной метрики: у OpenMetrics все точки семейства идут подряд"""
+    __slots__ = ('name', 'kind', 'help', 'samples')
+
+    def __init__(self, name, kind, help):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.samples = []
+
+    def add(self, labels: str, value):
+        # NaN - нет данных: точка пропускается
+        if value is not None and not math.isnan(value):
+            suffix = "_total" if self.kind == "counter" else ""
+            self.samples.append(f"{self.name}{suffix}{{{labels}}} {value}")
+
+
+def accepts_gzip(header: str) -> bool:
+    """Разрешает ли Accept-Encoding ответ в gzip (с учётом q-значений, q=0 - запрет)"""
+    wildcard = None
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    # "*" действует только для кодировок, не названных явно
+    return bool(wildcard)
+
+
+def render(stores) -> bytes:
+    """Текст OpenMetrics по последним снимкам хостов"""
+    families = {}
+
+    def family(name, kind, help):
+        item = families.get(name)
+        if item is None:
+            item = families[name] = _Family(name, kind, help)
+        return item
+
+    for store in stores:
+        snapshot = store.latest()
+        if snapshot is None:
+            continue
+        host = f'host="{_label(store.name)}"'
+        for field, (name, help) in GAUGES.items():
+            family(name, "gauge", help).add(host, getattr(snapshot, field))
+        cores = family("eots_cpu_core_usage_percent", "gauge", "Загрузка ядра CPU, %")
+        for index, percent in enumerate(snapshot.per_core):
+            cores.add(f'{host},core="{index}"', percent)
+        sensors = family("eots_sensor_temperature_celsius", "gauge", "Температура датчика hwmon, °C")
+        for (chip, label), temp in snapshot.core_temps.items():
+            sensors.add(f'{host},chip="{_label(chip)}",sensor="{_label(label)}"', temp)
+        for gpu in snapshot.gpus:
+            labels = f'{host},gpu="{gpu.index}",name="{_label(gpu.name)}"'
+            for attribute, (name, help) in GPU_GAUGES.items():
+                family(name, "gauge", help).add(labels, getattr(gpu, attribute))
+        for device, counters in snapshot.disks.items():
+            labels = f'{host},device="{_label(device)}"'
+            for attribute, (name, help) in DISK_COUNTERS.items():
+                family(name, "counter", help).add(labels, getattr(counters, attribute, None))
+        for interface, counters in snapshot.nics.items():
+            labels = f'{host},interface="{_label(interface)}"'
+            for attribute, (name, help) in NIC_COUNTERS.items():
+                family(name, "counter", help).add(labels, getattr(counters, attribute, None))
+
+    lines = []
+    for item in families.values():
+        if item.samples:
+            lines.append(f"# TYPE {item.name} {item.kind}")
+            lines.append(f"# HELP {item.name} {item.help}")
+            lines.extend(item.samples)
+    lines.append("# EOF\n")
+    return "\n".join(lines).encode("utf-8")
+
+
+class MetricsExporter:
+    """HTTP-эндпоинт /metrics в формате OpenMetrics
+
+    Текст готовится только при опросе и кэшируется по последним снимкам
+    хостов: без опросов замеры ничего не стоят экспортёру, а повторный
+    опрос до нового замера отдаёт готовый буфер. gzip-версия сжимается
+    при первом запросе с gzip для этих же снимков.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._payload = b"# EOF\n"
+        self._gzipped = None
+        self._runner = None
+        self._last_scrape = None
+        self.scrapes = 0
+        self.renders = 0
+
+    def payload(self, compressed: bool = False) -> bytes:
+        """Текст метрик (или его gzip) для текущих снимков всех хостов"""
+        # Агенты присылают данные пакетами, их последние снимки берутся как есть
+        stores = [sampler, *agent_server.hosts.values()]
+        key = tuple(store.latest() for store in stores)
+        if key != self._key:
+            self._key = key
+            self._payload = render(stores)
+            self._gzipped = None
+            self.renders += 1
+        if not compressed:
+            return self._payload
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self._payload, compresslevel=5)
+        return self._gzipped
+
+    async def handle(self, request):
+        self.scrapes += 1
+        now = time.monotonic()
+        if self._last_scrape is not None:
+            # Данные не старше периода опроса Prometheus; заявка истекает, если опросы прекратились
+            period = now - self._last_scrape
+            sampler.cadence.require("Prometheus", period, 2 * period)
+        self._last_scrape = now
+        if accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            return web.Response(body=self.payload(compressed=True), headers={
+                "Content-Type": CONTENT_TYPE, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        return web.Response(body=self.payload(), headers={
+            "Content-Type": CONTENT_TYPE, "Vary": "Accept-Encoding"})
+
+    async def start(self, listen: str):
+        """Запускает HTTP-сервер на 'адрес:порт'"""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        host, _, port = listen.rpartition(":")
+        await web.TCPSite(self._runner, host or None, int(port)).start()
+        logger.info(f"Метрики OpenMetrics доступны на http://{listen}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+exporter = MetricsExporter()
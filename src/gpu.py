@@ -0,0 +1,126 @@
+import logging
+import math
+
+logger = logging.getLogger()
+
+NAN = math.nan
+
+
+class GpuReading:
+    """Показания одной видеокарты за один замер"""
+    __slots__ = ('index', 'name', 'utilization', 'memory_utilization', 'temperature',
+                 'memory_used', 'memory_total', 'power', 'power_limit',
+                 'clock_sm', 'clock_memory')
+
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+        self.utilization = NAN         # %
+        self.memory_utilization = NAN  # % активности контроллера памяти
+        self.temperature = NAN         # °C
+        self.memory_used = NAN         # байт
+        self.memory_total = NAN        # байт
+        self.power = NAN               # Вт
+        self.power_limit = NAN         # Вт
+        self.clock_sm = NAN            # МГц
+        self.clock_memory = NAN        # МГц
+
+
+class NvmlBackend:
+    """Источник показаний GPU через NVML
+
+    Библиотека загружается и инициализируется в init(), который может
+    выполняться в фоне: до его завершения read() возвращает пустой список.
+    Дескрипторы устройств и их имена получаются один раз при инициализации;
+    каждый замер - один проход по всем устройствам.
+    """
+
+    def __init__(self, kind: str = 'nvml', nvml=None):
+        self.kind = kind
+        # Готовый модуль NVML (например, имитация в бенчмарке) заменяет загрузку pynvml
+        self.nvml = nvml
+        self.available = False
+        self._devices = []  # (индекс, дескриптор, имя)
+
+    @property
+    def device_count(self) -> int:
+        return len(self._devices)
+
+    def _load(self):
+        """Модуль NVML для kind: 'nvml' или 'none'"""
+        if self.kind == 'nvml':
+            try:
+                import pynvml
+                return pynvml
+            except ImportError:
+                logger.info("Пакет pynvml не установлен, мониторинг GPU отключён")
+        return None
+
+    def init(self):
+        """Загружает и инициализирует NVML, перечисляет устройства"""
+        if self.nvml is None:
+            self.nvml = self._load()
+        nvml = self.nvml
+        if nvml is None:
+            return
+        try:
+            nvml.nvmlInit()
+            devices = []
+            for index in range(nvml.nvmlDeviceGetCount()):
+                handle = nvml.nvmlDeviceGetHandleByIndex(index)
+                name = nvml.nvmlDeviceGetName(handle)
+                if isinstance(name, bytes):
+                    name = name.decode('utf-8', errors='replace')
+                devices.append((index, handle, name))
+        except nvml.NVMLError as e:
+            logger.info(f"NVML недоступен: {str(e)}")
+            return
+        self._devices = devices
+        self.available = bool(devices)
+
+    def read(self):
+        """Список GpuReading по всем устройствам"""
+        if not self.available:
+            return []
+        nvml = self.nvml
+        readings = []
+        for index, handle, name in self._devices:
+            reading = GpuReading(index, name)
+            # Отдельные показатели могут не поддерживаться картой - остаются nan
+            try:
+                rates = nvml.nvmlDeviceGetUtilizationRates(handle)
+                reading.utilization = float(rates.gpu)
+                reading.memory_utilization = float(rates.memory)
+            except nvml.NVMLError:
+                pass
+            try:
+                reading.temperature = float(
+                    nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU))
+            except nvml.NVMLError:
+                pass
+            try:
+                memory = nvml.nvmlDeviceGetMemoryInfo(handle)
+                reading.memory_used = float(memory.used)
+                reading.memory_total = float(memory.total)
+            except nvml.NVMLError:
+                pass
+            try:
+                reading.power = nvml.nvmlDeviceGetPowerUsage(handle) / 1000
+                reading.power_limit = nvml.nvmlDeviceGetEnforcedPowerLimit(handle) / 1000
+            except nvml.NVMLError:
+                pass
+            try:
+                reading.clock_sm = float(nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_SM))
+                reading.clock_memory = float(nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_MEM))
+            except nvml.NVMLError:
+                pass
+            readings.append(reading)
+        return readings
+
+
+def summarize(readings):
+    """Максимальные загрузка и температура по всем GPU (nan без GPU)"""
+    utilization = [r.utilization for r in readings if not math.isnan(r.utilization)]
+    temperature = [r.temperature for r in readings if not math.isnan(r.temperature)]
+    return (max(utilization) if utilization else NAN,
+            max(temperature) if temperature else NAN)
@@ -1,160 +1,152 @@
 import psutil
+import math
 import platform
 from datetime import datetime
-import matplotlib.pyplot as plt
+import io
 import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from aiogram.enums import ParseMode
 from .utils import logger
+from .config import GRAPH_CACHE_TTL
+from .report_cache import ReportCache
 
-try:
-    import pynvml
-    pynvml.nvmlInit()
-    GPU_AVAILABLE = True
-except (ImportError, pynvml.NVMLError, pynvml.NVMLError_LibraryNotFound):
-    GPU_AVAILABLE = False
+def format_gpu_value(value, unit):
+    """Форматирует показание GPU; nan означает отсутствие данных"""
+    return "N/A" if math.isnan(value) else f"{value:.1f}{unit}"
 
-async def get_cpu_temp():
-    if hasattr(psutil, "sensors_temperatures"):
-        temperatures = psutil.sensors_temperatures()
-        if not temperatures:
-            return 0, {}
-        temp_values = []
-        core_temps = {}
-        for sensor, entries in temperatures.items():
-            for i, entry in enumerate(entries):
-                    temp_values.append(entry.current)
-                    core_temps[i] = entry.current
-        if temp_values:
-            avg_temp = sum(temp_values) / len(temp_values)  # Средняя температура
-            return avg_temp, core_temps
-    return 0, {}
+# Окна графика загрузки CPU: секунды -> подпись
+CPU_GRAPH_WINDOWS = {60: "1м", 600: "10м", 3600: "1ч"}
 
-def get_gpu_info():
-    if not GPU_AVAILABLE:
-        return "N/A", "N/A"
+# matplotlib загружается при первой отрисовке графика
+_figure_class = None
 
-    try:
-        gpu_count = pynvml.nvmlDeviceGetCount()
-        if gpu_count == 0:
-            return "Нет доступных видеокарт", "N/A"
-        total_utilization = 0
-        total_temperature = 0
-        for i in range(gpu_count):
-            handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-            utilization = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
-            temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+def _get_figure_class():
+    """Загружает matplotlib с неинтерактивным бэкендом (один раз)"""
+    global _figure_class
+    if _figure_class is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+        _figure_class = Figure
+    return _figure_class
 
-            total_utilization += utilization
-            total_temperature += temperature
-        avg_utilization = total_utilization / gpu_count
-        avg_temperature = total_temperature / gpu_count
-        return f"{avg_utilization:.1f}%", f"{avg_temperature:.1f}°C"
-    except pynvml.NVMLError:
-        return "Ошибка GPU", "Ошибка"
+# Отрисовка графиков вне event loop
+_graph_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="graph")
+# Кэш отрисованных графиков: одновременные запросы одного графика ждут одну отрисовку
+_graph_cache = ReportCache(GRAPH_CACHE_TTL)
 
-def collect_cpu_data(duration=10, interval=1):
-    timestamps = []
-    cpu_usage = []
-    for i in range(duration):
-        timestamps.append(i * interval)
-        cpu_usage.append(psutil.cpu_percent())
-        time.sleep(interval)
-    return timestamps, cpu_usage
+def render_cpu_graph(timestamps, cpu_usage, window: int) -> bytes:
+    """Рисует график загрузки CPU и возвращает PNG в памяти"""
+    # Figure без pyplot не использует глобальное состояние и безопасна в потоках
+    figure = _get_figure_class()(figsize=(6, 3))
+    ax = figure.add_subplot()
+    now = timestamps[-1] if timestamps else time.time()
+    scale = 60 if window >= 600 else 1
+    x = [(t - now) / scale for t in timestamps]
+    ax.plot(x, cpu_usage, linestyle='-', color='b', label='CPU %',
+            marker='o' if len(x) <= 60 else None)
+    ax.set_xlim(-window / scale, 0)
+    ax.set_ylim(0, 100)
+    ax.set_xlabel('Время (мин)' if scale == 60 else 'Время (сек)')
+    ax.set_ylabel('Загрузка CPU (%)')
+    ax.set_title(f'График загрузки CPU ({CPU_GRAPH_WINDOWS.get(window, f"{window}с")})')
+    ax.legend()
+    ax.grid()
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
 
-def plot_cpu_graph():
-    timestamps, cpu_usage = collect_cpu_data()
-    plt.figure(figsize=(6, 3))
-    plt.plot(timestamps, cpu_usage, marker='o', linestyle='-', color='b', label='CPU %')
-    plt.xlabel('Время (сек)')
-    plt.ylabel('Загрузка CPU (%)')
-    plt.title('График загрузки CPU')
-    plt.legend()
-    plt.grid()
-    plt.tight_layout()
-    plt.savefig("logs/cpu_graph.png")
-    plt.close()
+async def plot_cpu_graph(window: int = 60, source=None) -> bytes:
+    """PNG с графиком загрузки CPU за окно из истории хоста (по умолчанию локального)"""
+    from .sampler import sampler
 
-async def get_system_info():
-    uname = platform.uname()
-    boot_time = datetime.fromtimestamp(psutil.boot_time())
-    avg_temp, core_temps = await get_cpu_temp()
-    gpu_utilization, gpu_temp = get_gpu_info()
+    source = source or sampler
+
+    async def build():
+        timestamps, cpu_usage = source.series('cpu', window)
+        return await asyncio.get_running_loop().run_in_executor(
+            _graph_executor, render_cpu_graph, timestamps, cpu_usage, window)
+
+    return await _graph_cache.get(("cpu_graph", source.name, window), build)
+
+async def get_system_info(source=None):
+    from .sampler import sampler
+
+    source = source or sampler
+    snapshot = await source.snapshot()
     
     system_info = f"*Информация о системе:*\n"
-    system_info += f"*Система:* {uname.system}\n"
-    system_info += f"*Имя узла:* {uname.node}\n"
-    system_info += f"*Релиз:* {uname.release}\n"
-    system_info += f"*Версия:* {uname.version}\n"
-    system_info += f"*Машина:* {uname.machine}\n"
-    system_info += f"*Процессор:* {uname.processor}\n"
-    system_info += f"*Загрузка CPU:* {psutil.cpu_percent()}%\n"
-    system_info += f"*Температура CPU:* {avg_temp:.1f}°C\n"
-    system_info += f"*Загрузка GPU:* {gpu_utilization}\n"
-    system_info += f"*Температура GPU:* {gpu_temp}\n"
-    system_info += f"*Память:* {psutil.virtual_memory().percent}% использовано\n"
-    system_info += f"*Время запуска:* {boot_time.strftime('%d.%m.%Y %H:%M:%S')}"
+    if source is sampler:
+        uname = platform.uname()
+        boot_time = datetime.fromtimestamp(psutil.boot_time())
+        system_info += f"*Система:* {uname.system}\n"
+        system_info += f"*Имя узла:* {uname.node}\n"
+        system_info += f"*Релиз:* {uname.release}\n"
+        system_info += f"*Версия:* {uname.version}\n"
+        system_info += f"*Машина:* {uname.machine}\n"
+        system_info += f"*Процессор:* {uname.processor}\n"
+    else:
+        # Для удалённых хостов известны только присланные агентом замеры
+        system_info += f"*Хост:* {source.name}\n"
+        system_info += f"*Данные на:* {datetime.fromtimestamp(snapshot.time).strftime('%d.%m.%Y %H:%M:%S')}\n"
+    system_info += f"*Загрузка CPU:* {snapshot.cpu:.1f}%\n"
+    system_info += f"*Температура CPU:* {format_gpu_value(snapshot.cpu_temp, '°C')}\n"
+    system_info += f"*Загрузка GPU:* {format_gpu_value(snapshot.gpu_util, '%')}\n"
+    system_info += f"*Температура GPU:* {format_gpu_value(snapshot.gpu_temp, '°C')}\n"
+    system_info += f"*Память:* {snapshot.mem_percent}% использовано"
+    if source is sampler:
+        system_info += f"\n*Время запуска:* {boot_time.strftime('%d.%m.%Y %H:%M:%S')}"
     
     return system_info
 
 async def check_thresholds(bot):
-    """Проверяет пороговые значения и отправляет уведомления"""
-    from .config import (CPU_LOAD_THRESHOLD, CPU_TEMP_THRESHOLD, 
-                       GPU_LOAD_THRESHOLD, GPU_TEMP_THRESHOLD,
-                       CHECK_INTERVAL, ALLOWED_USERS, notification_state)
+    """Проверяет правила оповещений по каждому снимку и отправляет уведомления"""
+    from .config import (ALLOWED_USERS, NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_RATE,
+                         NOTIFY_COALESCE_WINDOW, NOTIFY_MAX_RETRIES, SAMPLE_NEAR_MARGIN)
+    from .sampler import sampler
+    from .alerts import alert_engine
+    from .notifier import Notifier
+    from .watchlist import watchlist
+    
+    notifier = Notifier(
+        bot,
+        header="🔔 *Уведомление о состоянии системы:*\n\n",
+        global_rate=NOTIFY_GLOBAL_RATE,
+        chat_rate=NOTIFY_CHAT_RATE,
+        coalesce_window=NOTIFY_COALESCE_WINDOW,
+        max_retries=NOTIFY_MAX_RETRIES,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    
+    # Правила проверяются в обработчике снимка, доставка - в очереди уведомлений
+    pending = asyncio.Queue()
+    
+    def on_snapshot(snapshot):
+        events = alert_engine.evaluate(snapshot)
+        if events:
+            pending.put_nowait(events)
+    
+    sampler.add_listener(on_snapshot)
+    # Пока метрика у порога правила, сборщик опрашивает с наименьшим интервалом
+    sampler.cadence.add_probe(lambda snapshot: alert_engine.near_threshold(snapshot, SAMPLE_NEAR_MARGIN))
+    
+    # Утечки памяти у процессов из списка наблюдения (/watch_proc)
+    def on_leak(target, process, trend):
+        text = (f"⚠️ *Возможная утечка памяти:* `{process.name}` (PID {process.pid})\n"
+                f"RSS {process.samples.latest()[1] / 1024**2:.1f} MB, растёт на "
+                f"{trend.slope * 3600 / 1024**2:.1f} MB/ч (R² {trend.r2:.2f})")
+        for user_id in ALLOWED_USERS:
+            notifier.notify(user_id, text)
+    
+    watchlist.add_listener(on_leak)
     
     while True:
+        events = await pending.get()
         try:
-            # Проверка CPU
-            cpu_load = psutil.cpu_percent()
-            avg_temp, _ = await get_cpu_temp()
-            
-            # Проверка GPU
-            gpu_utilization, gpu_temp = get_gpu_info()
-            gpu_utilization = float(gpu_utilization.replace('%', '')) if gpu_utilization != 'N/A' else 0
-            gpu_temp = float(gpu_temp.replace('°C', '')) if gpu_temp != 'N/A' else 0
-            
-            # Формирование сообщения об уведомлениях
-            notifications = []
-            
-            # CPU Load
-            if cpu_load > CPU_LOAD_THRESHOLD and not notification_state['cpu_load']:
-                notifications.append(f"⚠️ Высокая загрузка CPU: {cpu_load}%")
-                notification_state['cpu_load'] = True
-            elif cpu_load <= CPU_LOAD_THRESHOLD:
-                notification_state['cpu_load'] = False
-                
-            # CPU Temp
-            if avg_temp > CPU_TEMP_THRESHOLD and not notification_state['cpu_temp']:
-                notifications.append(f"🌡️ Высокая температура CPU: {avg_temp:.1f}°C")
-                notification_state['cpu_temp'] = True
-            elif avg_temp <= CPU_TEMP_THRESHOLD:
-                notification_state['cpu_temp'] = False
-                
-            # GPU Load
-            if gpu_utilization > GPU_LOAD_THRESHOLD and not notification_state['gpu_load']:
-                notifications.append(f"⚠️ Высокая загрузка GPU: {gpu_utilization}%")
-                notification_state['gpu_load'] = True
-            elif gpu_utilization <= GPU_LOAD_THRESHOLD:
-                notification_state['gpu_load'] = False
-                
-            # GPU Temp
-            if gpu_temp > GPU_TEMP_THRESHOLD and not notification_state['gpu_temp']:
-                notifications.append(f"🌡️ Высокая температура GPU: {gpu_temp:.1f}°C")
-                notification_state['gpu_temp'] = True
-            elif gpu_temp <= GPU_TEMP_THRESHOLD:
-                notification_state['gpu_temp'] = False
-                
-            # Отправка уведомлений
-            if notifications:
-                message = "🔔 *Уведомление о состоянии системы:*\n\n" + "\n".join(notifications)
-                for user_id in ALLOWED_USERS:
-                    try:
-                        await bot.send_message(user_id, message, parse_mode=ParseMode.MARKDOWN)
-                    except Exception as e:
-                        logger.error(f"Ошибка отправки уведомления пользователю {user_id}: {str(e)}")
-                        
+            for event in events:
+                for user_id in event.rule.users or ALLOWED_USERS:
+                    notifier.notify(user_id, event.text)
         except Exception as e:
             logger.error(f"Ошибка при проверке пороговых значений: {str(e)}")
-            
-        await asyncio.sleep(CHECK_INTERVAL) 
\ No newline at end of file
@@ -0,0 +1,282 @@
+import asyncio
+import math
+import mmap
+import os
+import struct
+import time
+
+from .config import (HISTORY_DIR, HISTORY_RAW_DAYS, HISTORY_MINUTE_DAYS,
+                     HISTORY_FLUSH_INTERVAL)
+from .utils import logger
+
+# Метрики истории: имя -> (поле снимка, признак счётчика, единица измерения).
+# Для счётчиков сохраняется скорость изменения в секунду.
+HISTORY_METRICS = {
+    'cpu': ('cpu', False, '%'),
+    'cpu_temp': ('cpu_temp', False, '°C'),
+    'mem': ('mem_percent', False, '%'),
+    'swap': ('swap_percent', False, '%'),
+    'gpu': ('gpu_util', False, '%'),
+    'gpu_temp': ('gpu_temp', False, '°C'),
+    'disk_read': ('disk_read', True, 'B/s'),
+    'disk_write': ('disk_write', True, 'B/s'),
+    'net_rx': ('net_recv', True, 'B/s'),
+    'net_tx': ('net_sent', True, 'B/s'),
+}
+
+# Сырые точки: (время, значение)
+RAW_RECORD = struct.Struct('<dd')
+# Агрегаты: (начало интервала, минимум, максимум, среднее, число точек)
+ROLLUP_RECORD = struct.Struct('<ddddd')
+
+# Уровни хранения: имя -> (длина интервала агрегата, формат сегмента файла, срок хранения в днях)
+TIERS = {
+    'raw': (0, '%Y%m%d', HISTORY_RAW_DAYS),
+    '1m': (60, '%Y%m', HISTORY_MINUTE_DAYS),
+    '1h': (3600, '%Y', None),
+}
+
+
+class _Rollup:
+    """Накопитель агрегата для одного интервала"""
+    __slots__ = ('start', 'low', 'high', 'total', 'count')
+
+    def __init__(self):
+        self.start = None
+        self.count = 0
+
+    def add(self, start, value):
+        """Добавляет точку; возвращает закрытый агрегат при смене интервала"""
+        closed = None
+        if start != self.start:
+            if self.count:
+                closed = (self.start, self.low, self.high, self.total / self.count, self.count)
+            self.start = start
+            self.low = self.high = value
+            self.total = 0.0
+            self.count = 0
+        self.low = min(self.low, value)
+        self.high = max(self.high, value)
+        self.total += value
+        self.count += 1
+        return closed
+
+    def take(self):
+        """Незакрытый агрегат (или None); накопитель начинает интервал заново
+
+        После перезапуска тот же интервал получит ещё одну запись с тем же
+        началом, а чтение складывает их с весом по числу точек.
+        """
+        if not self.count:
+            return None
+        partial = (self.start, self.low, self.high, self.total / self.count, self.count)
+        self.start = None
+        self.count = 0
+        return partial
+
+
+class HistoryStore:
+    """Хранилище истории метрик в append-only файлах фиксированной ширины
+
+    Каждая метрика пишется в сырой уровень и сворачивается в минутные и
+    часовые агрегаты. Файлы разбиты на сегменты по дням, месяцам и годам,
+    устаревшие сегменты удаляются. Чтение идёт через mmap с бинарным поиском
+    по времени, без загрузки файлов в память.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pending = []  # (метрика, уровень, время, упакованная запись)
+        self._previous = {}  # метрика-счётчик -> (время, значение)
+        self._rollups = {(metric, tier): _Rollup()
+                         for metric in HISTORY_METRICS
+                         for tier, (period, _, _) in TIERS.items() if period}
+        self._checked = set()  # сегменты, проверенные на оборванную запись
+        self._lock = asyncio.Lock()
+
+    def _path(self, metric: str, tier: str, timestamp: float) -> str:
+        segment = time.strftime(TIERS[tier][1], time.gmtime(timestamp))
+        return os.path.join(self.directory, metric, f"{tier}-{segment}.bin")
+
+    def record(self, snapshot):
+        """Ставит в очередь на запись точки из снимка сборщика"""
+        timestamp = snapshot.time
+        for metric, (field, is_counter, _) in HISTORY_METRICS.items():
+            value = getattr(snapshot, field)
+            if math.isnan(value):
+                continue
+            if is_counter:
+                previous = self._previous.get(metric)
+                self._previous[metric] = (timestamp, value)
+                if previous is None or timestamp <= previous[0] or value < previous[1]:
+                    continue
+                value = (value - previous[1]) / (timestamp - previous[0])
+            self._pending.append((metric, 'raw', timestamp, RAW_RECORD.pack(timestamp, value)))
+            for tier, (period, _, _) in TIERS.items():
+                if not period:
+                    continue
+                closed = self._rollups[(metric, tier)].add(timestamp - timestamp % period, value)
+                if closed:
+                    self._pending.append((metric, tier, closed[0], ROLLUP_RECORD.pack(*closed)))
+
+    def _write(self, pending):
+        files = {}
+        try:
+            for metric, tier, timestamp, data in pending:
+                path = self._path(metric, tier, timestamp)
+                handle = files.get(path)
+                if handle is None:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if path not in self._checked:
+                        self._repair(path, RAW_RECORD if tier == 'raw' else ROLLUP_RECORD)
+                        self._checked.add(path)
+                    handle = files[path] = open(path, 'ab')
+                handle.write(data)
+        finally:
+            for handle in files.values():
+                handle.close()
+
+    @staticmethod
+    def _repair(path: str, record: struct.Struct):
+        """Отрезает хвост записи, оборванной аварийной остановкой
+
+        Иначе все следующие записи сегмента читались бы со сдвигом.
+        """
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        tail = size % record.size
+        if tail:
+            logger.warning(f"История {path}: отброшена неполная запись ({tail} байт)")
+            os.truncate(path, size - tail)
+
+    def _expire(self):
+        now = time.time()
+        for tier, (_, _, days) in TIERS.items():
+            if days is None:
+                continue
+            oldest = self._path('', tier, now - days * 86400).rsplit(os.sep, 1)[1]
+            for metric in HISTORY_METRICS:
+                directory = os.path.join(self.directory, metric)
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    if name.startswith(f"{tier}-") and name < oldest:
+                        os.unlink(os.path.join(directory, name))
+
+    async def flush(self):
+        """Записывает накопленные точки на диск"""
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                await asyncio.to_thread(self._write, pending)
+
+    async def close(self):
+        """Сохраняет незакрытые минутные и часовые агрегаты и сбрасывает очередь на диск"""
+        for (metric, tier), rollup in self._rollups.items():
+            partial = rollup.take()
+            if partial:
+                self._pending.append((metric, tier, partial[0], ROLLUP_RECORD.pack(*partial)))
+        await self.flush()
+
+    async def run(self):
+        """Периодический сброс на диск и удаление устаревших сегментов"""
+        last_expire = 0.0
+        while True:
+            await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                if time.time() - last_expire > 3600:
+                    last_expire = time.time()
+                    await asyncio.to_thread(self._expire)
+            except Exception as e:
+                logger.error(f"Ошибка при записи истории метрик: {str(e)}")
+
+    def _choose_tier(self, start: float, end: float) -> str:
+        span = end - start
+        now = time.time()
+        if span <= 2 * 3600 and start >= now - HISTORY_RAW_DAYS * 86400:
+            return 'raw'
+        if span <= 3 * 86400 and start >= now - HISTORY_MINUTE_DAYS * 86400:
+            return '1m'
+        return '1h'
+
+    def _segments(self, metric: str, tier: str, start: float, end: float):
+        directory = os.path.join(self.directory, metric)
+        if not os.path.isdir(directory):
+            return []
+        first = self._path(metric, tier, start).rsplit(os.sep, 1)[1]
+        last = self._path(metric, tier, end).rsplit(os.sep, 1)[1]
+        names = sorted(name for name in os.listdir(directory)
+                       if name.startswith(f"{tier}-") and first <= name <= last)
+        return [os.path.join(directory, name) for name in names]
+
+    @staticmethod
+    def _scan(path: str, record: struct.Struct, start: float, end: float):
+        """Записи сегмента из диапазона [start, end]"""
+        with open(path, 'rb') as handle:
+            size = os.fstat(handle.fileno()).st_size
+            count = size // record.size
+            if not count:
+                return
+            with mmap.mmap(handle.fileno(), count * record.size, access=mmap.ACCESS_READ) as data:
+                # Бинарный поиск первой записи не раньше start
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    if record.unpack_from(data, middle * record.size)[0] < start:
+                        low = middle + 1
+                    else:
+                        high = middle
+                for index in range(low, count):
+                    values = record.unpack_from(data, index * record.size)
+                    if values[0] > end:
+                        break
+                    yield values
+
+    def _query(self, metric: str, start: float, end: float, points: int):
+        tier = self._choose_tier(start, end)
+        record = RAW_RECORD if tier == 'raw' else ROLLUP_RECORD
+        width = (end - start) / points
+        buckets = {}
+        low = high = None
+        total = 0.0
+        count = 0
+        for path in self._segments(metric, tier, start, end):
+            for values in self._scan(path, record, start, end):
+                if tier == 'raw':
+                    timestamp, value = values
+                    v_low = v_high = v_avg = value
+                    weight = 1
+                else:
+                    timestamp, v_low, v_high, v_avg, weight = values
+                index = min(int((timestamp - start) / width), points - 1)
+                bucket = buckets.get(index)
+                if bucket is None:
+                    buckets[index] = [v_low, v_high, v_avg * weight, weight]
+                else:
+                    bucket[0] = min(bucket[0], v_low)
+                    bucket[1] = max(bucket[1], v_high)
+                    bucket[2] += v_avg * weight
+                    bucket[3] += weight
+                low = v_low if low is None else min(low, v_low)
+                high = v_high if high is None else max(high, v_high)
+                total += v_avg * weight
+                count += weight
+        rows = [(start + index * width, b[0], b[2] / b[3], b[1])
+                for index, b in sorted(buckets.items())]
+        summary = (low, total / count, high) if count else None
+        return tier, rows, summary
+
+    async def query(self, metric: str, start: float, end: float, points: int = 12):
+        """Агрегированные точки метрики за интервал
+
+        Возвращает уровень хранения, до points строк (время, мин, среднее, макс)
+        и общую сводку (мин, среднее, макс) или None, если данных нет.
+        """
+        await self.flush()
+        return await asyncio.to_thread(self._query, metric, start, end, points)
+
+
+history = HistoryStore(HISTORY_DIR)
@@ -0,0 +1,161 @@
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger()
+
+NAN = math.nan
+
+# Драйверы датчиков процессора
+CPU_CHIPS = frozenset({'coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'soc_thermal'})
+
+
+class TempSensor:
+    """Один файл temp*_input: подпись и открытый дескриптор"""
+    __slots__ = ('chip', 'label', 'kind', 'path', 'fd')
+
+    def __init__(self, chip, label, kind, path, fd):
+        self.chip = chip
+        self.label = label
+        self.kind = kind    # 'package', 'core', 'cpu' (прочие датчики CPU) или 'other'
+        self.path = path
+        self.fd = fd
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _kind(driver: str, label: str) -> str:
+    """Вид датчика по имени драйвера (до переименования одинаковых чипов) и подписи"""
+    if label.startswith(("Package id", "Tdie", "Tctl")) or (driver in CPU_CHIPS and label == "temp1"):
+        return 'package'
+    if label.startswith("Core "):
+        return 'core'
+    if driver in CPU_CHIPS:
+        return 'cpu'
+    return 'other'
+
+
+class HwmonReader:
+    """Чтение температур напрямую из sysfs hwmon
+
+    Каталоги hwmon обходятся один раз: строится карта датчиков с подписями
+    (чип, ядро, пакет) и открываются файлы temp*_input. На каждом замере
+    читаются только эти файлы через os.pread по уже открытым дескрипторам -
+    без повторного обхода каталогов, как в psutil.sensors_temperatures().
+    Если датчик пропал (драйвер выгружен), карта строится заново; появление
+    новых чипов проверяется списком каталогов не чаще rescan_interval секунд.
+    """
+
+    def __init__(self, root: str, rescan_interval: float = 60.0):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self.sensors = None
+        self._kinds = {}     # (чип, подпись) -> вид датчика
+        self._entries = []   # каталоги чипов на момент построения карты
+        self._checked = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Есть ли датчики: пустой каталог (контейнер, ВМ) - повод взять данные psutil"""
+        self._refresh()
+        return bool(self.sensors)
+
+    def _list(self) -> list:
+        try:
+            return sorted(os.listdir(self.root))
+        except OSError:
+            return []
+
+    def _refresh(self):
+        """Строит карту при первом обращении и при изменении набора чипов"""
+        if self.sensors is None:
+            self.discover()
+            return
+        now = time.monotonic()
+        if now - self._checked < self.rescan_interval:
+            return
+        self._checked = now
+        if self._list() != self._entries:
+            self.discover()
+
+    def discover(self):
+        self.close()
+        sensors = []
+        chips = self._list()
+        names = {entry: _read_text(os.path.join(self.root, entry, "name")) or entry for entry in chips}
+        for entry in chips:
+            directory = os.path.join(self.root, entry)
+            driver = chip = names[entry]
+            # Одинаковые чипы (например, coretemp двух сокетов) различаются каталогом
+            if list(names.values()).count(chip) > 1:
+                chip = f"{chip} ({entry})"
+            try:
+                files = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for name in files:
+                if not (name.startswith("temp") and name.endswith("_input")):
+                    continue
+                prefix = name[:-len("_input")]
+                label = _read_text(os.path.join(directory, prefix + "_label")) or prefix
+                path = os.path.join(directory, name)
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except OSError:
+                    continue
+                sensors.append(TempSensor(chip, label, _kind(driver, label), path, fd))
+        self.sensors = sensors
+        self._entries = chips
+        self._checked = time.monotonic()
+        self._kinds = {(sensor.chip, sensor.label): sensor.kind for sensor in sensors}
+        logger.info(f"Датчики температуры hwmon: {len(sensors)}")
+
+    def close(self):
+        for sensor in self.sensors or ():
+            try:
+                os.close(sensor.fd)
+            except OSError:
+                pass
+        self.sensors = None
+
+    def read(self) -> dict:
+        """Температуры °C: (чип, подпись) -> значение"""
+        self._refresh()
+        temps = {}
+        for sensor in self.sensors:
+            try:
+                raw = os.pread(sensor.fd, 32, 0)
+            except OSError:
+                if not os.path.exists(sensor.path):
+                    # Устройство исчезло - на следующем замере карта строится заново
+                    self.close()
+                    break
+                # Некоторые датчики временно отвечают ошибкой (ENODATA, EIO)
+                continue
+            try:
+                temps[(sensor.chip, sensor.label)] = int(raw) / 1000
+            except ValueError:
+                continue
+        return temps
+
+    def cpu_temperature(self, temps: dict) -> float:
+        """Температура процессора: пакеты, иначе ядра, иначе датчики CPU, иначе все"""
+        if not temps:
+            return NAN
+        kinds = self._kinds
+        for selected in (
+            [t for key, t in temps.items() if kinds.get(key) == 'package'],
+            [t for key, t in temps.items() if kinds.get(key) == 'core'],
+            [t for key, t in temps.items() if kinds.get(key) == 'cpu'],
+            list(temps.values()),
+        ):
+            if selected:
+                return sum(selected) / len(selected)
+        return NAN
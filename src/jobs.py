@@ -0,0 +1,304 @@
+import asyncio
+import errno
+import os
+import resource
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+
+from .config import (CONSOLE_TIMEOUT, CONSOLE_EDIT_INTERVAL, CONSOLE_TAIL_CHARS, CONSOLE_SPOOL_MEMORY,
+                     JOBS_MAX_CONCURRENT, JOBS_PER_USER, JOB_TIMEOUT, JOBS_HISTORY, JOB_KILL_GRACE,
+                     JOB_CPU_SECONDS, JOB_MEMORY_MB, JOB_FILE_MB, JOB_NICE)
+from .utils import CommandResult, logger
+
+# Размер блока чтения вывода команды
+_READ_CHUNK = 64 * 1024
+
+# Состояния задания: SPAWNING - процесс запускается, ссылки на него ещё нет
+QUEUED, SPAWNING, RUNNING, DONE = "queued", "spawning", "running", "done"
+
+
+def _limit(kind, value: int) -> int:
+    # Жёсткий предел бота не поднять, но можно понизить
+    _, hard = resource.getrlimit(kind)
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+# Ограничения ресурсов команды: (ресурс, ключ prlimit, значение)
+_LIMITS = tuple((kind, option, _limit(kind, value)) for kind, option, value in (
+    (resource.RLIMIT_CPU, "--cpu", JOB_CPU_SECONDS),
+    (resource.RLIMIT_DATA, "--data", JOB_MEMORY_MB * 1024 * 1024),
+    (resource.RLIMIT_FSIZE, "--fsize", JOB_FILE_MB * 1024 * 1024),
+) if value > 0)
+_PRLIMIT = shutil.which("prlimit")
+_NICE = shutil.which("nice")
+
+
+def limited_command(args: list) -> list:
+    """Команда, обёрнутая в prlimit и nice
+
+    Ограничения выставляются до exec самой команды, поэтому их наследуют все
+    её потомки. preexec_fn не подходит: бот многопоточный, а код между fork
+    и exec в таком процессе может зависнуть на блокировке другого потока.
+    """
+    prefix = []
+    if _LIMITS and _PRLIMIT:
+        prefix += [_PRLIMIT, *(f"{option}={value}:{value}" for _, option, value in _LIMITS), "--"]
+    if JOB_NICE and _NICE:
+        prefix += [_NICE, "-n", str(JOB_NICE), "--"]
+    if prefix and shutil.which(args[0]) is None:
+        # Иначе о ненайденной команде сообщила бы обёртка с кодом 127
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), args[0])
+    return prefix + args
+
+
+def limit_process(pid: int):
+    """Запасной путь без prlimit/nice в системе: ограничения ставятся уже запущенному процессу
+
+    Потомки, созданные командой до этого вызова, ограничений не получат.
+    """
+    try:
+        if not _PRLIMIT:
+            for kind, _, value in _LIMITS:
+                resource.prlimit(pid, kind, (value, value))
+        if JOB_NICE and not _NICE:
+            niceness = os.getpriority(os.PRIO_PROCESS, 0) + JOB_NICE
+            os.setpriority(os.PRIO_PROCESS, pid, min(niceness, 19))
+    except OSError as e:
+        logger.warning(f"Не удалось ограничить ресурсы процесса {pid}: {str(e)}")
+
+
+class Job:
+    """Команда консоли в собственной группе процессов
+
+    Сигналы отправляются всей группе (killpg), поэтому вместе с командой
+    завершаются и её потомки: конвейеры sh -c, запущенные ею демоны.
+    """
+    __slots__ = ('id', 'user_id', 'command', 'background', 'timeout', 'state', 'result',
+                 'process', 'task', 'killed', 'created', 'started', 'finished',
+                 'on_output', 'on_finish')
+
+    def __init__(self, job_id: int, user_id: int, command: str, background: bool,
+                 on_output=None, on_finish=None):
+        self.id = job_id
+        self.user_id = user_id
+        self.command = command
+        self.background = background
+        self.timeout = JOB_TIMEOUT if background else CONSOLE_TIMEOUT
+        self.state = QUEUED
+        self.result = CommandResult(CONSOLE_TAIL_CHARS, CONSOLE_SPOOL_MEMORY)
+        self.process = None
+        self.task = None
+        self.killed = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.on_output = on_output   # корутина(хвост вывода), только пока задание не в фоне
+        self.on_finish = on_finish   # корутина(задание) по завершении
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def detach(self):
+        """Переводит задание в фон: предел времени JOB_TIMEOUT, вывод без живых правок"""
+        self.background = True
+        self.timeout = JOB_TIMEOUT
+        self.on_output = None
+
+    def _signal(self, signum) -> bool:
+        try:
+            os.killpg(self.process.pid, signum)
+        except (ProcessLookupError, PermissionError):
+            return False
+        return True
+
+    async def terminate(self):
+        """SIGTERM группе, через JOB_KILL_GRACE секунд - SIGKILL"""
+        if not self._signal(signal.SIGTERM):
+            return
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=JOB_KILL_GRACE)
+        except asyncio.TimeoutError:
+            pass
+        self._signal(signal.SIGKILL)
+
+    async def _before_deadline(self, make):
+        """Ждёт make() до предела времени задания
+
+        Предел перечитывается после каждого ожидания: задание могли перевести
+        в фон. Отмена чтения по таймауту не теряет данных - они остаются в буфере.
+        """
+        while True:
+            remaining = self.started + self.timeout - time.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                return await asyncio.wait_for(make(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        result = self.result
+        # С этого момента /kill не снимает задачу, а помечает задание: отмена посреди
+        # запуска оставила бы уже созданную группу процессов без владельца
+        self.state = SPAWNING
+        try:
+            try:
+                # stderr объединён с stdout, чтобы сохранить порядок вывода
+                self.process = await asyncio.create_subprocess_exec(
+                    *limited_command(shlex.split(self.command)),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+            except Exception as e:
+                result.error = f"Ошибка при выполнении команды: {str(e)}"
+                return
+            self.started = time.time()
+            self.state = RUNNING
+            if not (_PRLIMIT and _NICE):
+                limit_process(self.process.pid)
+
+            # Задание, остановленное во время запуска, сразу завершается в finally
+            if not self.killed:
+                await self._communicate()
+        finally:
+            # Процессы группы, отцепившиеся от вывода, завершаются вместе с командой;
+            # при отмене задачи (остановка бота) группа тоже не переживает бота
+            if self.process is not None:
+                self._signal(signal.SIGKILL)
+        result.returncode = await self.process.wait()
+
+    async def _communicate(self):
+        """Читает вывод до завершения команды или до предела времени"""
+        result = self.result
+        loop = asyncio.get_running_loop()
+        last_update = loop.time()
+        try:
+            while True:
+                chunk = await self._before_deadline(lambda: self.process.stdout.read(_READ_CHUNK))
+                if not chunk:
+                    break
+                result.feed(chunk)
+                if self.on_output and loop.time() - last_update >= CONSOLE_EDIT_INTERVAL:
+                    last_update = loop.time()
+                    await self.on_output(result.tail)
+            await self._before_deadline(self.process.wait)
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            await self.terminate()
+
+
+class JobScheduler:
+    """Очередь заданий консоли
+
+    Одновременно выполняется не больше max_concurrent команд на весь бот
+    (остальные ждут в очереди), у пользователя - не больше per_user
+    заданий, включая ожидающие. Завершённые задания хранятся, пока их не
+    больше history, и видны в /jobs.
+    """
+
+    def __init__(self, max_concurrent: int, per_user: int, history: int):
+        self.per_user = per_user
+        self.history = history
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.jobs = {}   # id -> Job в порядке создания
+        self._next_id = 1
+
+    def active(self, user_id: int = None):
+        return [job for job in self.jobs.values()
+                if job.state != DONE and (user_id is None or job.user_id == user_id)]
+
+    def create(self, user_id: int, command: str, background: bool = False,
+               on_output=None, on_finish=None):
+        """Регистрирует задание (запуск - start); None, если у пользователя уже per_user заданий
+
+        Номер известен до запуска, и его можно показать раньше, чем придёт вывод.
+        """
+        if len(self.active(user_id)) >= self.per_user:
+            return None
+        job = Job(self._next_id, user_id, command, background, on_output, on_finish)
+        self._next_id += 1
+        self.jobs[job.id] = job
+        return job
+
+    def start(self, job: Job):
+        """Ставит задание в очередь на выполнение"""
+        job.task = asyncio.create_task(self._run(job))
+
+    def discard(self, job: Job):
+        """Убирает не запущенное задание"""
+        self.jobs.pop(job.id, None)
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.state in (SPAWNING, RUNNING))
+
+    async def _run(self, job: Job):
+        try:
+            async with self._semaphore:
+                if not job.killed:
+                    await job.run()
+        except asyncio.CancelledError:
+            # Снятое с очереди задание завершается как обычно; прочая отмена - дальше
+            if not job.killed:
+                raise
+        finally:
+            job.state = DONE
+            job.finished = time.time()
+            logger.info(f"Задание #{job.id} ({job.command}) завершено: код {job.result.returncode}"
+                        f"{', остановлено' if job.killed else ''}"
+                        f"{', превышено время' if job.result.timed_out else ''}")
+            self._trim()
+        if job.on_finish:
+            try:
+                await job.on_finish(job)
+            except Exception as e:
+                logger.error(f"Ошибка отправки результата задания #{job.id}: {str(e)}")
+        job.result.close()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state == DONE]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self.jobs[job_id]
+
+    async def kill(self, job_id: int) -> bool:
+        """Останавливает задание (ожидающее - снимает с очереди)"""
+        job = self.jobs.get(job_id)
+        if job is None or job.state == DONE:
+            return False
+        job.killed = True
+        if job.state == QUEUED:
+            if job.task is not None:
+                job.task.cancel()
+        elif job.state == RUNNING:
+            await job.terminate()
+        # SPAWNING: run() остановит группу, как только процесс будет запущен
+        return True
+
+    async def shutdown(self):
+        """Останавливает все задания при остановке бота"""
+        jobs = self.active()
+        for job in jobs:
+            job.killed = True
+            job.on_finish = None
+            if job.state == RUNNING:
+                job._signal(signal.SIGTERM)
+            elif job.state == QUEUED and job.task is not None:
+                job.task.cancel()
+        tasks = [job.task for job in jobs if job.task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=JOB_KILL_GRACE)
+            for task in tasks:
+                # Отменённая задача убивает группу процессов в finally у Job.run
+                task.cancel()
+
+
+scheduler = JobScheduler(JOBS_MAX_CONCURRENT, JOBS_PER_USER, JOBS_HISTORY)
@@ -0,0 +1,54 @@
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+
+from .perf import perf
+from .utils import audit
+
+
+class AuditMiddleware(BaseMiddleware):
+    """Пишет запись аудита и задержку в гистограмму обработчика для каждого события"""
+
+    async def __call__(self, handler, event, data):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            outcome = f"error: {type(e).__name__}"
+            raise
+        finally:
+            if isinstance(event, CallbackQuery):
+                action = f"callback: {event.data}"
+            elif isinstance(event, Message):
+                action = event.text or event.content_type
+            else:
+                action = type(event).__name__
+            handler_object = data.get("handler")
+            name = handler_object.callback.__name__ if handler_object else None
+            latency = time.perf_counter() - start
+            if name:
+                perf.observe_handler(name, latency)
+            audit(
+                event.from_user.id if event.from_user else None,
+                action,
+                latency,
+                outcome,
+                handler=name
+            )
+
+
+class UpdateLatencyMiddleware(BaseMiddleware):
+    """Время от получения обновления до конца его обработки (ответ уже отправлен)
+
+    В режиме webhook отсчёт идёт от прихода HTTP-запроса (received_at),
+    при polling - от передачи обновления диспетчеру.
+    """
+
+    async def __call__(self, handler, event, data):
+        received_at = data.get("received_at") or time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            perf.updates.observe(time.perf_counter() - received_at)
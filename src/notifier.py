@@ -0,0 +1,108 @@
+import asyncio
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import (TelegramRetryAfter, TelegramNetworkError,
+                                TelegramServerError)
+
+from .utils import logger
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас до burst
+
+    Токены резервируются заранее (счётчик может уйти в минус), поэтому
+    ожидающие обслуживаются по порядку без блокировок.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = None
+
+    def reserve(self, now: float) -> float:
+        """Резервирует токен и возвращает, сколько секунд ждать"""
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        delay = self.reserve(asyncio.get_running_loop().time())
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class Notifier:
+    """Очередь исходящих уведомлений
+
+    Уведомления одному чату, пришедшие в пределах окна coalesce_window,
+    объединяются в одно сообщение. Разные чаты обслуживаются параллельно
+    под общим и поканальным ограничителями частоты; внутри чата порядок
+    сохраняется. При RetryAfter доставка повторяется после указанной паузы,
+    при сетевых ошибках - с экспоненциальной задержкой.
+    """
+
+    def __init__(self, bot, header: str = "", global_rate: float = 25.0,
+                 chat_rate: float = 1.0, coalesce_window: float = 2.0,
+                 max_retries: int = 5, parse_mode=ParseMode.MARKDOWN):
+        self.bot = bot
+        self.header = header
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.parse_mode = parse_mode
+        self._global = TokenBucket(global_rate, burst=global_rate)
+        self._chat_rate = chat_rate
+        self._chat_buckets = {}
+        self._pending = {}   # chat_id -> список текстов, ожидающих отправки
+        self._workers = {}   # chat_id -> задача доставки
+        self.sent = 0
+        self.failed = 0
+
+    def notify(self, chat_id: int, text: str):
+        """Ставит уведомление в очередь; не ждёт отправки"""
+        self._pending.setdefault(chat_id, []).append(text)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+
+    async def drain(self):
+        """Ждёт доставки всех поставленных уведомлений"""
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
+
+    async def _worker(self, chat_id: int):
+        try:
+            while self._pending.get(chat_id):
+                # Окно объединения: ждём, пока соберутся уведомления
+                await asyncio.sleep(self.coalesce_window)
+                texts = self._pending.pop(chat_id)
+                await self._deliver(chat_id, self.header + "\n".join(texts))
+        finally:
+            del self._workers[chat_id]
+
+    async def _deliver(self, chat_id: int, text: str):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self._chat_rate)
+        delay = 1.0
+        for _ in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self._global.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, parse_mode=self.parse_mode)
+                self.sent += 1
+                return
+            except TelegramRetryAfter as e:
+                logger.warning(f"Ограничение Telegram для {chat_id}: повтор через {e.retry_after} сек")
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning(f"Ошибка сети при отправке уведомления {chat_id}: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+            except Exception as e:
+                logger.error(f"Ошибка отправки уведомления пользователю {chat_id}: {str(e)}")
+                break
+        else:
+            logger.error(f"Уведомление пользователю {chat_id} не доставлено: исчерпаны попытки")
+        self.failed += 1
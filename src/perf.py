@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import logging
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+
+from .base_config import STALL_THRESHOLD, WATCHDOG_INTERVAL
+
+logger = logging.getLogger()
+
+# Границы корзин гистограммы (сек): от 0.5 мс с шагом ×1.5, последняя - около 2 минут
+_BOUNDS = tuple(0.0005 * 1.5 ** i for i in range(31))
+# Сколько худших зависаний хранить для /perf
+_WORST_STALLS = 5
+
+
+class Histogram:
+    """Гистограмма длительностей с логарифмическими корзинами
+
+    Память и стоимость записи постоянны; перцентиль оценивается верхней
+    границей корзины (погрешность не больше шага 1.5×).
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = _BOUNDS[index] if index < len(_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class Stall:
+    """Зависание event loop и стек, который его держал"""
+    __slots__ = ('duration', 'started', 'stack')
+
+    def __init__(self, duration, started, stack):
+        self.duration = duration
+        self.started = started   # time.time() начала
+        self.stack = stack
+
+    def __lt__(self, other):
+        return self.duration < other.duration
+
+
+class LoopWatchdog:
+    """Сторожевой поток, замечающий зависания event loop
+
+    Цикл каждые interval секунд отмечает «пульс» через call_later и заодно
+    меряет собственное опоздание (лаг цикла). Поток проверяет пульс; если
+    его нет дольше threshold, снимает стек потока цикла через
+    sys._current_frames и пишет его в лог - это и есть код, держащий цикл.
+    """
+
+    def __init__(self, threshold: float, interval: float):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = Histogram()
+        self.stalls = []   # куча худших зависаний
+        self.stall_count = 0
+        self._beat = time.monotonic()
+        self._expected = None
+        self._loop = None
+        self._loop_thread = None
+        self._pending = None  # (начало, стек) текущего зависания
+
+    def start(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._schedule()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def _schedule(self):
+        self._expected = self._loop.time() + self.interval
+        self._loop.call_later(self.interval, self._heartbeat)
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        self.lag.observe(max(0.0, self._loop.time() - self._expected))
+        pending = self._pending
+        if pending is not None:
+            # Зависание закончилось: фиксируем полную длительность
+            self._pending = None
+            duration = now - self._beat - self.interval
+            stall = Stall(duration, pending[0], pending[1])
+            self.stall_count += 1
+            if len(self.stalls) < _WORST_STALLS:
+                heapq.heappush(self.stalls, stall)
+            else:
+                heapq.heappushpop(self.stalls, stall)
+            logger.warning(f"Event loop был заблокирован {duration:.3f} с")
+        self._beat = now
+        self._schedule()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            beat = self._beat
+            silent = time.monotonic() - beat
+            if silent < self.threshold + self.interval or self._pending is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            if self._beat != beat:
+                continue  # цикл ожил, пока снимали стек
+            self._pending = (time.time() - silent, stack)
+            logger.warning(f"Event loop не отвечает {silent:.3f} с, стек:\n{stack}")
+
+    def worst(self):
+        return sorted(self.stalls, reverse=True)
+
+
+class PerfStats:
+    """Счётчики производительности: обработчики, сборщик метрик, event loop"""
+
+    def __init__(self):
+        self.handlers = {}   # имя обработчика -> Histogram
+        self.updates = Histogram()     # получение обновления -> конец обработки
+        self.collect = Histogram()     # замер сборщика (в потоке)
+        self.listeners = Histogram()   # подписчики снимка (в event loop)
+        self.watchdog = LoopWatchdog(STALL_THRESHOLD, WATCHDOG_INTERVAL)
+
+    def observe_handler(self, name: str, seconds: float):
+        histogram = self.handlers.get(name)
+        if histogram is None:
+            histogram = self.handlers[name] = Histogram()
+        histogram.observe(seconds)
+
+
+perf = PerfStats()
@@ -0,0 +1,129 @@
+import asyncio
+import heapq
+import time
+
+import psutil
+
+from .config import PROCESS_SCAN_INTERVAL
+
+# Ключи сортировки: имя -> подпись
+SORT_KEYS = {
+    'cpu': "CPU",
+    'ram': "RAM",
+    'io': "IO",
+    'fds': "FD",
+}
+
+# Дельты старше этого считаются неактуальными и требуют нового замера (сек)
+_MAX_DELTA_AGE = 30.0
+# Результат свежее этого отдаётся конкурентным запросам без пересканирования (сек)
+_RESULT_TTL = 1.0
+
+
+class ProcessStat:
+    """Показатели одного процесса за интервал между проходами"""
+    __slots__ = ('pid', 'name', 'cpu', 'ram', 'rss', 'io', 'fds')
+
+    def __init__(self, pid, name, cpu, ram, rss, io, fds):
+        self.pid = pid
+        self.name = name
+        self.cpu = cpu    # % одного ядра
+        self.ram = ram    # % от всей памяти
+        self.rss = rss    # байт
+        self.io = io      # байт/с чтения+записи, None без доступа
+        self.fds = fds    # открытых дескрипторов, None без доступа
+
+
+class ProcessScanner:
+    """Топ-N процессов за один проход с кэшем объектов psutil.Process"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._procs = {}      # pid -> psutil.Process
+        self._previous = {}   # pid -> (cpu_time, io_bytes)
+        self._previous_at = None
+        self._result = None   # (момент, список ProcessStat)
+        self._lock = asyncio.Lock()
+
+    def _pass(self):
+        """Один проход по процессам: накопленные счётчики для каждого PID"""
+        pids = psutil.pids()
+        alive = set(pids)
+        for pid in list(self._procs):
+            if pid not in alive:
+                del self._procs[pid]
+
+        counters = {}
+        for pid in pids:
+            proc = self._procs.get(pid)
+            try:
+                if proc is None:
+                    proc = psutil.Process(pid)
+                    self._procs[pid] = proc
+                with proc.oneshot():
+                    cpu_times = proc.cpu_times()
+                    rss = proc.memory_info().rss
+                    name = proc.name()
+                    try:
+                        io = proc.io_counters()
+                        io_bytes = io.read_bytes + io.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        io_bytes = None
+                    try:
+                        fds = proc.num_fds()
+                    except (psutil.AccessDenied, AttributeError):
+                        fds = None
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self._procs.pop(pid, None)
+                continue
+            except psutil.AccessDenied:
+                continue
+            counters[pid] = (name, cpu_times.user + cpu_times.system, rss, io_bytes, fds)
+        return time.monotonic(), counters
+
+    def _deltas(self, now, counters):
+        elapsed = now - self._previous_at
+        total_memory = psutil.virtual_memory().total
+        stats = []
+        for pid, (name, cpu_time, rss, io_bytes, fds) in counters.items():
+            previous = self._previous.get(pid)
+            cpu = io = None
+            if previous is not None:
+                cpu = max(cpu_time - previous[0], 0.0) / elapsed * 100
+                if io_bytes is not None and previous[1] is not None:
+                    io = max(io_bytes - previous[1], 0) / elapsed
+            stats.append(ProcessStat(pid, name, cpu or 0.0, rss / total_memory * 100,
+                                     rss, io, fds))
+        return stats
+
+    def _remember(self, now, counters):
+        self._previous = {pid: (c[1], c[3]) for pid, c in counters.items()}
+        self._previous_at = now
+
+    async def scan(self):
+        """Показатели всех процессов; не блокирует event loop"""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if self._result and loop.time() - self._result[0] < _RESULT_TTL:
+                return self._result[1]
+
+            now = time.monotonic()
+            if self._previous_at is None or now - self._previous_at > _MAX_DELTA_AGE:
+                # Нет свежей точки отсчёта: один общий интервал на все процессы
+                self._remember(*await asyncio.to_thread(self._pass))
+                await asyncio.sleep(self.interval)
+
+            now, counters = await asyncio.to_thread(self._pass)
+            stats = self._deltas(now, counters)
+            self._remember(now, counters)
+            self._result = (loop.time(), stats)
+            return stats
+
+    async def top(self, sort_by: str = 'cpu', n: int = 10):
+        """Топ-N процессов по ключу и общее число процессов"""
+        stats = await self.scan()
+        key = lambda s: -1 if getattr(s, sort_by) is None else getattr(s, sort_by)
+        return heapq.nlargest(n, stats, key=key), len(stats)
+
+
+scanner = ProcessScanner(PROCESS_SCAN_INTERVAL)
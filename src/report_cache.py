@@ -0,0 +1,69 @@
+import asyncio
+
+from .config import REPORT_CACHE_TTL, REPORT_CACHE_TTLS
+
+
+class ReportCache:
+    """Кэш готовых отчётов с временем жизни и объединением запросов
+
+    Ключ - (отчёт, хост, parse_mode). Пока отчёт строится, остальные
+    запросы с тем же ключом ждут тот же Future, а не строят отчёт заново.
+    Счётчики попаданий и промахов ведутся по каждому отчёту.
+    """
+
+    def __init__(self, default_ttl: float, ttls: dict = None):
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self._entries = {}    # ключ -> (истекает, текст)
+        self._inflight = {}   # ключ -> Future строящегося отчёта
+        self.hits = {}        # отчёт -> попадания (включая ожидание чужого построения)
+        self.misses = {}      # отчёт -> построения
+
+    def ttl(self, report: str) -> float:
+        return self.ttls.get(report, self.default_ttl)
+
+    async def get(self, key: tuple, build):
+        """Отчёт из кэша; при промахе вызывает await build() один раз на ключ"""
+        report = key[0]
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > loop.time():
+            self.hits[report] = self.hits.get(report, 0) + 1
+            return entry[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.hits[report] = self.hits.get(report, 0) + 1
+            # shield: отмена одного ожидающего не должна отменять построение для остальных
+            return await asyncio.shield(future)
+
+        self.misses[report] = self.misses.get(report, 0) + 1
+        future = self._inflight[key] = loop.create_future()
+        try:
+            text = await build()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получат ожидающие; без них Future не должен ругаться в лог
+            future.exception()
+            raise
+        else:
+            self._entries[key] = (loop.time() + self.ttl(report), text)
+            future.set_result(text)
+            return text
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> str:
+        lines = []
+        for report in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(report, 0)
+            misses = self.misses.get(report, 0)
+            lines.append(f"{report}: попаданий {hits}, промахов {misses}, "
+                         f"доля попаданий {hits / (hits + misses):.0%} (TTL {self.ttl(report):g} с)")
+        return "\n".join(lines)
+
+
+report_cache = ReportCache(REPORT_CACHE_TTL, REPORT_CACHE_TTLS)
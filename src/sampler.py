@@ -0,0 +1,429 @@
+import asyncio
+import logging
+import math
+import time
+from array import array
+from bisect import bisect_left
+
+import psutil
+
+from .base_config import (SAMPLE_INTERVAL, SAMPLE_HISTORY, SAMPLE_INTERVAL_MAX, SAMPLE_FAST_CHANGE,
+                          MONITOR_CPU_BUDGET)
+from .sensors import get_cpu_temp, gpu_backend
+from .gpu import summarize
+from .perf import perf
+
+logger = logging.getLogger()
+
+# Порядок полей в строке кольцевого буфера
+SAMPLE_FIELDS = (
+    'time', 'cpu', 'cpu_freq', 'cpu_temp',
+    'mem_percent', 'mem_total', 'mem_used', 'mem_available',
+    'swap_percent', 'swap_total', 'swap_used', 'swap_free',
+    'gpu_util', 'gpu_temp',
+    'disk_read', 'disk_write',
+    'net_sent', 'net_recv', 'net_packets_sent', 'net_packets_recv',
+)
+
+NAN = math.nan
+# Сколько ждать первого замера, прежде чем считать, что сборщик не справляется (сек)
+_READY_TIMEOUT = 5.0
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированного размера на массиве double"""
+
+    def __init__(self, fields, capacity: int):
+        self.fields = tuple(fields)
+        self.width = len(self.fields)
+        self.capacity = capacity
+        self._columns = {name: i for i, name in enumerate(self.fields)}
+        self._data = array('d', [NAN]) * (capacity * self.width)
+        self._head = 0  # слот для следующей записи
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, values):
+        offset = self._head * self.width
+        self._data[offset:offset + self.width] = array('d', values)
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def latest(self):
+        """Последняя записанная строка или None"""
+        if not self._size:
+            return None
+        offset = ((self._head - 1) % self.capacity) * self.width
+        return self._data[offset:offset + self.width]
+
+    def column(self, name: str, count: int = None) -> array:
+        """Последние count значений поля в хронологическом порядке"""
+        values = self._data[self._columns[name]::self.width]
+        if self._size < self.capacity:
+            values = values[:self._size]
+        else:
+            values = values[self._head:] + values[:self._head]
+        if count is not None and count < len(values):
+            values = values[len(values) - count:]
+        return values
+
+
+# Счётчики устройств и интерфейсов, по которым считаются скорости
+DISK_RATE_FIELDS = ('read_bytes', 'write_bytes', 'read_count', 'write_count')
+NIC_RATE_FIELDS = ('bytes_recv', 'bytes_sent', 'packets_recv', 'packets_sent')
+
+
+def counter_rates(previous: dict, current: dict, elapsed: float, fields) -> dict:
+    """Скорости накопленных счётчиков: имя -> кортеж значений в секунду в порядке fields"""
+    rates = {}
+    for name, counters in current.items():
+        before = previous.get(name)
+        if before is not None:
+            # Сброс счётчика (переподключение устройства) даёт 0, а не отрицательную скорость
+            rates[name] = tuple(max(getattr(counters, field) - getattr(before, field), 0) / elapsed
+                                for field in fields)
+    return rates
+
+
+# Имя устройства -> раздел ли это другого устройства из того же списка
+_partitions = {}
+
+
+def _is_partition(name: str, names) -> bool:
+    result = _partitions.get(name)
+    if result is None:
+        result = False
+        for base in names:
+            if base == name or not name.startswith(base):
+                continue
+            rest = name[len(base):]
+            # sda1 у sda; nvme0n1p1, mmcblk0p1 у устройств, чьё имя кончается цифрой
+            if (rest.isdigit() and not base[-1].isdigit()) or \
+                    (rest[0] == 'p' and rest[1:].isdigit() and base[-1].isdigit()):
+                result = True
+                break
+        _partitions[name] = result
+    return result
+
+
+def counter_totals(devices: dict, fields, skip_partitions: bool = False) -> tuple:
+    """Суммы счётчиков по устройствам в порядке fields (nan без устройств)
+
+    Разделы пропускаются, как в psutil.disk_io_counters(): их операции уже
+    учтены в счётчиках диска.
+    """
+    counters = [c for name, c in devices.items()
+                if not (skip_partitions and _is_partition(name, devices))]
+    if not counters:
+        return (NAN,) * len(fields)
+    return tuple(sum(getattr(c, field) for c in counters) for field in fields)
+
+
+class Snapshot:
+    """Последний снимок метрик: скалярные поля буфера и данные переменной длины
+
+    disks и nics - накопленные счётчики psutil по устройствам и интерфейсам,
+    disk_rates и nic_rates - их скорости с прошлого замера (DISK_RATE_FIELDS,
+    NIC_RATE_FIELDS); для хостов агентов все четыре пустые.
+    """
+    __slots__ = SAMPLE_FIELDS + ('per_core', 'core_temps', 'gpus', 'disks', 'nics',
+                                 'disk_rates', 'nic_rates')
+
+    def __init__(self, row, per_core, core_temps, gpus=(), disks=None, nics=None):
+        for name, value in zip(SAMPLE_FIELDS, row):
+            setattr(self, name, value)
+        self.per_core = per_core
+        self.core_temps = core_temps
+        self.gpus = gpus
+        self.disks = disks or {}
+        self.nics = nics or {}
+        self.disk_rates = {}
+        self.nic_rates = {}
+
+
+class MetricsStore:
+    """История и последний снимок метрик одного хоста"""
+
+    def __init__(self, name: str, interval: float, history: int, cpu_count: int):
+        self.name = name
+        self.interval = interval
+        capacity = max(2, int(history / interval))
+        self.cpu_count_logical = cpu_count
+        self.cpu_count_physical = None
+        self.cpu_freq_min = NAN
+        self.cpu_freq_max = NAN
+        self.samples = RingBuffer(SAMPLE_FIELDS, capacity)
+        self.cores = RingBuffer(range(cpu_count), capacity)
+        self._latest = None
+        self._ready = asyncio.Event()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Подписывает callback(snapshot) на каждый новый снимок"""
+        self._listeners.append(callback)
+
+    def latest(self):
+        """Последний снимок без ожидания (None до первого замера)"""
+        return self._latest
+
+    async def snapshot(self) -> Snapshot:
+        """Последний снимок; до первого замера ждёт его появления
+
+        Ожидание ограничено _READY_TIMEOUT: если замеры не приходят,
+        вызывающий получает asyncio.TimeoutError, а не зависает.
+        """
+        if self._latest is None:
+            await asyncio.wait_for(self._ready.wait(), _READY_TIMEOUT)
+        return self._latest
+
+    def series(self, field: str, seconds: float):
+        """Отметки времени и значения поля за последние seconds секунд"""
+        count = int(seconds / self.interval) + 1
+        timestamps = self.samples.column('time', count)
+        values = self.samples.column(field, count)
+        start = bisect_left(timestamps, time.time() - seconds)
+        return timestamps[start:], values[start:]
+
+    def store(self, row, per_core, core_temps=None, gpus=(), disks=None, nics=None):
+        """Записывает замер в буферы и оповещает подписчиков"""
+        self.samples.append(row)
+        if len(per_core) == self.cpu_count_logical:
+            self.cores.append(per_core)
+        previous = self._latest
+        self._latest = snapshot = Snapshot(row, tuple(per_core), core_temps or {}, gpus, disks, nics)
+        if previous is not None and snapshot.time > previous.time:
+            elapsed = snapshot.time - previous.time
+            snapshot.disk_rates = counter_rates(previous.disks, snapshot.disks, elapsed, DISK_RATE_FIELDS)
+            snapshot.nic_rates = counter_rates(previous.nics, snapshot.nics, elapsed, NIC_RATE_FIELDS)
+        self._ready.set()
+        for callback in self._listeners:
+            try:
+                callback(self._latest)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика снимка метрик: {str(e)}")
+
+
+# Метрики, по скорости изменения которых сборщик ускоряется
+CADENCE_FIELDS = ('cpu', 'mem_percent', 'swap_percent', 'gpu_util', 'cpu_temp', 'gpu_temp')
+# Во сколько раз удлиняется интервал за спокойный замер
+_BACKOFF = 1.5
+# Сколько секунд после запроса пользователя данные держатся свежими
+_INTERACTIVE_HOLD = 30.0
+# Вес нового замера в скользящей средней затрат
+_COST_WEIGHT = 0.2
+
+
+class AdaptiveCadence:
+    """Интервал сборщика в пределах [minimum, maximum]
+
+    Интервал сразу падает до minimum, если метрика у порога правила
+    оповещения (проверки добавляются через add_probe), резко изменилась с
+    прошлого замера или пользователи недавно запрашивали отчёты. В
+    остальное время он растёт в _BACKOFF раз за замер до maximum, но не
+    выше интервалов, заявленных потребителями через require (панель
+    /watch, экспортёр, агент): их данные не старше их собственного
+    периода обновления. Сверху действует бюджет: средние затраты CPU на замер (сбор в потоке и
+    подписчики в event loop), делённые на интервал, не превышают budget.
+    При конфликте бюджет важнее minimum, но не maximum.
+    """
+
+    def __init__(self, minimum: float, maximum: float, budget: float, fast_change: float):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.budget = budget
+        self.fast_change = fast_change
+        self.interval = minimum
+        self.reason = "запуск"
+        self.cost = 0.0         # CPU-секунд на замер (скользящая средняя)
+        self.wall = 0.0         # секунд на замер (скользящая средняя)
+        self.cpu_total = 0.0
+        self.started = time.monotonic()
+        self._interactive_until = 0.0
+        self._probes = []
+        self._required = {}     # потребитель -> (интервал, действует до; None - бессрочно)
+        self.wake = asyncio.Event()
+
+    def add_probe(self, probe):
+        """probe(snapshot) возвращает причину частого опроса или None"""
+        self._probes.append(probe)
+
+    def demand(self):
+        """Отметка запроса пользователя: ближайшее время опрашивать часто"""
+        now = time.monotonic()
+        if now >= self._interactive_until and self.interval > self.minimum:
+            # Сборщик спит долгий интервал простоя - будим, чтобы следующий отчёт был свежим
+            self.wake.set()
+        self._interactive_until = now + _INTERACTIVE_HOLD
+
+    def require(self, owner: str, interval: float, hold: float = None):
+        """Потребителю нужны замеры не реже interval секунд
+
+        Заявка действует hold секунд (None - до release), потребители с
+        собственным периодом продлевают её при каждом обновлении.
+        """
+        interval = max(interval, self.minimum)
+        if interval < self.interval:
+            # Сборщик спит дольше, чем нужно потребителю, - будим
+            self.wake.set()
+        until = None if hold is None else time.monotonic() + hold
+        self._required[owner] = (interval, until)
+
+    def release(self, owner: str):
+        self._required.pop(owner, None)
+
+    def _ceiling(self):
+        """Наименьший из заявленных интервалов и его потребитель"""
+        now = time.monotonic()
+        for owner, (_, until) in list(self._required.items()):
+            if until is not None and now >= until:
+                del self._required[owner]
+        if not self._required:
+            return self.maximum, None
+        owner = min(self._required, key=lambda name: self._required[name][0])
+        return self._required[owner][0], owner
+
+    def observe(self, cpu: float, wall: float):
+        self.cpu_total += cpu
+        self.cost += (cpu - self.cost) * _COST_WEIGHT
+        self.wall += (wall - self.wall) * _COST_WEIGHT
+
+    @property
+    def overhead(self) -> float:
+        """Средняя доля ядра, занятая сборщиком с момента запуска"""
+        return self.cpu_total / max(time.monotonic() - self.started, 1e-9)
+
+    @property
+    def floor(self) -> float:
+        """Наименьший интервал, при котором укладываемся в бюджет"""
+        return self.cost / self.budget if self.budget > 0 else 0.0
+
+    def _busy(self, snapshot, previous):
+        for probe in self._probes:
+            reason = probe(snapshot)
+            if reason:
+                return f"у порога: {reason}"
+        if previous is not None:
+            for field in CADENCE_FIELDS:
+                change = abs(getattr(snapshot, field) - getattr(previous, field))
+                if change >= self.fast_change:   # NaN сравнение не проходит
+                    return f"резкое изменение: {field}"
+        if time.monotonic() < self._interactive_until:
+            return "запросы пользователей"
+        return None
+
+    def update(self, snapshot, previous) -> float:
+        """Интервал до следующего замера"""
+        reason = self._busy(snapshot, previous)
+        if reason:
+            interval = self.minimum
+        else:
+            ceiling, owner = self._ceiling()
+            interval = min(self.interval * _BACKOFF, self.maximum, ceiling)
+            reason = "простой" if owner is None or interval < ceiling else f"простой, ограничено потребителем: {owner}"
+        floor = self.floor
+        if interval < floor:
+            interval = min(floor, self.maximum)
+            reason += ", ограничено бюджетом CPU"
+        self.interval, self.reason = interval, reason
+        return interval
+
+
+class MetricsSampler(MetricsStore):
+    """Фоновый сборщик метрик локального хоста: один проход системных вызовов на интервал"""
+
+    def __init__(self, interval: float, history: int):
+        super().__init__("local", interval, history, psutil.cpu_count(logical=True) or 1)
+        # Буфер рассчитан на самый частый опрос, поэтому история не короче history
+        self.cadence = AdaptiveCadence(interval, SAMPLE_INTERVAL_MAX, MONITOR_CPU_BUDGET,
+                                       SAMPLE_FAST_CHANGE)
+        self.cpu_count_physical = psutil.cpu_count(logical=False)
+        self._fallback_lock = asyncio.Lock()
+        freq = psutil.cpu_freq()
+        if freq:
+            self.cpu_freq_min = freq.min
+            self.cpu_freq_max = freq.max
+
+    def _collect(self):
+        per_core = psutil.cpu_percent(percpu=True)
+        cpu = sum(per_core) / len(per_core) if per_core else NAN
+        freq = psutil.cpu_freq()
+        avg_temp, core_temps = get_cpu_temp()
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        gpus = gpu_backend.read()
+        gpu_util, gpu_temp = summarize(gpus)
+        # Итоги считаются по счётчикам устройств: второй проход /proc/diskstats
+        # и /proc/net/dev ради тех же чисел не нужен
+        disks = psutil.disk_io_counters(perdisk=True) or {}
+        nics = psutil.net_io_counters(pernic=True) or {}
+        row = (
+            time.time(), cpu, freq.current if freq else NAN, avg_temp,
+            memory.percent, memory.total, memory.used, memory.available,
+            swap.percent, swap.total, swap.used, swap.free,
+            gpu_util, gpu_temp,
+            *counter_totals(disks, ('read_bytes', 'write_bytes'), skip_partitions=True),
+            *counter_totals(nics, ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv')),
+        )
+        return row, per_core, core_temps, tuple(gpus), disks, nics
+
+    def _measured_collect(self):
+        start = time.thread_time()
+        sample = self._collect()
+        return sample, time.thread_time() - start
+
+    async def snapshot(self) -> Snapshot:
+        self.cadence.demand()
+        try:
+            return await super().snapshot()
+        except asyncio.TimeoutError:
+            pass
+        # Фоновый цикл не дал ни одного замера (не запущен или каждый сбор падает):
+        # замер по запросу, одновременные запросы ждут один и тот же. Ошибка сбора
+        # дойдёт до обработчика вместо бесконечного ожидания
+        async with self._fallback_lock:
+            if self._latest is None:
+                logger.warning(f"Нет замеров за {_READY_TIMEOUT:g} с, сбор метрик по запросу")
+                self.store(*await asyncio.to_thread(self._collect))
+        return self._latest
+
+    async def run(self):
+        """Основной цикл сборщика"""
+        loop = asyncio.get_running_loop()
+        # Первый вызов cpu_percent только инициализирует счётчики
+        psutil.cpu_percent(percpu=True)
+        await asyncio.sleep(0.1)
+        next_tick = loop.time()
+        while True:
+            interval = self.cadence.interval
+            try:
+                start = time.perf_counter()
+                sample, collect_cpu = await asyncio.to_thread(self._measured_collect)
+                collected = time.perf_counter()
+                listeners_start = time.thread_time()
+                previous = self._latest
+                self.store(*sample)
+                listeners_cpu = time.thread_time() - listeners_start
+                perf.collect.observe(collected - start)
+                perf.listeners.observe(time.perf_counter() - collected)
+                self.cadence.observe(collect_cpu + listeners_cpu, time.perf_counter() - start)
+                interval = self.cadence.update(self._latest, previous)
+            except Exception as e:
+                logger.error(f"Ошибка при сборе метрик: {str(e)}")
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Сбор занял больше интервала - не пытаемся догонять
+                next_tick = loop.time()
+                delay = 0
+            try:
+                await asyncio.wait_for(self.cadence.wake.wait(), delay)
+                next_tick = loop.time()
+            except asyncio.TimeoutError:
+                pass
+            self.cadence.wake.clear()
+
+
+sampler = MetricsSampler(SAMPLE_INTERVAL, SAMPLE_HISTORY)
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import math
+import time
+
+import psutil
+
+from .base_config import GPU_BACKEND, HWMON_ROOT
+from .gpu import NvmlBackend
+from .hwmon import HwmonReader
+
+# Корневой логгер: в боте его настраивает utils, в агенте - agent.py
+logger = logging.getLogger()
+
+# NVML загружается в фоне при запуске (см. init_gpu)
+gpu_backend = NvmlBackend(GPU_BACKEND)
+# Датчики температуры: карта строится при первом замере
+hwmon = HwmonReader(HWMON_ROOT)
+
+
+async def init_gpu():
+    """Инициализирует NVML в потоке, не задерживая запуск бота или агента"""
+    start = time.perf_counter()
+    await asyncio.to_thread(gpu_backend.init)
+    logger.info(f"Инициализация GPU: {time.perf_counter() - start:.3f} с, "
+                f"устройств: {gpu_backend.device_count}")
+
+
+def get_cpu_temp():
+    """Температура CPU и все датчики: (средняя, {(чип, подпись): °C}); NaN без датчиков"""
+    if hwmon.available:
+        temps = hwmon.read()
+        return hwmon.cpu_temperature(temps), temps
+    # Без sysfs (не Linux) - через psutil, с полным обходом датчиков на каждом вызове
+    temps = {}
+    if hasattr(psutil, "sensors_temperatures"):
+        for sensor, entries in (psutil.sensors_temperatures() or {}).items():
+            for i, entry in enumerate(entries):
+                temps[(sensor, entry.label or f"temp{i + 1}")] = entry.current
+    if not temps:
+        return math.nan, temps
+    return sum(temps.values()) / len(temps), temps
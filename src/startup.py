@@ -0,0 +1,45 @@
+# Замер времени запуска: импортируется первым, поэтому не тянет тяжёлых зависимостей
+import importlib
+import logging
+import os
+import time
+
+_stages = []  # (название, секунды)
+
+
+def preload(*modules):
+    """Импортирует модули по порядку, замеряя время каждого
+
+    Каждый модуль импортируется после предыдущих, поэтому замер показывает
+    собственную стоимость модуля без уже загруженных зависимостей.
+    """
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        _stages.append((f"import {name}", time.perf_counter() - start))
+
+
+def mark(name: str, seconds: float):
+    """Добавляет в отчёт этап, замеренный вызывающим кодом"""
+    _stages.append((name, seconds))
+
+
+def _process_uptime() -> float:
+    """Секунды с момента запуска процесса"""
+    import psutil
+    return time.time() - psutil.Process(os.getpid()).create_time()
+
+
+def report() -> str:
+    """Отчёт о запуске: время от старта процесса и разбивка по этапам"""
+    total = _process_uptime()
+    lines = [f"Запуск: {total:.3f} с от старта процесса до start_polling"]
+    for name, seconds in sorted(_stages, key=lambda stage: stage[1], reverse=True):
+        lines.append(f"  {name}: {seconds:.3f} с")
+    accounted = sum(seconds for _, seconds in _stages)
+    lines.append(f"  прочее (интерпретатор, main.py): {max(total - accounted, 0):.3f} с")
+    return "\n".join(lines)
+
+
+def log_report():
+    logging.getLogger().info(report())
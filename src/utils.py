@@ -1,50 +1,138 @@
 import logging
-from logging.handlers import TimedRotatingFileHandler
-import asyncio
-import subprocess
-import shlex
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+import atexit
+import codecs
+import gzip
+import json
+import queue
+import shutil
+import tempfile
+from datetime import datetime
 
-# Настройка логирования
-handler = TimedRotatingFileHandler(
+# Сколько записей писать в файлы между принудительными сбросами буфера
+_LOG_BATCH_SIZE = 100
+
+class BatchedFileHandler(TimedRotatingFileHandler):
+    """Файловый обработчик с ротацией, сбрасывающий буфер пачками"""
+
+    def flush(self):
+        # Вызывается после каждой записи; реальный сброс - в flush_batch
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class BatchingQueueListener(QueueListener):
+    """Слушатель очереди логов: сбрасывает файлы, когда очередь опустела"""
+
+    def __init__(self, log_queue, *handlers):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self._unflushed = 0
+
+    def dequeue(self, block):
+        try:
+            record = self.queue.get_nowait()
+        except queue.Empty:
+            self.flush()
+            return self.queue.get(block)
+        self._unflushed += 1
+        if self._unflushed >= _LOG_BATCH_SIZE:
+            self.flush()
+        return record
+
+    def flush(self):
+        self._unflushed = 0
+        for log_handler in self.handlers:
+            log_handler.flush_batch()
+
+    def stop(self):
+        super().stop()
+        self.flush()
+
+class AuditFormatter(logging.Formatter):
+    """Записи аудита в виде JSON-строк"""
+
+    def format(self, record):
+        entry = {"ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")}
+        entry.update(record.audit)
+        return json.dumps(entry, ensure_ascii=False)
+
+# Настройка логирования: запись в файлы идёт в отдельном потоке,
+# event loop только кладёт записи в очередь
+handler = BatchedFileHandler(
     "logs/bot_usage.log", when="midnight", interval=1, backupCount=30, encoding="utf-8"
 )
 handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+handler.addFilter(lambda record: not hasattr(record, "audit"))
+
+audit_handler = BatchedFileHandler(
+    "logs/audit.jsonl", when="midnight", interval=1, backupCount=30, encoding="utf-8"
+)
+audit_handler.setFormatter(AuditFormatter())
+audit_handler.addFilter(lambda record: hasattr(record, "audit"))
+
+log_queue = queue.SimpleQueue()
+log_listener = BatchingQueueListener(log_queue, handler, audit_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-logger.addHandler(handler)
+logger.addHandler(QueueHandler(log_queue))
+
+audit_logger = logging.getLogger("eots.audit")
 
 def log_command(user, command):
     logger.info(f"Пользователь: {user}, Команда: {command}")
 
+def audit(user_id, action: str, latency: float, outcome: str, **fields):
+    """Структурированная запись аудита: пользователь, действие, задержка (сек), результат"""
+    entry = {"user_id": user_id, "action": action,
+             "latency_ms": round(latency * 1000, 2), "outcome": outcome}
+    entry.update(fields)
+    audit_logger.info(action, extra={"audit": entry})
+
 def is_user_allowed(user_id: int) -> bool:
     from .config import ALLOWED_USERS
     return user_id in ALLOWED_USERS
 
-async def execute_command(command: str) -> str:
-    """Выполняет команду и возвращает результат"""
-    try:
-        # Устанавливаем ограничение на размер вывода (1MB)
-        process = await asyncio.create_subprocess_exec(
-            *shlex.split(command),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            limit=1024*1024  # 1MB
-        )
-        
-        try:
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10.0)
-            
-            if process.returncode == 0:
-                output = stdout.decode('utf-8', errors='replace')
-                return output if output else "Команда выполнена успешно (нет вывода)"
-            else:
-                error = stderr.decode('utf-8', errors='replace')
-                return f"Ошибка: {error}"
-                
-        except asyncio.TimeoutError:
-            process.kill()
-            return "Ошибка: превышено время выполнения команды (10 секунд)"
-            
-    except Exception as e:
-        return f"Ошибка при выполнении команды: {str(e)}" 
\ No newline at end of file
+def is_admin(user_id: int) -> bool:
+    from .config import ADMIN_USERS
+    return user_id in ADMIN_USERS
+
+class CommandResult:
+    """Результат команды: полный вывод во временном файле и хвост для показа"""
+
+    def __init__(self, tail_size: int, spool_size: int):
+        self.output = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        self.size = 0           # байт вывода всего
+        self.chars = 0          # символов вывода всего
+        self.tail = ""          # последние tail_size символов
+        self.returncode = None
+        self.timed_out = False
+        self.error = None
+        self._tail_size = tail_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    @property
+    def complete(self) -> bool:
+        """Весь вывод помещается в хвост"""
+        return self.chars <= self._tail_size
+
+    def feed(self, chunk: bytes):
+        self.output.write(chunk)
+        self.size += len(chunk)
+        text = self._decoder.decode(chunk)
+        self.chars += len(text)
+        self.tail = (self.tail + text)[-self._tail_size:]
+
+    def compress(self) -> str:
+        """Сжимает полный вывод в gzip-файл и возвращает путь к нему"""
+        self.output.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".txt.gz", delete=False) as archive:
+            with gzip.GzipFile(fileobj=archive, mode="wb") as gz:
+                shutil.copyfileobj(self.output, gz)
+        return archive.name
+
+    def close(self):
+        self.output.close()
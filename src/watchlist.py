@@ -0,0 +1,281 @@
+import asyncio
+import math
+import time
+
+import psutil
+
+from .config import (WATCHLIST, WATCHLIST_INTERVAL, WATCHLIST_WINDOW, WATCHLIST_RESCAN,
+                     LEAK_MIN_R2, LEAK_MIN_GROWTH)
+from .sampler import RingBuffer
+from .utils import logger
+
+# Порядок полей в кольцевом буфере процесса
+PROCESS_FIELDS = ('time', 'rss', 'cpu', 'threads', 'fds', 'read_bytes', 'write_bytes')
+
+NAN = math.nan
+# Тренд оценивается, когда история покрывает хотя бы такую долю окна
+_MIN_SPAN_SHARE = 0.25
+_MIN_POINTS = 10
+# Сколько целей можно держать в списке
+MAX_TARGETS = 20
+
+
+def linear_trend(xs, ys):
+    """Наклон прямой по методу наименьших квадратов и R² (NaN в ys пропускаются)"""
+    points = [(x, y) for x, y in zip(xs, ys) if not math.isnan(y)]
+    n = len(points)
+    if n < 2:
+        return 0.0, 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    sxx = sxy = syy = 0.0
+    for x, y in points:
+        dx, dy = x - mean_x, y - mean_y
+        sxx += dx * dx
+        sxy += dx * dy
+        syy += dy * dy
+    if not sxx:
+        return 0.0, 0.0
+    return sxy / sxx, (sxy * sxy / (sxx * syy) if syy else 0.0)
+
+
+class MemoryTrend:
+    """Линейный тренд RSS за окно истории процесса"""
+    __slots__ = ('slope', 'r2', 'span', 'growth')
+
+    def __init__(self, slope, r2, span, growth):
+        self.slope = slope    # байт/с
+        self.r2 = r2
+        self.span = span      # сек, покрытые историей
+        self.growth = growth  # рост по тренду за span относительно начала (доля)
+
+    @property
+    def leaking(self) -> bool:
+        return (self.slope > 0 and self.r2 >= LEAK_MIN_R2 and self.growth >= LEAK_MIN_GROWTH
+                and self.span >= WATCHLIST_WINDOW * _MIN_SPAN_SHARE)
+
+
+class WatchedProcess:
+    """Процесс из списка наблюдения: кэшированный psutil.Process и его история"""
+    __slots__ = ('proc', 'pid', 'name', 'created', 'samples', 'last_trend', 'leaking',
+                 '_cpu_time', '_at')
+
+    def __init__(self, proc, name, created, capacity):
+        self.proc = proc
+        self.pid = proc.pid
+        self.name = name
+        self.created = created
+        self.samples = RingBuffer(PROCESS_FIELDS, capacity)
+        self.last_trend = None   # тренд RSS на последнем замере
+        self.leaking = False
+        self._cpu_time = None
+        self._at = None
+
+    def sample(self):
+        """Один замер (в потоке); NoSuchProcess означает, что процесс завершился"""
+        with self.proc.oneshot():
+            cpu_times = self.proc.cpu_times()
+            rss = self.proc.memory_info().rss
+            threads = self.proc.num_threads()
+            try:
+                fds = self.proc.num_fds()
+            except (psutil.AccessDenied, AttributeError):
+                fds = NAN
+            try:
+                io = self.proc.io_counters()
+                read_bytes, write_bytes = io.read_bytes, io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                read_bytes = write_bytes = NAN
+        now = time.monotonic()
+        cpu_time = cpu_times.user + cpu_times.system
+        cpu = NAN
+        if self._cpu_time is not None and now > self._at:
+            cpu = max(cpu_time - self._cpu_time, 0.0) / (now - self._at) * 100
+        self._cpu_time, self._at = cpu_time, now
+        self.samples.append((time.time(), rss, cpu, threads, fds, read_bytes, write_bytes))
+
+    def trend(self) -> MemoryTrend:
+        times = self.samples.column('time')
+        if len(times) < _MIN_POINTS:
+            return MemoryTrend(0.0, 0.0, 0.0, 0.0)
+        xs = [t - times[0] for t in times]
+        rss = self.samples.column('rss')
+        slope, r2 = linear_trend(xs, rss)
+        # Начало отсчёта - точка тренда, а не первый замер: один выброс не решает
+        base = sum(rss) / len(rss) - slope * sum(xs) / len(xs)
+        growth = slope * xs[-1] / base if base > 0 else 0.0
+        return MemoryTrend(slope, r2, xs[-1], growth)
+
+    def io_rates(self):
+        """Скорость чтения и записи (байт/с) между двумя последними замерами"""
+        if len(self.samples) < 2:
+            return NAN, NAN
+        times = self.samples.column('time', 2)
+        elapsed = times[1] - times[0]
+        if elapsed <= 0:
+            return NAN, NAN
+        reads = self.samples.column('read_bytes', 2)
+        writes = self.samples.column('write_bytes', 2)
+        return (max(reads[1] - reads[0], 0) / elapsed, max(writes[1] - writes[0], 0) / elapsed)
+
+
+class WatchTarget:
+    """Запись списка наблюдения: имя процесса или PID
+
+    Цель по PID запоминает имя процесса; когда он завершается, за
+    перезапущенным сервисом следят уже по имени.
+    """
+    __slots__ = ('spec', 'pid', 'name', 'processes', 'started', 'exited')
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.pid = int(spec) if spec.isdigit() else None
+        self.name = None if self.pid else spec
+        self.processes = {}   # (pid, время запуска) -> WatchedProcess
+        self.started = 0      # появилось процессов после добавления в список
+        self.exited = 0
+
+    def matches(self, pid: int, name: str) -> bool:
+        if self.pid is not None:
+            return pid == self.pid
+        return name == self.name
+
+
+class WatchList:
+    """Наблюдение за выбранными процессами с историей и поиском утечек памяти
+
+    Каждый тик замеряются только процессы из списка по кэшированным
+    psutil.Process, поэтому его стоимость растёт с длиной списка, а не с
+    числом процессов в системе. Новые процессы (перезапуски сервисов)
+    ищутся раз в rescan секунд или сразу после завершения наблюдаемого:
+    psutil.pids() сравнивается с прошлым проходом, и имя читается только
+    у появившихся PID.
+    """
+
+    def __init__(self, interval: float, window: float, rescan: float):
+        self.interval = interval
+        self.window = window
+        self.rescan = rescan
+        self.capacity = max(int(window / interval), _MIN_POINTS)
+        self.targets = {}    # spec -> WatchTarget
+        self._known = set()  # PID, просмотренные прошлым поиском
+        self._rescan_at = 0.0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Подписывает callback(target, process, trend) на обнаружение утечки"""
+        self._listeners.append(callback)
+
+    def _attach(self, target, proc, name, initial: bool):
+        try:
+            created = proc.create_time()
+        except psutil.Error:
+            return
+        key = (proc.pid, created)
+        if key in target.processes:
+            return
+        if target.pid is not None and target.name is None:
+            target.name = name
+        processes = dict(target.processes)
+        processes[key] = WatchedProcess(proc, name, created, self.capacity)
+        target.processes = processes
+        if not initial:
+            target.started += 1
+            logger.info(f"Наблюдение {target.spec}: новый процесс {name} (PID {proc.pid})")
+
+    def _discover(self, target):
+        """Поиск процессов новой цели (один раз при добавлении)"""
+        if target.pid is not None:
+            try:
+                proc = psutil.Process(target.pid)
+                self._attach(target, proc, proc.name(), initial=True)
+            except psutil.Error:
+                pass
+            return
+        for proc in psutil.process_iter(['name']):
+            if target.matches(proc.pid, proc.info['name']):
+                self._attach(target, proc, proc.info['name'], initial=True)
+
+    def _rescan(self, targets):
+        pids = psutil.pids()
+        for pid in pids:
+            if pid in self._known:
+                continue
+            try:
+                proc = psutil.Process(pid)
+                name = proc.name()
+            except psutil.Error:
+                continue
+            for target in targets:
+                if target.matches(pid, name):
+                    self._attach(target, proc, name, initial=False)
+        self._known = set(pids)
+        self._rescan_at = time.monotonic() + self.rescan
+
+    def _tick(self):
+        """Замер всех наблюдаемых процессов (в потоке); возвращает новые утечки"""
+        targets = list(self.targets.values())
+        leaks = []
+        for target in targets:
+            exited = []
+            for key, process in target.processes.items():
+                try:
+                    process.sample()
+                except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                    exited.append(key)
+                    continue
+                except psutil.AccessDenied:
+                    continue
+                process.last_trend = trend = process.trend()
+                leaking = trend.leaking
+                if leaking and not process.leaking:
+                    leaks.append((target, process, trend))
+                process.leaking = leaking
+            if exited:
+                target.processes = {key: process for key, process in target.processes.items()
+                                    if key not in exited}
+                target.exited += len(exited)
+                if target.pid is not None:
+                    # Процесс по PID завершился: дальше следим за сервисом по имени
+                    target.pid = None
+                self._rescan_at = 0.0
+        if targets and time.monotonic() >= self._rescan_at:
+            self._rescan(targets)
+        return leaks
+
+    async def add(self, spec: str) -> WatchTarget:
+        """Добавляет цель (или возвращает уже добавленную) и сразу ищет её процессы"""
+        target = self.targets.get(spec)
+        if target is None:
+            target = WatchTarget(spec)
+            await asyncio.to_thread(self._discover, target)
+            if not self._known:
+                self._known = set(await asyncio.to_thread(psutil.pids))
+            self.targets[spec] = target
+        return target
+
+    def remove(self, spec: str) -> bool:
+        return self.targets.pop(spec, None) is not None
+
+    async def run(self):
+        for spec in WATCHLIST:
+            await self.add(spec)
+        while True:
+            if self.targets:
+                try:
+                    leaks = await asyncio.to_thread(self._tick)
+                except Exception as e:
+                    logger.error(f"Ошибка наблюдения за процессами: {str(e)}")
+                    leaks = ()
+                for target, process, trend in leaks:
+                    logger.warning(f"Возможная утечка памяти: {process.name} (PID {process.pid}), "
+                                   f"{trend.slope * 3600 / 1024**2:+.1f} MB/ч, R² {trend.r2:.2f}")
+                    for callback in self._listeners:
+                        try:
+                            callback(target, process, trend)
+                        except Exception as e:
+                            logger.error(f"Ошибка обработчика утечки: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+watchlist = WatchList(WATCHLIST_INTERVAL, WATCHLIST_WINDOW, WATCHLIST_RESCAN)
@@ -0,0 +1,129 @@
+import asyncio
+import hmac
+import secrets
+import signal
+import time
+
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from .utils import logger
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Приём обновлений Telegram через webhook на локальном aiohttp-сервере
+
+    Запрос без верного секрета отклоняется до разбора тела; если секрет
+    не задан, он генерируется при запуске и передаётся Telegram вместе
+    с адресом webhook, так что проверка выполняется всегда. Принятое
+    обновление обрабатывается в отдельной задаче, а Telegram сразу получает
+    200; одновременно обрабатывается не больше concurrency обновлений -
+    следующий запрос ждёт свободного места, не отвечая (Telegram не шлёт
+    больше max_connections запросов, так что очередь ограничена).
+    При остановке новые запросы получают 503 (Telegram повторит их
+    позже), а начатые обработки дожидаются в пределах drain_timeout.
+    """
+
+    def __init__(self, dp, bot, secret: str, concurrency: int, drain_timeout: float):
+        self.dp = dp
+        self.bot = bot
+        # Без секрета любой, кто знает адрес, мог бы подделать обновления от
+        # разрешённых пользователей (в том числе команды консоли)
+        self.secret = secret or secrets.token_urlsafe(32)
+        if not secret:
+            logger.info("Webhook: WEBHOOK_SECRET не задан, используется случайный секрет")
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._draining = False
+        self._runner = None
+        self.received = 0
+        self.rejected = 0
+
+    async def handle(self, request):
+        received_at = time.perf_counter()
+        if not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, "").encode(), self.secret.encode()):
+            self.rejected += 1
+            logger.warning(f"Webhook: запрос с неверным секретом от {request.remote}")
+            return web.Response(status=401)
+        if self._draining:
+            return web.Response(status=503)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except (ValueError, ValidationError):
+            return web.Response(status=400)
+        self.received += 1
+
+        await self._semaphore.acquire()
+        if self._draining:
+            self._semaphore.release()
+            return web.Response(status=503)
+        task = asyncio.create_task(self._process(update, received_at))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update, received_at: float):
+        try:
+            await self.dp.feed_update(self.bot, update, received_at=received_at)
+        except Exception as e:
+            logger.error(f"Ошибка обработки обновления {update.update_id}: {str(e)}")
+        finally:
+            self._semaphore.release()
+
+    async def start(self, listen: str, path: str, url: str = None):
+        """Запускает сервер на 'адрес:порт' и, если задан url, регистрирует webhook в Telegram"""
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        host, _, port = listen.rpartition(":")
+        await web.TCPSite(self._runner, host or None, int(port)).start()
+        logger.info(f"Webhook принимает обновления на http://{listen}{path}")
+        if url:
+            await self.bot.set_webhook(
+                url,
+                secret_token=self.secret,
+                max_connections=min(max(self.concurrency, 1), 100),
+                allowed_updates=self.dp.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook зарегистрирован: {url}")
+
+    async def stop(self):
+        """Перестаёт принимать обновления и дожидается начатых обработок"""
+        self._draining = True
+        if self._tasks:
+            logger.info(f"Webhook: ожидание {len(self._tasks)} обработок перед остановкой")
+            _, pending = await asyncio.wait(set(self._tasks), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Webhook: прервано обработок по таймауту: {len(pending)}")
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def run_webhook(dp, bot, server: WebhookServer, listen: str, path: str, url: str):
+    """Аналог dp.start_polling для режима webhook: работает до отмены или сигнала"""
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        await server.start(listen, path, url)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except NotImplementedError:
+                pass
+        await stop.wait()
+    finally:
+        # Webhook в Telegram остаётся: обновления за время простоя придут после запуска
+        await server.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await bot.session.close()
@@ -0,0 +1,31 @@
+import math
+import os
+import tempfile
+
+import pytest
+
+
+def pytest_configure(config):
+    # Модули бота при импорте открывают журналы в logs/ текущего каталога и читают
+    # настройки окружения, поэтому до первого импорта src переходим во временный каталог
+    workdir = tempfile.mkdtemp(prefix="eots-tests-")
+    os.makedirs(os.path.join(workdir, "logs"))
+    os.chdir(workdir)
+    os.environ.update({
+        'BOT_TOKEN': "123456:TEST",
+        'ALLOWED_USERS': "1",
+        'GPU_BACKEND': "none",
+        'ALERT_RULES_FILE': "",
+    })
+
+
+@pytest.fixture
+def make_snapshot():
+    """Снимок сборщика с заданными полями; остальные поля - NaN"""
+    from src.sampler import SAMPLE_FIELDS, Snapshot
+
+    def make(timestamp, **fields):
+        row = [fields.pop(name, math.nan) for name in SAMPLE_FIELDS[1:]]
+        assert not fields, f"неизвестные поля: {fields}"
+        return Snapshot([timestamp] + row, [], {})
+    return make
@@ -0,0 +1,57 @@
+import pytest
+
+from src.agent_protocol import (FRAME_HEADER, KIND_BATCH, KIND_HELLO, PAYLOAD_HEADER,
+                                PROTOCOL_VERSION, ProtocolError, decode_payload,
+                                encode_batch, encode_hello)
+
+
+def payload(frame: bytes) -> bytes:
+    (length,) = FRAME_HEADER.unpack_from(frame)
+    assert length == len(frame) - FRAME_HEADER.size
+    return frame[FRAME_HEADER.size:]
+
+
+def test_hello_round_trip():
+    kind, host, body = decode_payload(payload(encode_hello("node-1", "токен")))
+    assert (kind, host, body) == (KIND_HELLO, "node-1", "токен".encode('utf-8'))
+
+
+def test_batch_round_trip():
+    rows = [((1.0, 2.5, float('inf')), (10.0, 20.0)), ((3.0, -4.0, 0.0), (30.0, 40.0))]
+    kind, host, (field_count, core_count, decoded) = decode_payload(
+        payload(encode_batch("node-1", 3, 2, rows)))
+    assert (kind, host, field_count, core_count) == (KIND_BATCH, "node-1", 3, 2)
+    assert [(list(row), list(per_core)) for row, per_core in decoded] == \
+        [(list(row), list(per_core)) for row, per_core in rows]
+
+
+def test_empty_batch():
+    _, _, (_, _, rows) = decode_payload(payload(encode_batch("node-1", 3, 2, [])))
+    assert rows == []
+
+
+@pytest.mark.parametrize("cut", [1, PAYLOAD_HEADER.size, PAYLOAD_HEADER.size + 3,
+                                 PAYLOAD_HEADER.size + 6 + 2, -1, -8])
+def test_truncated_batch_rejected(cut):
+    data = payload(encode_batch("node-1", 3, 2, [((1.0, 2.0, 3.0), (4.0, 5.0))]))
+    with pytest.raises(ProtocolError):
+        decode_payload(data[:cut])
+
+
+def test_bad_version_rejected():
+    data = bytearray(payload(encode_hello("node-1", "token")))
+    data[0] = PROTOCOL_VERSION + 1
+    with pytest.raises(ProtocolError, match="версия"):
+        decode_payload(bytes(data))
+
+
+def test_unknown_kind_rejected():
+    data = PAYLOAD_HEADER.pack(PROTOCOL_VERSION, 99, 0)
+    with pytest.raises(ProtocolError):
+        decode_payload(data)
+
+
+def test_non_utf8_host_rejected():
+    data = PAYLOAD_HEADER.pack(PROTOCOL_VERSION, KIND_HELLO, 2) + b"\xff\xfe"
+    with pytest.raises(ProtocolError):
+        decode_payload(data)
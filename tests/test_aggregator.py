@@ -0,0 +1,152 @@
+import asyncio
+import socket
+import time
+from collections import deque
+
+import pytest
+
+import agent
+from src.agent_protocol import encode_batch, encode_hello
+from src.aggregator import AgentServer
+from src.sampler import SAMPLE_FIELDS, sampler
+
+TOKEN = "секрет-агентов"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_row(timestamp, cpu, cores=2):
+    row = [float('nan')] * len(SAMPLE_FIELDS)
+    row[SAMPLE_FIELDS.index('time')] = timestamp
+    row[SAMPLE_FIELDS.index('cpu')] = cpu
+    return tuple(row), (cpu,) * cores
+
+
+async def exchange(frames: list, token: str = TOKEN) -> tuple:
+    """Отправляет кадры серверу; (сервер, закрыл ли он соединение)"""
+    server = AgentServer(1.0, 60, token)
+    listen = f"127.0.0.1:{_free_port()}"
+    await server.start(listen)
+    host, _, port = listen.rpartition(":")
+    reader, writer = await asyncio.open_connection(host, int(port))
+    try:
+        for frame in frames:
+            writer.write(frame)
+        await writer.drain()
+        try:
+            closed = await asyncio.wait_for(reader.read(), 0.5) == b""
+        except asyncio.TimeoutError:
+            closed = False
+    finally:
+        writer.close()
+        await server.stop()
+    return server, closed
+
+
+def test_batch_after_hello_stored():
+    now = time.time()
+    server, closed = asyncio.run(exchange([
+        encode_hello("node-1", TOKEN),
+        encode_batch("node-1", len(SAMPLE_FIELDS), 2, [make_row(now - 1, 10.0), make_row(now, 20.0)]),
+    ]))
+    assert not closed
+    store = server.hosts["node-1"]
+    assert store.latest().cpu == 20.0
+    assert store.cpu_count_logical == 2
+    assert "node-1" in server.last_seen
+
+
+@pytest.mark.parametrize("token", ["", "wrong", "секрет-агентов!", "секрет-агентоb"])
+def test_wrong_token_rejected(token):
+    # Не-ASCII токен сравнивается как байты: compare_digest не принимает такие строки
+    server, closed = asyncio.run(exchange([
+        encode_hello("node-1", token),
+        encode_batch("node-1", len(SAMPLE_FIELDS), 2, [make_row(time.time(), 10.0)]),
+    ]))
+    assert closed
+    assert server.hosts == {}
+
+
+@pytest.mark.parametrize("name", ["", "bad host", "a" * 49, "node_1", "узел", "*node*"])
+def test_invalid_host_name_rejected(name):
+    server, closed = asyncio.run(exchange([encode_hello(name, TOKEN)]))
+    assert closed
+
+
+def test_local_host_name_rejected():
+    _, closed = asyncio.run(exchange([encode_hello(sampler.name, TOKEN)]))
+    assert closed
+
+
+def test_batch_before_hello_rejected():
+    server, closed = asyncio.run(exchange([
+        encode_batch("node-1", len(SAMPLE_FIELDS), 2, [make_row(time.time(), 10.0)]),
+    ]))
+    assert closed and server.hosts == {}
+
+
+def test_batch_for_other_host_rejected():
+    server, closed = asyncio.run(exchange([
+        encode_hello("node-1", TOKEN),
+        encode_batch("node-2", len(SAMPLE_FIELDS), 2, [make_row(time.time(), 10.0)]),
+    ]))
+    assert closed and server.hosts == {}
+
+
+def test_tcp_without_token_not_started():
+    async def run():
+        server = AgentServer(1.0, 60, "")
+        await server.start(f"127.0.0.1:{_free_port()}")
+        return server._server
+
+    assert asyncio.run(run()) is None
+
+
+def test_agent_push_to_aggregator():
+    async def run():
+        server = AgentServer(1.0, 60, TOKEN)
+        listen = f"127.0.0.1:{_free_port()}"
+        await server.start(listen)
+        now = time.time()
+        pending = deque(make_row(now - 2 + i, 10.0 * i, sampler.cpu_count_logical) for i in range(3))
+        ready = asyncio.Event()
+        ready.set()
+        pusher = asyncio.create_task(agent.push(listen, "node-1", TOKEN, 3, pending, ready))
+        deadline = time.monotonic() + 5
+        while "node-1" not in server.hosts and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        pusher.cancel()
+        await asyncio.gather(pusher, return_exceptions=True)
+        await server.stop()
+        return server, pending
+
+    server, pending = asyncio.run(run())
+    store = server.hosts["node-1"]
+    assert list(store.samples.column('cpu', 3)) == [0.0, 10.0, 20.0]
+    assert store.cpu_count_logical == sampler.cpu_count_logical
+    # Отправленные замеры удалены из очереди агента
+    assert not pending
+
+
+def test_agent_store_uses_agent_history():
+    server = AgentServer(1.0, 60, TOKEN)
+    server._ingest("node-1", (len(SAMPLE_FIELDS), 2, [make_row(time.time(), 10.0)]))
+    assert server.hosts["node-1"].samples.capacity == 60
+
+
+def test_silent_hosts_evicted():
+    server = AgentServer(1.0, 60, TOKEN, ttl=300)
+    now = time.time()
+    for host in ("node-1", "node-2"):
+        server._ingest(host, (len(SAMPLE_FIELDS), 2, [make_row(now, 10.0)]))
+    server.last_seen["node-1"] = now - 301
+    server.evict(now)
+    assert list(server.hosts) == ["node-2"]
+    assert list(server.last_seen) == ["node-2"]
+    # Вернувшийся хост получает новое хранилище
+    server._ingest("node-1", (len(SAMPLE_FIELDS), 2, [make_row(now, 30.0)]))
+    assert server.hosts["node-1"].latest().cpu == 30.0
@@ -0,0 +1,47 @@
+from src.alerts import AlertEngine, Rule
+
+
+def feed(engine, make_snapshot, points):
+    """Прогоняет (время, значение CPU) через движок; возвращает [(время, снята ли тревога)]"""
+    fired = []
+    for timestamp, cpu in points:
+        for event in engine.evaluate(make_snapshot(timestamp, cpu=cpu)):
+            fired.append((timestamp, event.cleared))
+    return fired
+
+
+def test_fires_only_after_sustain(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90, duration=10)])
+    fired = feed(engine, make_snapshot, [(t, 95) for t in range(15)])
+    assert fired == [(10, False)]
+
+
+def test_dip_restarts_sustain(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90, duration=10)])
+    points = [(t, 95) for t in range(8)] + [(8, 50)] + [(t, 95) for t in range(9, 25)]
+    assert feed(engine, make_snapshot, points) == [(19, False)]
+
+
+def test_clear_uses_hysteresis(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90, duration=0, clear=80, notify_clear=True)])
+    fired = feed(engine, make_snapshot, [(0, 95), (1, 85), (2, 95), (3, 79), (4, 85), (5, 91)])
+    # 85 ниже порога, но выше уровня сброса - тревога держится до 79
+    assert fired == [(0, False), (3, True), (5, False)]
+
+
+def test_clear_without_notification(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90)])
+    assert feed(engine, make_snapshot, [(0, 95), (1, 50), (2, 95)]) == [(0, False), (2, False)]
+
+
+def test_average_waits_for_full_window(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90, duration=4, agg='avg')])
+    # Среднее по окну уже выше порога на первой точке, но окно ещё не покрыто
+    fired = feed(engine, make_snapshot, [(0, 100), (1, 100), (2, 80), (3, 100), (4, 100), (5, 100)])
+    assert fired == [(4, False)]
+
+
+def test_nan_is_skipped(make_snapshot):
+    engine = AlertEngine([Rule('cpu_load', 'cpu', '>', 90, duration=2)])
+    points = [(0, 95), (1, float('nan')), (2, 95)]
+    assert feed(engine, make_snapshot, points) == [(2, False)]
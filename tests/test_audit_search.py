@@ -0,0 +1,87 @@
+import os
+from datetime import datetime
+
+from src.audit_search import AuditLog, AuditQuery
+
+
+def write_entries(path, day, hours, user_id=1, mode='a'):
+    with open(path, mode, encoding='utf-8') as f:
+        for hour in hours:
+            for minute in (0, 30):
+                f.write(f"2026-10-{day} {hour:02d}:{minute:02d}:00,000 - INFO - "
+                        f"Пользователь: {user_id}, Команда: /h{hour}\n")
+
+
+def key(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def search_all(log, query):
+    entries, cursor = log.search(query, limit=1000)
+    assert cursor is None
+    return entries
+
+
+def test_index_follows_rotation_and_growth(tmp_path):
+    path = str(tmp_path / "bot_usage.log")
+    index_dir = str(tmp_path / "index")
+    log = AuditLog(path, index_dir)
+    write_entries(path, 16, [22, 23], mode='w')
+    assert len(search_all(log, AuditQuery(user_id=1))) == 4
+    first = log._indexes[key(path)]
+    assert first.hours == ["2026-10-16 22", "2026-10-16 23"]
+
+    # Ротация: файл переименован, текущий начат заново
+    rotated = path + ".2026-10-16"
+    os.rename(path, rotated)
+    write_entries(path, 17, [0], mode='w')
+    entries = search_all(log, AuditQuery(user_id=1))
+    assert [entry[:16] for entry in entries[::2]] == ["2026-10-16 22:00", "2026-10-16 23:00",
+                                                       "2026-10-17 00:00"]
+    # Индекс ротированного файла не перестроен, а переехал под новое имя
+    assert log._indexes[key(rotated)] is first
+    assert sorted(os.listdir(index_dir)) == ["bot_usage.log.2026-10-16.idx", "bot_usage.log.idx"]
+
+    # Дописанные записи добавляются к индексу текущего файла
+    current = log._indexes[key(path)]
+    indexed = current.size
+    write_entries(path, 17, [1, 2])
+    entries = search_all(log, AuditQuery(start=datetime(2026, 10, 17, 1), user_id=1))
+    assert len(entries) == 4
+    assert current.hours == ["2026-10-17 00", "2026-10-17 01", "2026-10-17 02"]
+    assert current.offsets[1] == indexed
+
+    # После перезапуска индексы читаются из файлов, а не строятся заново
+    restarted = AuditLog(path, index_dir)
+    assert restarted._load(rotated, os.stat(rotated)).hours == first.hours
+    assert len(search_all(restarted, AuditQuery(user_id=1))) == 10
+
+
+def test_incomplete_last_line_is_indexed_later(tmp_path):
+    path = str(tmp_path / "bot_usage.log")
+    log = AuditLog(path, str(tmp_path / "index"))
+    write_entries(path, 16, [10], mode='w')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("2026-10-16 11:00:00,000 - INFO - Пользователь: 1, Ко")
+    assert len(search_all(log, AuditQuery(user_id=1))) == 2
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("манда: /h11\n")
+    entries = search_all(log, AuditQuery(text="/h11"))
+    assert entries == ["2026-10-16 11:00:00,000 - INFO - Пользователь: 1, Команда: /h11"]
+
+
+def test_cursor_pages_across_files(tmp_path):
+    path = str(tmp_path / "bot_usage.log")
+    log = AuditLog(path, str(tmp_path / "index"))
+    write_entries(path, 16, [22, 23], mode='w')
+    os.rename(path, path + ".2026-10-16")
+    write_entries(path, 17, [0], mode='w')
+    pages = []
+    cursor = None
+    while True:
+        entries, cursor = log.search(AuditQuery(user_id=1), cursor, limit=4)
+        pages.append(len(entries))
+        if cursor is None:
+            break
+    assert pages == [4, 2]
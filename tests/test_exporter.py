@@ -0,0 +1,65 @@
+import gzip
+
+import pytest
+
+from src.exporter import accepts_gzip
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", False),
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("GZIP ; Q=1.0", True),
+    ("x-gzip", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.000, identity", False),
+    ("identity", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("br, *;q=0.1", True),
+    ("gzip;q=abc", False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    from src import exporter as module
+    from src.aggregator import AgentServer
+    from src.sampler import MetricsStore
+
+    local = MetricsStore("local", 1.0, 60, 1)
+    agents = AgentServer(1.0, 60)
+    monkeypatch.setattr(module, "sampler", local)
+    monkeypatch.setattr(module, "agent_server", agents)
+    return module.MetricsExporter(), local, agents
+
+
+def test_render_cached_until_new_sample(exporter, make_snapshot):
+    metrics, local, agents = exporter
+    local._latest = make_snapshot(1.0, cpu=10.0)
+    text = metrics.payload()
+    assert b'eots_cpu_usage_percent{host="local"} 10.0' in text
+    assert metrics.payload() is text and metrics.renders == 1
+    assert gzip.decompress(metrics.payload(compressed=True)) == text
+    assert metrics.payload(compressed=True) is metrics.payload(compressed=True)
+    assert metrics.renders == 1
+
+    local._latest = make_snapshot(2.0, cpu=20.0)
+    assert b'{host="local"} 20.0' in metrics.payload(compressed=False)
+    assert gzip.decompress(metrics.payload(compressed=True)) == metrics.payload()
+    assert metrics.renders == 2
+
+
+def test_agent_snapshot_invalidates_cache(exporter, make_snapshot):
+    metrics, local, agents = exporter
+    local._latest = make_snapshot(1.0, cpu=10.0)
+    metrics.payload()
+    remote = agents.hosts["node-1"] = type(local)("node-1", 1.0, 60, 1)
+    remote._latest = make_snapshot(1.0, cpu=50.0)
+    assert b'{host="node-1"} 50.0' in metrics.payload()
+    del agents.hosts["node-1"]
+    assert b"node-1" not in metrics.payload()
+    assert metrics.renders == 3
@@ -0,0 +1,84 @@
+import math
+import sys
+
+from src.bench.fakes import FakeNvml
+from src.gpu import GpuReading, NvmlBackend, summarize
+
+
+class PartialNvml(FakeNvml):
+    """Карты без датчика мощности и частот, у второй нет и температуры"""
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        raise self.NVMLError("Not Supported")
+
+    def nvmlDeviceGetClockInfo(self, handle, clock_type):
+        raise self.NVMLError("Not Supported")
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        if handle == 1:
+            raise self.NVMLError("Not Supported")
+        return super().nvmlDeviceGetTemperature(handle, sensor)
+
+
+class BrokenNvml(FakeNvml):
+    def nvmlInit(self):
+        raise self.NVMLError("Driver Not Loaded")
+
+
+def reading(index, utilization, temperature):
+    result = GpuReading(index, f"GPU {index}")
+    result.utilization = utilization
+    result.temperature = temperature
+    return result
+
+
+def test_reads_all_devices():
+    backend = NvmlBackend(nvml=FakeNvml(3))
+    backend.init()
+    assert backend.available and backend.device_count == 3
+    readings = backend.read()
+    assert [r.name for r in readings] == ["Fake GPU 0", "Fake GPU 1", "Fake GPU 2"]
+    assert all(0 <= r.utilization <= 100 and r.memory_total == 16 * 1024**3 for r in readings)
+
+
+def test_unsupported_fields_stay_nan():
+    backend = NvmlBackend(nvml=PartialNvml(2))
+    backend.init()
+    first, second = backend.read()
+    for r in (first, second):
+        # Ошибка одного показателя не мешает остальным
+        assert not math.isnan(r.utilization) and not math.isnan(r.memory_used)
+        assert math.isnan(r.power) and math.isnan(r.power_limit)
+        assert math.isnan(r.clock_sm) and math.isnan(r.clock_memory)
+    assert not math.isnan(first.temperature)
+    assert math.isnan(second.temperature)
+
+
+def test_summarize_takes_maximum_per_field():
+    readings = [reading(0, 20.0, 85.0), reading(1, 90.0, math.nan), reading(2, math.nan, 60.0)]
+    assert summarize(readings) == (90.0, 85.0)
+    utilization, temperature = summarize([reading(0, math.nan, math.nan)])
+    assert math.isnan(utilization) and math.isnan(temperature)
+    assert all(math.isnan(value) for value in summarize([]))
+
+
+def test_init_failure_disables_gpu():
+    backend = NvmlBackend(nvml=BrokenNvml(2))
+    backend.init()
+    assert not backend.available
+    assert backend.read() == []
+
+
+def test_missing_pynvml(monkeypatch):
+    # None в sys.modules заставляет import pynvml выбросить ImportError
+    monkeypatch.setitem(sys.modules, 'pynvml', None)
+    backend = NvmlBackend('nvml')
+    backend.init()
+    assert backend.nvml is None and not backend.available
+    assert backend.read() == []
+
+
+def test_backend_none_skips_nvml():
+    backend = NvmlBackend('none')
+    backend.init()
+    assert not backend.available and backend.device_count == 0
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.history import HistoryStore, RAW_RECORD, ROLLUP_RECORD
+
+# Начало прошлого часа: точки теста не пересекают границу минуты или часа случайно
+# и остаются в сроке хранения сырого уровня
+_HOUR = time.time() // 3600 * 3600 - 3600
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path))
+
+
+def record_cpu(store, make_snapshot, points):
+    for timestamp, cpu in points:
+        store.record(make_snapshot(timestamp, cpu=cpu))
+
+
+def test_raw_round_trip(store, make_snapshot):
+    record_cpu(store, make_snapshot, [(_HOUR + i, float(i)) for i in range(10)])
+    tier, rows, summary = asyncio.run(store.query('cpu', _HOUR, _HOUR + 9, points=2))
+    assert tier == 'raw'
+    assert [(low, average, high) for _, low, average, high in rows] == [(0.0, 2.0, 4.0), (5.0, 7.0, 9.0)]
+    assert summary == (0.0, 4.5, 9.0)
+
+
+def test_counter_stored_as_rate(store, make_snapshot):
+    for i in range(4):
+        store.record(make_snapshot(_HOUR + i * 2, net_recv=1000.0 * i))
+    _, _, summary = asyncio.run(store.query('net_rx', _HOUR, _HOUR + 10))
+    # Первая точка - только база для скорости
+    assert summary == (500.0, 500.0, 500.0)
+
+
+def test_close_keeps_unfinished_rollups(store, make_snapshot, tmp_path):
+    record_cpu(store, make_snapshot, [(_HOUR + i, 10.0 * i) for i in range(5)])
+    asyncio.run(store.close())
+    path = store._path('cpu', '1m', _HOUR)
+    with open(path, 'rb') as f:
+        assert ROLLUP_RECORD.unpack(f.read()) == (_HOUR, 0.0, 40.0, 20.0, 5.0)
+
+    # После перезапуска та же минута дописывается второй записью и складывается с первой
+    restarted = HistoryStore(str(tmp_path))
+    record_cpu(restarted, make_snapshot, [(_HOUR + 30, 70.0), (_HOUR + 61, 0.0)])
+    asyncio.run(restarted.flush())
+    assert os.path.getsize(path) == 2 * ROLLUP_RECORD.size
+    minutes = list(HistoryStore._scan(path, ROLLUP_RECORD, _HOUR, _HOUR + 60))
+    total = sum(average * count for _, _, _, average, count in minutes)
+    assert total / sum(count for *_, count in minutes) == pytest.approx(170 / 6)
+
+
+def test_torn_record_is_truncated(store, make_snapshot):
+    path = store._path('cpu', 'raw', _HOUR)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(RAW_RECORD.pack(_HOUR, 1.0) + b"\x00" * 5)
+    record_cpu(store, make_snapshot, [(_HOUR + 1, 2.0)])
+    asyncio.run(store.flush())
+    assert os.path.getsize(path) == 2 * RAW_RECORD.size
+    values = [value for _, value in HistoryStore._scan(path, RAW_RECORD, _HOUR, _HOUR + 1)]
+    assert values == [1.0, 2.0]
@@ -0,0 +1,131 @@
+import math
+import os
+import shutil
+
+import pytest
+
+from src.bench.fakes import FakeHwmon
+from src.hwmon import HwmonReader
+
+
+def make_chip(root, entry, name, temps):
+    """Каталог чипа hwmon: {подпись: °C}"""
+    directory = os.path.join(root, entry)
+    os.makedirs(directory)
+    with open(os.path.join(directory, "name"), "w") as f:
+        f.write(name + "\n")
+    for number, (label, value) in enumerate(temps.items(), 1):
+        with open(os.path.join(directory, f"temp{number}_label"), "w") as f:
+            f.write(label + "\n")
+        with open(os.path.join(directory, f"temp{number}_input"), "w") as f:
+            f.write(f"{int(value * 1000)}\n")
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "hwmon")
+
+
+def test_discovery_reads_fake_tree(root):
+    fake = FakeHwmon(root, cores=4)
+    reader = HwmonReader(root)
+    assert reader.available
+    temps = reader.read()
+    assert set(temps) == {("coretemp", "Package id 0"), ("nvme", "Composite")} | {
+        ("coretemp", f"Core {i}") for i in range(4)}
+    for path, _ in fake.inputs:
+        with open(path) as f:
+            millidegrees = int(f.read())
+        assert millidegrees / 1000 in temps.values()
+    kinds = {(sensor.chip, sensor.label): sensor.kind for sensor in reader.sensors}
+    assert kinds[("coretemp", "Package id 0")] == 'package'
+    assert kinds[("coretemp", "Core 0")] == 'core'
+    assert kinds[("nvme", "Composite")] == 'other'
+    reader.close()
+
+
+def test_update_seen_through_open_descriptors(root):
+    make_chip(root, "hwmon0", "coretemp", {"Package id 0": 50})
+    reader = HwmonReader(root)
+    assert reader.read() == {("coretemp", "Package id 0"): 50.0}
+    with open(os.path.join(root, "hwmon0", "temp1_input"), "w") as f:
+        f.write("61500\n")
+    assert reader.read() == {("coretemp", "Package id 0"): 61.5}
+    reader.close()
+
+
+def test_duplicate_chips_named_by_directory(root):
+    FakeHwmon(root, sockets=2, cores=2)
+    reader = HwmonReader(root)
+    assert reader.available
+    chips = {sensor.chip for sensor in reader.sensors}
+    assert chips == {"coretemp (hwmon0)", "coretemp (hwmon1)", "nvme"}
+    # Вид датчика определяется по драйверу, а не по переименованному чипу
+    kinds = {(sensor.chip, sensor.label): sensor.kind for sensor in reader.sensors}
+    assert kinds[("coretemp (hwmon1)", "Package id 1")] == 'package'
+    assert kinds[("coretemp (hwmon0)", "Core 1")] == 'core'
+    reader.close()
+
+
+@pytest.mark.parametrize("chips, expected", [
+    # Пакеты важнее ядер и прочих датчиков
+    ([("coretemp", {"Package id 0": 70, "Core 0": 50, "Core 1": 52}), ("nvme", {"Composite": 30})], 70.0),
+    # Без пакетов - среднее по ядрам
+    ([("coretemp", {"Core 0": 50, "Core 1": 60}), ("nvme", {"Composite": 30})], 55.0),
+    # Прочие датчики драйвера CPU важнее посторонних
+    ([("k10temp", {"Tccd1": 64}), ("nvme", {"Composite": 30})], 64.0),
+    # temp1 драйвера CPU без подписи - пакет
+    ([("cpu_thermal", {"temp1": 48}), ("acpitz", {"temp1": 20})], 48.0),
+    # Без датчиков CPU - среднее по всем
+    ([("acpitz", {"temp1": 20}), ("nvme", {"Composite": 40})], 30.0),
+])
+def test_cpu_temperature_preference(root, chips, expected):
+    for index, (name, temps) in enumerate(chips):
+        make_chip(root, f"hwmon{index}", name, temps)
+    reader = HwmonReader(root)
+    assert reader.cpu_temperature(reader.read()) == pytest.approx(expected)
+    reader.close()
+
+
+def test_duplicate_cpu_chips_keep_cpu_kind(root):
+    # Два k10temp переименовываются, но их датчики остаются датчиками CPU
+    make_chip(root, "hwmon0", "k10temp", {"Tccd1": 60})
+    make_chip(root, "hwmon1", "k10temp", {"Tccd1": 70})
+    make_chip(root, "hwmon2", "nvme", {"Composite": 20})
+    reader = HwmonReader(root)
+    temps = reader.read()
+    assert ("k10temp (hwmon1)", "Tccd1") in temps
+    assert reader.cpu_temperature(temps) == pytest.approx(65.0)
+    reader.close()
+
+
+def test_empty_or_missing_root_unavailable(root):
+    reader = HwmonReader(root)
+    assert not reader.available
+    os.makedirs(root)
+    assert not HwmonReader(root).available
+    assert math.isnan(reader.cpu_temperature({}))
+
+
+def test_rediscovery_when_chips_appear_and_disappear(root):
+    os.makedirs(root)
+    reader = HwmonReader(root, rescan_interval=0)
+    assert not reader.available
+    make_chip(root, "hwmon0", "coretemp", {"Package id 0": 50})
+    assert reader.available
+    make_chip(root, "hwmon1", "nvme", {"Composite": 35})
+    assert reader.read() == {("coretemp", "Package id 0"): 50.0, ("nvme", "Composite"): 35.0}
+    shutil.rmtree(os.path.join(root, "hwmon0"))
+    assert reader.read() == {("nvme", "Composite"): 35.0}
+    reader.close()
+
+
+def test_rescan_interval_limits_directory_checks(root):
+    make_chip(root, "hwmon0", "coretemp", {"Package id 0": 50})
+    reader = HwmonReader(root, rescan_interval=3600)
+    assert len(reader.read()) == 1
+    make_chip(root, "hwmon1", "nvme", {"Composite": 35})
+    assert len(reader.read()) == 1
+    reader._checked -= 3600
+    assert len(reader.read()) == 2
+    reader.close()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from src.jobs import DONE, QUEUED, RUNNING, SPAWNING, JobScheduler
+
+
+def alive(pid: int) -> bool:
+    """Жив ли процесс; зомби, которого ещё не забрал init, считается завершённым"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rpartition(")")[2].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+async def wait_for(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "условие не выполнилось вовремя"
+        await asyncio.sleep(0.01)
+
+
+def test_per_user_limit():
+    async def run():
+        scheduler = JobScheduler(max_concurrent=4, per_user=2, history=10)
+        first = scheduler.create(1, "true")
+        assert scheduler.create(1, "true") is not None
+        # Ожидающие задания тоже считаются
+        assert scheduler.create(1, "true") is None
+        assert scheduler.create(2, "true") is not None
+        scheduler.start(first)
+        await first.task
+        assert first.state == DONE and first.result.returncode == 0
+        assert scheduler.create(1, "true") is not None
+
+    asyncio.run(run())
+
+
+def test_cancel_queued_job():
+    async def run():
+        scheduler = JobScheduler(max_concurrent=1, per_user=2, history=10)
+        finished = []
+
+        async def on_finish(job):
+            finished.append(job.id)
+
+        blocker = scheduler.create(1, "sleep 30")
+        queued = scheduler.create(1, "echo queued", on_finish=on_finish)
+        scheduler.start(blocker)
+        scheduler.start(queued)
+        await wait_for(lambda: blocker.state == RUNNING)
+        assert queued.state == QUEUED
+        assert await scheduler.kill(queued.id)
+        await queued.task
+        assert queued.state == DONE and queued.killed
+        assert queued.process is None and queued.result.returncode is None
+        assert finished == [queued.id]
+        assert await scheduler.kill(blocker.id)
+        await blocker.task
+        assert blocker.result.returncode == -signal.SIGTERM
+        assert not await scheduler.kill(blocker.id)
+
+    asyncio.run(run())
+
+
+def test_kill_while_spawning(monkeypatch):
+    async def run():
+        scheduler = JobScheduler(max_concurrent=1, per_user=1, history=10)
+        job = scheduler.create(1, "sleep 30")
+        spawn = asyncio.create_subprocess_exec
+
+        async def kill_then_spawn(*args, **kwargs):
+            # /kill приходит, пока процесс создаётся
+            assert job.state == SPAWNING
+            assert await scheduler.kill(job.id)
+            return await spawn(*args, **kwargs)
+
+        monkeypatch.setattr(asyncio, "create_subprocess_exec", kill_then_spawn)
+        scheduler.start(job)
+        await asyncio.wait_for(job.task, 5)
+        assert job.state == DONE and job.killed
+        # Группа остановлена сразу после запуска, без ожидания вывода
+        assert job.result.returncode == -signal.SIGKILL
+        assert not alive(job.process.pid)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("shutdown", [False, True])
+def test_kill_reaches_grandchildren(tmp_path, shutdown):
+    pids = tmp_path / "pids"
+
+    async def run():
+        scheduler = JobScheduler(max_concurrent=1, per_user=1, history=10)
+        # Внуки переживают sh при обычном kill: только сигнал группе останавливает их
+        job = scheduler.create(1, f"sh -c 'sleep 60 & echo $! >> {pids}; "
+                                  f"sh -c \"sleep 60 & echo \\$! >> {pids}; wait\" & wait'")
+        scheduler.start(job)
+        await wait_for(lambda: pids.exists() and len(pids.read_text().split()) == 2)
+        if shutdown:
+            await scheduler.shutdown()
+        else:
+            assert await scheduler.kill(job.id)
+            await job.task
+        assert job.state == DONE
+        return [int(pid) for pid in pids.read_text().split()]
+
+    grandchildren = asyncio.run(run())
+    deadline = time.monotonic() + 5
+    while any(alive(pid) for pid in grandchildren) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not [pid for pid in grandchildren if alive(pid)]
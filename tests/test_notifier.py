@@ -0,0 +1,51 @@
+import asyncio
+
+from src.bench.stub_bot import StubBot
+from src.notifier import Notifier, TokenBucket
+
+
+def deliver(bot, notifications, **options):
+    """Отправляет уведомления через Notifier и ждёт доставки"""
+    async def run():
+        notifier = Notifier(bot, global_rate=1000, chat_rate=1000, **options)
+        for chat_id, text in notifications:
+            notifier.notify(chat_id, text)
+        await notifier.drain()
+        return notifier
+    return asyncio.run(run())
+
+
+def test_coalesces_within_window():
+    bot = StubBot()
+    notifier = deliver(bot, [(1, "a"), (2, "x"), (1, "b"), (1, "c")],
+                       header="EOTS\n", coalesce_window=0.05)
+    texts = sorted((chat_id, text) for _, _, chat_id, text in bot.calls)
+    assert texts == [(1, "EOTS\na\nb\nc"), (2, "EOTS\nx")]
+    assert notifier.sent == 2
+
+
+def test_window_boundary_starts_new_message():
+    bot = StubBot()
+
+    async def run():
+        notifier = Notifier(bot, global_rate=1000, chat_rate=1000, coalesce_window=0.05)
+        notifier.notify(1, "a")
+        await asyncio.sleep(0.1)
+        notifier.notify(1, "b")
+        await notifier.drain()
+    asyncio.run(run())
+    assert [text for _, _, _, text in bot.calls] == ["a", "b"]
+
+
+def test_retry_after_is_retried():
+    bot = StubBot(retry_after=1)
+    notifier = deliver(bot, [(1, "a")], coalesce_window=0)
+    assert [text for _, _, _, text in bot.calls] == ["a"]
+    assert (notifier.sent, notifier.failed) == (1, 0)
+
+
+def test_token_bucket_spaces_reservations():
+    bucket = TokenBucket(rate=2.0, burst=1.0)
+    assert [bucket.reserve(0.0) for _ in range(3)] == [0.0, 0.5, 1.0]
+    # Через секунду запас восстановился на 2 токена, но не выше burst
+    assert bucket.reserve(2.5) == 0.0
@@ -0,0 +1,22 @@
+import math
+from types import SimpleNamespace
+
+from src.sampler import counter_totals
+
+
+def disk(read, write):
+    return SimpleNamespace(read_bytes=read, write_bytes=write)
+
+
+def test_disk_totals_skip_partitions():
+    disks = {
+        'sda': disk(100, 10), 'sda1': disk(60, 6), 'sda2': disk(40, 4), 'sdaa': disk(1, 1),
+        'nvme0n1': disk(200, 20), 'nvme0n1p1': disk(200, 20),
+        'loop1': disk(3, 0), 'loop10': disk(5, 0),
+    }
+    assert counter_totals(disks, ('read_bytes', 'write_bytes'), skip_partitions=True) == (309, 31)
+    assert counter_totals(disks, ('read_bytes',)) == (609,)
+
+
+def test_totals_without_devices_are_nan():
+    assert all(math.isnan(value) for value in counter_totals({}, ('bytes_sent', 'bytes_recv')))
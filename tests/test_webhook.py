@@ -0,0 +1,52 @@
+import asyncio
+import socket
+
+import pytest
+from aiogram import Dispatcher
+from aiohttp import ClientSession
+
+from src.bench.stub_bot import StubBot
+from src.webhook import SECRET_HEADER, WebhookServer
+
+_UPDATE = {"update_id": 1, "message": {
+    "message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "ping",
+}}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def post_statuses(secret: str, headers_list: list) -> tuple:
+    """Статусы ответов сервера на запросы с заданными заголовками"""
+    server = WebhookServer(Dispatcher(), StubBot(), secret, concurrency=4, drain_timeout=1)
+    listen = f"127.0.0.1:{_free_port()}"
+    await server.start(listen, "/webhook")
+    statuses = []
+    try:
+        async with ClientSession() as session:
+            for headers in headers_list:
+                async with session.post(f"http://{listen}/webhook", json=_UPDATE,
+                                        headers=headers) as response:
+                    statuses.append(response.status)
+    finally:
+        await server.stop()
+    return statuses, server
+
+
+def test_wrong_or_missing_secret_rejected():
+    statuses, server = asyncio.run(post_statuses("s3cret", [
+        {}, {SECRET_HEADER: ""}, {SECRET_HEADER: "wrong"}, {SECRET_HEADER: "s3cret"},
+    ]))
+    assert statuses == [401, 401, 401, 200]
+    assert server.rejected == 3
+    assert server.received == 1
+
+
+@pytest.mark.parametrize("headers", [{}, {SECRET_HEADER: ""}])
+def test_empty_secret_still_checked(headers):
+    statuses, server = asyncio.run(post_statuses("", [headers]))
+    assert statuses == [401]
+    assert server.secret